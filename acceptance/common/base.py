@@ -16,12 +16,11 @@ import logging
 
 from plumbum import cli
 from plumbum import local
-from plumbum.cmd import docker, mkdir
 from plumbum.path.local import LocalPath
 
 from acceptance.common.log import LogExec
 from acceptance.common.scion import ScionDocker, ScionSupervisor
-from acceptance.common.tools import DC
+from acceptance.common.tools import DC, cmd
 
 NAME = 'NOT_SET'  # must be set by users of the Base class.
 DIR = 'NOT_SET'
@@ -44,7 +43,6 @@ class TestState:
     artifacts = local.path()  # Just init so mypy knows the type.
     scion = ScionDocker()
     no_docker = False
-    tools_dc = local['./tools/dc']
 
 
 class TestBase(cli.Application):
@@ -67,7 +65,10 @@ class TestBase(cli.Application):
 
 class CmdBase(cli.Application):
     """ CmdBase is used to implement the test sub-commands. """
-    tools_dc = local['./tools/dc']
+
+    @property
+    def tools_dc(self):
+        return cmd('./tools/dc')
 
     def cmd_dc(self, *args):
         for line in self.dc(*args).splitlines():
@@ -77,7 +78,7 @@ class CmdBase(cli.Application):
         self.dc.collect_logs()
 
     def cmd_setup(self):
-        mkdir('-p', self.artifacts)
+        cmd('mkdir')('-p', self.artifacts)
 
     def cmd_teardown(self):
         self.scion.stop()
@@ -91,7 +92,7 @@ class CmdBase(cli.Application):
     @staticmethod
     def docker_status():
         logger.info('Docker containers')
-        docker('ps', '-a', '-s')
+        cmd('docker')('ps', '-a', '-s')
         # TODO(lukedirtwalker): print status to stdout
 
     @property
@@ -16,20 +16,24 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List
 
-import toml
-from plumbum import local
-from plumbum.cmd import pkill
 from plumbum.path.local import LocalPath
 
 from acceptance.common.log import LogExec
+from acceptance.common.tools import cmd
 
 logger = logging.getLogger(__name__)
 
 
 class Scion(ABC):
     """ Scion is the base class for interacting with the infrastructure. """
-    scion_sh = local['./scion.sh']
-    end2end = local['./bin/end2end_integration']
+
+    @property
+    def scion_sh(self):
+        return cmd('./scion.sh')
+
+    @property
+    def end2end(self):
+        return cmd('./bin/end2end_integration')
 
     @abstractmethod
     def topology(self, topo_file: str, *args: str):
@@ -94,6 +98,7 @@ class Scion(ABC):
         [log.file]
           level = "trace"
         """
+        import toml
         for f in files:
             t = toml.load(f)
             for path, val in change_dict.items():
@@ -106,7 +111,10 @@ class ScionDocker(Scion):
     ScionDocker is used for interacting with the dockerized
     scion infrastructure.
     """
-    tools_dc = local['./tools/dc']
+
+    @property
+    def tools_dc(self):
+        return cmd('./tools/dc')
 
     @LogExec(logger, "creating dockerized topology")
     def topology(self, topo_file: str, *args: str):
@@ -134,7 +142,7 @@ class ScionSupervisor(Scion):
 
     def _send_signals(self, svc_names: List[str], sig: str):
         for svc_name in svc_names:
-            pkill('-f', '--signal', sig, 'bin/.*%s' % svc_name)
+            cmd('pkill')('-f', '--signal', sig, 'bin/.*%s' % svc_name)
 
     def _run_end2end(self, code=0):
         self.end2end(retcode=code)
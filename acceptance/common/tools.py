@@ -15,20 +15,26 @@
 import sys
 
 from contextlib import redirect_stderr
-from plumbum.cmd import (
-    docker,
-    docker_compose,
-    mkdir,
-)
+from functools import lru_cache
 from plumbum import local
 
 SCION_DC_FILE = 'gen/scion-dc.yml'
 
 
+@lru_cache(maxsize=None)
+def cmd(name: str):
+    """
+    Returns the local command with the given name or path. Unlike plumbum.cmd,
+    the command is only looked up on first use, so that the sub-commands that do
+    not need it (e.g. name) neither pay for the lookup nor fail if it is missing.
+    """
+    return local[name]
+
+
 def container_ip(container_name: str) -> str:
     """Returns the ip of the given container"""
-    return docker('inspect', '-f', '{{range .NetworkSettings.Networks}}'
-                  '{{.IPAddress}}{{end}}', container_name).rstrip()
+    return cmd('docker')('inspect', '-f', '{{range .NetworkSettings.Networks}}'
+                         '{{.IPAddress}}{{end}}', container_name).rstrip()
 
 
 class DC(object):
@@ -41,15 +47,16 @@ class DC(object):
         """Runs docker compose with the given arguments"""
         with local.env(BASE_DIR=self.base_dir, COMPOSE_FILE=self.compose_file):
             with redirect_stderr(sys.stdout):
-                return docker_compose('-p', 'acceptance_scion', '--no-ansi',
-                                      *args, **kwargs)
+                return cmd('docker-compose')('-p', 'acceptance_scion', '--no-ansi',
+                                             *args, **kwargs)
 
     def collect_logs(self, out_dir: str = 'logs/docker'):
         """Collects the logs from the services into the given directory"""
         out_p = local.path(out_dir)
-        mkdir('-p', out_p)
+        cmd('mkdir')('-p', out_p)
         for svc in self('config', '--services').splitlines():
             dst_f = out_p / '%s.log' % svc
             with local.env(BASE_DIR=self.base_dir, COMPOSE_FILE=self.compose_file):
                 with redirect_stderr(sys.stdout):
-                    (docker_compose['-p', 'acceptance_scion', '--no-ansi', 'logs', svc] > dst_f)()
+                    dc = cmd('docker-compose')['-p', 'acceptance_scion', '--no-ansi']
+                    (dc['logs', svc] > dst_f)()
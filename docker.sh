@@ -87,6 +87,7 @@ common_args() {
     args+=" -v $SCION_MOUNT/gen:/home/scion/go/src/github.com/scionproto/scion/gen"
     args+=" -v $SCION_MOUNT/logs:/home/scion/go/src/github.com/scionproto/scion/logs"
     args+=" -v $SCION_MOUNT/gen-certs:/home/scion/go/src/github.com/scionproto/scion/gen-certs"
+    args+=" -v $SCION_MOUNT/gen-crypto:/home/scion/go/src/github.com/scionproto/scion/gen-crypto"
     args+=" -v $SCION_MOUNT/gen-cache:/home/scion/go/src/github.com/scionproto/scion/gen-cache"
     args+=" -v $SCION_MOUNT/traces:/home/scion/go/src/github.com/scionproto/scion/traces"
     args+=" -v $SCION_MOUNT/htmlcov:/home/scion/go/src/github.com/scionproto/scion/python/htmlcov"
@@ -145,7 +146,7 @@ cmd_stop() {
 
 setup_volumes() {
     set -e
-    for i in gen logs gen-certs gen-cache traces htmlcov metrics; do
+    for i in gen logs gen-certs gen-crypto gen-cache traces htmlcov metrics; do
         mkdir -p "$SCION_MOUNT/$i"
         # Check dir exists, and is owned by the current (effective) user. If
         # it's owned by the wrong user, the docker environment won't be able to
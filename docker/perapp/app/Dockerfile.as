@@ -0,0 +1,23 @@
+# The image of the one container per AS topology (topology/generator.py --docker-per-as),
+# which runs all services of an AS with supervisord. The binaries are taken from the
+# bazel-generated app images.
+# NOTE: the entrypoint adds the addresses of the services of the AS to the container, which
+# needs CAP_NET_ADMIN from docker. E.g. with `cap_add: NET_ADMIN` from docker-compose.
+FROM scion_border:latest AS border
+FROM scion_cs:latest AS cs
+FROM scion_dispatcher_go:latest AS dispatcher
+FROM scion_sciond:latest AS sciond
+
+FROM ubuntu:16.04
+RUN apt-get update && \
+    apt-get install -y --no-install-recommends iproute2 supervisor && \
+    rm -rf /var/lib/apt/lists/*
+COPY --from=border /sbin/su-exec /sbin/healthcheck /sbin/
+COPY --from=border /app/border /share/bin/border
+COPY --from=cs /app/cs /share/bin/cs
+COPY --from=dispatcher /app/godispatcher /share/bin/godispatcher
+COPY --from=sciond /app/sciond /share/bin/sciond
+COPY as.sh /sbin/as.sh
+ENV TZ=UTC
+WORKDIR /share
+ENTRYPOINT ["/sbin/as.sh"]
@@ -0,0 +1,25 @@
+#!/bin/bash
+
+# Entrypoint of the scion_as image.
+#
+# Usage: as.sh ADDRS SUPERVISORD_CONF
+#
+# Adds the addresses of the services of the AS to the container, and runs the services with
+# supervisord as $SU_EXEC_USERSPEC. Every line of ADDRS is an address that docker assigned to
+# the container, followed by an address (with prefix length) to add on the same interface.
+
+set -e
+
+while read -r assigned addr; do
+    dev=$(ip -o addr show to "$assigned" | awk '{print $2; exit}')
+    if [ -z "$dev" ]; then
+        echo "No interface with address $assigned" >&2
+        exit 1
+    fi
+    opts=
+    # Skip the duplicate address detection, the addresses are allocated by the generator.
+    [[ "$addr" == *:* ]] && opts=nodad
+    ip addr replace "$addr" dev "$dev" $opts
+done < "${1:?}"
+
+exec /sbin/su-exec "${SU_EXEC_USERSPEC:?}" supervisord -n -c "${2:?}"
@@ -20,11 +20,12 @@ def scion_app_base():
         packages["libstdc++6"],
     ]
 
-    # Install su-exec.
+    # Install su-exec, and the healthcheck used by the generated compose files.
     pkg_tar(
         name = "app_base_files",
         srcs = [
             "@com_github_anapaya_su_exec//:su-exec",
+            "//go/tools/healthcheck",
         ],
         remap_paths = {
             "": "sbin",
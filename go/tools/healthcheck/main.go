@@ -0,0 +1,68 @@
+// Copyright 2020 Anapaya Systems
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//   http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+// healthcheck is the container healthcheck of the SCION app images, which do not contain a
+// shell or an HTTP client. It exits with 0 if the service answers, and with 1 otherwise.
+//
+// With -http, the metrics endpoint of the service at the given address has to answer.
+// With -unix, the unix socket at the given path has to accept connections (e.g. the
+// application socket of the dispatcher).
+package main
+
+import (
+	"flag"
+	"fmt"
+	"net"
+	"net/http"
+	"os"
+	"time"
+)
+
+var (
+	httpAddr = flag.String("http", "", "address of the metrics endpoint, in host:port format")
+	unixPath = flag.String("unix", "", "path of the unix socket")
+	timeout  = flag.Duration("timeout", time.Second, "timeout of the check")
+)
+
+func main() {
+	flag.Parse()
+	if err := check(); err != nil {
+		fmt.Fprintf(os.Stderr, "unhealthy: %v\n", err)
+		os.Exit(1)
+	}
+}
+
+func check() error {
+	switch {
+	case *httpAddr != "":
+		// The zero transport does not use the proxy of the environment.
+		client := http.Client{Timeout: *timeout, Transport: &http.Transport{}}
+		resp, err := client.Get(fmt.Sprintf("http://%s/metrics", *httpAddr))
+		if err != nil {
+			return err
+		}
+		resp.Body.Close()
+		if resp.StatusCode != http.StatusOK {
+			return fmt.Errorf("status %s", resp.Status)
+		}
+		return nil
+	case *unixPath != "":
+		conn, err := net.DialTimeout("unix", *unixPath, *timeout)
+		if err != nil {
+			return err
+		}
+		return conn.Close()
+	}
+	return fmt.Errorf("one of -http and -unix is required")
+}
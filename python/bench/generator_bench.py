@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`generator_bench` --- Topology generator benchmarks
+========================================================
+
+Measures the wall time and the peak memory of the topology generator phases on
+synthetic topologies of increasing size, and writes the results as JSON.
+
+The wall times are the best of --repeat runs without memory tracing, the peak
+memory is measured in a separate run with tracemalloc. Run from the root of the
+repository (the docker topology needs tools/docker-ip):
+
+    PYTHONPATH=python/:. python3 python/bench/generator_bench.py -o logs/generator_bench.json
+"""
+# Stdlib
+import argparse
+import json
+import math
+import platform
+import tempfile
+import time
+import tracemalloc
+
+# SCION
+from lib.defines import DEFAULT6_NETWORK, DEFAULT_MTU
+from lib.util import load_yaml_file
+from topology.config import ConfigGenArgs
+from topology.docker import DockerGenArgs, DockerGenerator
+from topology.generator import add_arguments
+from topology.go import GoGenArgs, GoGenerator
+from topology.net import SubnetGenerator
+from topology.profiling import Profiler
+from topology.prometheus import PrometheusGenArgs, PrometheusGenerator
+from topology.scale import scale_topo, write_topo
+from topology.sink import OutputSink
+from topology.topo import TopoGenArgs, TopoGenerator
+
+BENCH_VERSION = 1
+DEFAULT_SCALES = '100,250,500'
+DEFAULT_OUTPUT = 'logs/generator_bench.json'
+# Size and number of core ASes of the synthetic ISDs.
+ISD_SIZE = 100
+ISD_CORES = 4
+# The default docker network only fits a few hundred ASes.
+BENCH_NETWORK = '10.0.0.0/8'
+
+
+def run_generator(topo_file, out_dir, prof):
+    """
+    Run the generator phases on the topology config, in docker mode.
+
+    :param Profiler prof: Records the phases. The phases of TopoGenerator.generate
+        (links, AS topos and subnets) are nested in the topo phase.
+    """
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    args = ConfigGenArgs(parser.parse_args(['-c', topo_file, '-o', out_dir, '-d']))
+    args.sink = OutputSink()
+    args.profiler = prof
+    topo_config = load_yaml_file(topo_file)
+    subnet_gen4 = SubnetGenerator(BENCH_NETWORK, args.docker, args.in_docker)
+    subnet_gen6 = SubnetGenerator(DEFAULT6_NETWORK, args.docker, args.in_docker)
+    topo_gen = TopoGenerator(TopoGenArgs(args, topo_config, subnet_gen4, subnet_gen6,
+                                         DEFAULT_MTU))
+    with prof.phase('topo'):
+        topo_dicts, networks = topo_gen.generate()
+        args.graph = topo_gen.graph
+        args.sink.flush()
+    with prof.phase('topo_files'):
+        topo_gen.write_as_topos()
+        args.sink.flush()
+    with prof.phase('go'):
+        GoGenerator(GoGenArgs(args, topo_dicts, networks)).generate_as()
+        args.sink.flush()
+    with prof.phase('docker'):
+        DockerGenerator(DockerGenArgs(args, topo_dicts, networks)).generate()
+        args.sink.flush()
+    with prof.phase('prometheus'):
+        PrometheusGenerator(PrometheusGenArgs(args, topo_dicts, networks)).generate()
+        args.sink.flush()
+
+
+def bench_scale(ases, repeat, parents, peers):
+    """
+    Benchmark the generator on a synthetic topology with (about) the given number of ASes.
+
+    :returns: The result entry of the scale.
+    :rtype: dict
+    """
+    isds = math.ceil(ases / ISD_SIZE)
+    leaves = max(ases // isds - ISD_CORES, 0)
+    topo = scale_topo(isds, ISD_CORES, leaves, parents=parents, peers=peers)
+    phases = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        topo_file = '%s/scale.topo' % tmp
+        write_topo(topo, topo_file)
+        for i in range(repeat):
+            prof = Profiler(memory=False)
+            run_generator(topo_file, '%s/gen-%d' % (tmp, i), prof)
+            for name, entry in prof.phases.items():
+                best = phases.setdefault(name, entry)
+                best['wall_s'] = min(best['wall_s'], entry['wall_s'])
+        prof = Profiler(memory=True)
+        try:
+            run_generator(topo_file, '%s/gen-mem' % tmp, prof)
+        finally:
+            tracemalloc.stop()
+        for name, entry in prof.phases.items():
+            phases[name]['peak_bytes'] = entry['peak_bytes']
+    return {
+        'ases': len(topo['ASes']),
+        'isds': isds,
+        'links': len(topo['links']),
+        'phases': phases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the topology generator.')
+    parser.add_argument('-s', '--scales', default=DEFAULT_SCALES,
+                        help='Comma separated numbers of ASes (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Runs per scale, the best wall time is reported')
+    parser.add_argument('--parents', type=int, default=2, help='Parents of a leaf AS')
+    parser.add_argument('--peers', type=int, default=1, help='PEER links of a leaf AS')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='Output JSON file')
+    args = parser.parse_args()
+    results = []
+    for ases in [int(s) for s in args.scales.split(',')]:
+        result = bench_scale(ases, args.repeat, args.parents, args.peers)
+        results.append(result)
+        for name, entry in result['phases'].items():
+            print('%6d ASes  %-14s %9.3fs %9.1f MiB' % (
+                result['ases'], name, entry['wall_s'], entry['peak_bytes'] / 2**20))
+    report = {
+        'version': BENCH_VERSION,
+        'timestamp': int(time.time()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`import_bench` --- Import time of the entry points
+=======================================================
+
+Imports every entry point in a fresh interpreter with `python -X importtime`,
+and compares the best cumulative import time with its budget. The entry points
+are started many times per CI run (e.g. the acceptance test sub-commands), so
+their heavy dependencies are imported on first use. Exits with 1 if an entry
+point exceeds its budget. Run from the root of the repository:
+
+    PYTHONPATH=python/:. python3 python/bench/import_bench.py
+"""
+# Stdlib
+import argparse
+import subprocess
+import sys
+
+# Entry point modules and their import time budget in milliseconds.
+BUDGETS = (
+    ('topology.generator', 60),
+    ('acceptance.common.base', 150),
+    ('acceptance.common.scion', 150),
+)
+
+
+def import_time(module):
+    """
+    :returns: The cumulative import time of the module in milliseconds.
+    :rtype: float
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module and not fields[2][1:2].isspace():
+            return int(fields[1]) / 1000
+    raise ValueError('No import time reported for %s' % module)
+
+
+def bench(repeat):
+    """
+    :returns: The best import time in milliseconds per entry point.
+    :rtype: dict
+    """
+    return {module: min(import_time(module) for _ in range(repeat)) for module, _ in BUDGETS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the import time of the entry points.')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Imports per entry point, the best is reported')
+    args = parser.parse_args()
+    results = bench(args.repeat)
+    over = False
+    for module, budget in BUDGETS:
+        ms = results[module]
+        status = 'ok'
+        if ms > budget:
+            status = 'OVER BUDGET'
+            over = True
+        print('%-26s %7.1f ms (budget %d ms) %s' % (module, ms, budget, status))
+    if over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`isd_as_bench` --- ISD-AS micro-benchmarks
+===============================================
+
+Measures the ISD_AS/TopoID operations that the topology generator performs for
+every element: construction from a string, dict lookups, and the formatted
+forms. Run from the root of the repository:
+
+    PYTHONPATH=python/:. python3 python/bench/isd_as_bench.py
+"""
+# Stdlib
+import argparse
+import timeit
+
+# SCION
+from topology.common import TopoID
+
+# The number of distinct ASes, the operations cycle through them.
+ASES = 1000
+
+
+def bench(number, repeat):
+    """
+    :returns: The best time per operation in nanoseconds, per operation name.
+    :rtype: dict
+    """
+    raws = ['%d-ff00:0:%x' % (i % 16 + 1, i) for i in range(ASES)]
+    ids = [TopoID(raw) for raw in raws]
+    lookup = {topo_id: i for i, topo_id in enumerate(ids)}
+    ops = {
+        'construct': lambda: [TopoID(raw) for raw in raws],
+        'dict lookup': lambda: [lookup[topo_id] for topo_id in ids],
+        'str': lambda: [str(topo_id) for topo_id in ids],
+        'file_fmt': lambda: [topo_id.file_fmt() for topo_id in ids],
+        'base_dir': lambda: [topo_id.base_dir('gen') for topo_id in ids],
+    }
+    results = {}
+    for name, op in ops.items():
+        best = min(timeit.repeat(op, number=number, repeat=repeat))
+        results[name] = best / (number * ASES) * 1e9
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ISD-AS operations.')
+    parser.add_argument('-n', '--number', type=int, default=100,
+                        help='Passes over the ASes per measurement')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Measurements per operation, the best is reported')
+    args = parser.parse_args()
+    for name, ns in bench(args.number, args.repeat).items():
+        print('%-12s %8.1f ns/op' % (name, ns))
+
+
+if __name__ == "__main__":
+    main()
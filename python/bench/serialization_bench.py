@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`serialization_bench` --- Serialization backend benchmark
+==============================================================
+
+Runs the generator phases on a synthetic topology with each serialization
+backend (see lib.serialization), and prints the best wall time of the phases
+per backend. Loading the topology config is measured separately. Run from the
+root of the repository:
+
+    PYTHONPATH=python/:. python3 python/bench/serialization_bench.py -s 500
+"""
+# Stdlib
+import argparse
+import math
+import tempfile
+import time
+
+# SCION
+from bench.generator_bench import ISD_CORES, ISD_SIZE, run_generator
+from lib.serialization import BACKEND_FAST, BACKEND_PYTHON, set_backend
+from lib.util import load_yaml_file
+from topology.profiling import Profiler
+from topology.scale import scale_topo, write_topo
+
+BACKENDS = (BACKEND_PYTHON, BACKEND_FAST)
+
+
+def bench(ases, repeat):
+    """
+    :returns: The best wall time in seconds per backend and phase.
+    :rtype: dict
+    """
+    isds = math.ceil(ases / ISD_SIZE)
+    topo = scale_topo(isds, ISD_CORES, max(ases // isds - ISD_CORES, 0))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        topo_file = '%s/scale.topo' % tmp
+        write_topo(topo, topo_file)
+        for backend in BACKENDS:
+            set_backend(backend)
+            phases = results[backend] = {}
+            for i in range(repeat):
+                start = time.perf_counter()
+                load_yaml_file(topo_file)
+                wall = {'load': time.perf_counter() - start}
+                prof = Profiler(memory=False)
+                run_generator(topo_file, '%s/gen-%s-%d' % (tmp, backend, i), prof)
+                for name, entry in prof.phases.items():
+                    wall[name] = entry['wall_s']
+                for name, w in wall.items():
+                    phases[name] = min(phases.get(name, w), w)
+    set_backend(BACKEND_FAST)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the serialization backends.')
+    parser.add_argument('-s', '--ases', type=int, default=500,
+                        help='Number of ASes (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Runs per backend, the best wall time is reported')
+    args = parser.parse_args()
+    results = bench(args.ases, args.repeat)
+    print('%-14s %s' % ('phase', ' '.join('%10s' % b for b in BACKENDS)))
+    for name in results[BACKEND_PYTHON]:
+        print('%-14s %s' % (name, ' '.join('%9.3fs' % results[b][name] for b in BACKENDS)))
+    print('%-14s %s' % ('total', ' '.join('%9.3fs' % sum(results[b].values())
+                                          for b in BACKENDS)))
+
+
+if __name__ == "__main__":
+    main()
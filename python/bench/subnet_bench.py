@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`subnet_bench` --- Subnet allocation benchmark
+===================================================
+
+Measures SubnetGenerator.alloc_subnets on a large number of subnets. Like in a
+generated topology, most subnets are link subnets with two addresses (a /31),
+every tenth subnet is an AS subnet with several elements. Run from the root of
+the repository:
+
+    PYTHONPATH=python/:. python3 python/bench/subnet_bench.py -s 100000
+"""
+# Stdlib
+import argparse
+import time
+import tracemalloc
+
+# SCION
+from topology.net import SubnetGenerator
+
+BENCH_NETWORK = '10.0.0.0/8'
+# The number of elements of an AS subnet.
+AS_ELEMS = 6
+
+
+def _subnet_gen(subnets):
+    subnet_gen = SubnetGenerator(BENCH_NETWORK, False, False)
+    for i in range(subnets):
+        subnet = subnet_gen.register('net%07d' % i)
+        for j in range(AS_ELEMS if i % 10 == 0 else 2):
+            subnet.register('elem%d' % j)
+    return subnet_gen
+
+
+def bench(subnets, repeat):
+    """
+    :returns: The best wall time of alloc_subnets in seconds, and its peak traced memory
+        in bytes.
+    :rtype: (float, int)
+    """
+    best = None
+    for _ in range(repeat):
+        subnet_gen = _subnet_gen(subnets)
+        start = time.perf_counter()
+        subnet_gen.alloc_subnets()
+        wall = time.perf_counter() - start
+        best = wall if best is None else min(best, wall)
+    subnet_gen = _subnet_gen(subnets)
+    tracemalloc.start()
+    try:
+        subnet_gen.alloc_subnets()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the subnet allocation.')
+    parser.add_argument('-s', '--subnets', type=int, default=100000,
+                        help='Number of subnets (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Runs, the best wall time is reported')
+    args = parser.parse_args()
+    wall, peak = bench(args.subnets, args.repeat)
+    print('%d subnets  %.3fs  %.1f MiB' % (args.subnets, wall, peak / 2**20))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ Contains constant definitions used throughout the codebase.
 
 #: Generated files directory
 GEN_PATH = 'gen'
+#: Cache of the generated crypto material, kept across topology generations
+CRYPTO_CACHE_PATH = 'gen-crypto'
 #: Topology configuration
 TOPO_FILE = "topology.json"
 #: Networks config
@@ -29,6 +31,10 @@ IFIDS_FILE = "ifids.yml"
 AS_LIST_FILE = "as_list.yml"
 #: Prometheus config
 PROM_FILE = "prometheus.yml"
+#: Generation manifest
+MANIFEST_FILE = "manifest.json"
+#: Allocations of the generator
+ALLOCATIONS_FILE = "allocations.json"
 
 #: Default SCION router UDP port.
 SCION_ROUTER_PORT = 50000
@@ -27,7 +27,11 @@ class ISD_AS:
     lower 48 bits.
     See formatting and allocations here:
     https://github.com/scionproto/scion/wiki/ISD-and-AS-numbering
+
+    Instances are immutable. Constructing an instance from a string returns the instance that was
+    parsed from the same string before, see INTERN.
     """
+    __slots__ = ('_ia', '_str', '_as_file_fmt', '_file_fmt')
     ISD_BITS = 16
     MAX_ISD = (1 << ISD_BITS) - 1
     AS_BITS = 48
@@ -38,10 +42,35 @@ class ISD_AS:
     HEX_SEPARATOR = ":"
     HEX_FILE_SEPARATOR = "_"
     MAX_HEX_AS_PART = 0xffff
+    # Whether instances are interned by the string they are parsed from. Subclasses which add
+    # state that is not derived from the ISD-AS must disable it.
+    INTERN = True
+    # The interned instances, keyed by class and string. Interning is meant for the topology
+    # generator, which parses the same few ISD-ASes over and over. The table is bounded, strings
+    # parsed once it is full are not interned, so long running processes do not grow it forever.
+    _interned = {}
+    INTERN_LIMIT = 1 << 16
+
+    def __new__(cls, raw=None):
+        if not cls.INTERN or not raw or not isinstance(raw, str):
+            return super().__new__(cls)
+        key = (cls, raw)
+        inst = cls._interned.get(key)
+        if inst is None:
+            inst = super().__new__(cls)
+            inst._parse(raw)
+            if len(cls._interned) < cls.INTERN_LIMIT:
+                cls._interned[key] = inst
+        return inst
 
     def __init__(self, raw=None):
-        self._isd = 0
-        self._as = 0
+        try:
+            self._ia
+            # Interned instance, already parsed by __new__.
+            return
+        except AttributeError:
+            pass
+        self._ia = 0
         if raw:
             self._parse(raw)
 
@@ -53,29 +82,32 @@ class ISD_AS:
         if len(parts) != 2:
             raise SCIONParseError("Unable to split ISD-AS in string: %s" % raw)
         isd_s, as_s = parts
-        self._parse_isd_str(isd_s)
+        isd = self._parse_isd_str(isd_s)
         for as_sep in [self.HEX_SEPARATOR, self.HEX_FILE_SEPARATOR]:
             if as_sep in as_s:
-                self._parse_hex_as(as_s, as_sep)
+                as_ = self._parse_hex_as(as_s, as_sep)
                 break
         else:
-            self._parse_dec_as(as_s)
+            as_ = self._parse_dec_as(as_s)
+        self._ia = isd << self.AS_BITS | as_
 
     def _parse_isd_str(self, raw):
         try:
-            self._isd = int(raw)
+            isd = int(raw)
         except ValueError:
             raise SCIONParseError("Unable to parse ISD from string: %s" % raw) from None
-        if self._isd > self.MAX_ISD:
+        if isd > self.MAX_ISD:
             raise SCIONParseError("ISD too large (max: %d): %s" % (self.MAX_ISD, raw))
+        return isd
 
     def _parse_dec_as(self, raw):
         try:
-            self._as = int(raw, base=10)
+            as_ = int(raw, base=10)
         except ValueError:
             raise SCIONParseError("Unable to parse decimal AS from string: %s" % raw) from None
-        if self._as > self.MAX_BGP_AS:
+        if as_ > self.MAX_BGP_AS:
             raise SCIONParseError("Decimal AS too large (max: %d): %s" % (self.MAX_BGP_AS, raw))
+        return as_
 
     def _parse_hex_as(self, raw, as_sep=HEX_SEPARATOR):
         try:
@@ -86,65 +118,79 @@ class ISD_AS:
             raise SCIONParseError(
                 "Wrong number of separators (%s) in hex AS number (expected: %d actual: %s): %s" %
                 (self.HEX_SEPARATOR, self.HEX_AS_PARTS,  as_parts, raw))
-        self._as = 0
+        as_ = 0
         for i, s in enumerate(as_parts):
-            self._as <<= 16
+            as_ <<= 16
             v = int(s, base=16)
             if v > self.MAX_HEX_AS_PART:
                 raise SCIONParseError("Hex AS number has part greater than %x: %s" %
                                       (self.MAX_HEX_AS_PART, raw))
-            self._as |= v
-        if self._as > self.MAX_AS:
+            as_ |= v
+        if as_ > self.MAX_AS:
             raise SCIONParseError("AS too large (max: %d): %s" % (self.MAX_AS, raw))
+        return as_
 
     def _parse_int(self, raw):
         """
         :param int raw: a 64-bit unsigned integer
         """
-        self._isd = raw >> self.AS_BITS
-        self._as = raw & self.MAX_AS
+        self._ia = raw & ((1 << (self.ISD_BITS + self.AS_BITS)) - 1)
+
+    @property
+    def _isd(self):
+        return self._ia >> self.AS_BITS
+
+    @property
+    def _as(self):
+        return self._ia & self.MAX_AS
 
     def int(self):
-        isd_as = self._isd << self.AS_BITS
-        isd_as |= self._as & self.MAX_AS
-        return isd_as
+        return self._ia
 
     def any_as(self):  # pragma: no cover
         return self.from_values(self._isd, 0)
 
     def is_zero(self):  # pragma: no cover
-        return self._isd == 0 and self._as == 0
+        return self._ia == 0
 
     def __eq__(self, other):  # pragma: no cover
-        return self._isd == other._isd and self._as == other._as
+        return self._ia == other._ia
 
     def isd_str(self):
-        s = str(self._isd)
-        if self._isd > self.MAX_ISD:
-            return "%s [Illegal ISD: larger than %d]" % (s, self.MAX_ISD)
-        return s
+        return str(self._isd)
 
     def as_str(self, sep=HEX_SEPARATOR):
-        dec_str = str(self._as)
-        if self._as > self.MAX_AS:
-            return "%s [Illegal AS: larger than %d]" % (dec_str, self.MAX_AS)
-        if self._as <= self.MAX_BGP_AS:
-            return str(self._as)
-        s = []
         as_ = self._as
+        if as_ <= self.MAX_BGP_AS:
+            return str(as_)
+        s = []
         for i in range(self.HEX_AS_PARTS):
             s.insert(0, "%x" % (as_ & self.MAX_HEX_AS_PART))
             as_ >>= 16
         return sep.join(s)
 
     def as_file_fmt(self):
-        return self.as_str(self.HEX_FILE_SEPARATOR)
+        try:
+            return self._as_file_fmt
+        except AttributeError:
+            self._as_file_fmt = self.as_str(self.HEX_FILE_SEPARATOR)
+            return self._as_file_fmt
 
     def file_fmt(self):
-        return "%s-%s" % (self.isd_str(), self.as_file_fmt())
+        try:
+            return self._file_fmt
+        except AttributeError:
+            self._file_fmt = "%s-%s" % (self.isd_str(), self.as_file_fmt())
+            return self._file_fmt
 
     def __str__(self, as_sep=HEX_SEPARATOR):
-        return "%s-%s" % (self.isd_str(), self.as_str(as_sep))
+        if as_sep != self.HEX_SEPARATOR:
+            return "%s-%s" % (self.isd_str(), self.as_str(as_sep))
+        try:
+            return self._str
+        except AttributeError:
+            self._str = "%s-%s" % (self.isd_str(), self.as_str())
+            return self._str
 
     def __repr__(self):  # pragma: no cover
         return "ISD_AS(isd=%s, as=%s)" % (self._isd, self._as)
@@ -153,4 +199,4 @@ class ISD_AS:
         return self.LEN
 
     def __hash__(self):  # pragma: no cover
-        return hash(str(self))
+        return hash(self._ia)
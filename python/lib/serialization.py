@@ -0,0 +1,205 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`serialization` --- YAML, JSON and TOML encoding
+=====================================================
+
+The generated files are serialized with these functions. With the fast backend, YAML is
+loaded and dumped with the libyaml bindings of PyYAML, and JSON is encoded with orjson, if
+they are available. Otherwise, and with the python backend, the pure python implementations
+are used. Both backends produce the same output.
+"""
+# Stdlib
+import json
+import re
+
+# External packages
+import toml
+import yaml
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND_FAST = 'fast'
+BACKEND_PYTHON = 'python'
+
+_backend = BACKEND_FAST
+
+_TOML_BARE_KEY = re.compile(r'^[A-Za-z0-9_-]+$')
+
+if yaml.__with_libyaml__:
+    from yaml.cyaml import CEmitter
+
+    class _FastDumper(CEmitter, yaml.Dumper):
+        """
+        The libyaml emitter, with the representers of yaml.Dumper (e.g. the ones registered
+        by yaml.YAMLObject subclasses).
+        """
+        __init__ = yaml.CDumper.__init__
+    _FAST_LOADER = yaml.CSafeLoader
+else:
+    _FastDumper = yaml.Dumper
+    _FAST_LOADER = yaml.SafeLoader
+
+
+def set_backend(backend):
+    """
+    Select the serialization backend.
+
+    :param str backend: BACKEND_FAST or BACKEND_PYTHON.
+    """
+    global _backend
+    assert backend in (BACKEND_FAST, BACKEND_PYTHON), backend
+    _backend = backend
+
+
+def yaml_load(stream):
+    """
+    Parse YAML with the safe loader.
+
+    :param stream: A string or file.
+    """
+    loader = _FAST_LOADER if _backend == BACKEND_FAST else yaml.SafeLoader
+    return yaml.load(stream, Loader=loader)
+
+
+def yaml_dump(data, stream=None, **kwargs):
+    """
+    Dump YAML like yaml.dump.
+    """
+    dumper = _FastDumper if _backend == BACKEND_FAST else yaml.Dumper
+    return yaml.dump(data, stream, Dumper=dumper, **kwargs)
+
+
+def json_dumps(obj, indent=2, sort_keys=False, default=None):
+    """
+    Encode JSON like json.dumps. orjson is only used for the indentation by 2 spaces, if
+    the output is pure ASCII, as json.dumps escapes the other characters, and if the object
+    contains no floats, as orjson formats them differently (e.g. 1e-05, 1e+20 and NaN).
+    """
+    if (_backend == BACKEND_FAST and orjson is not None and indent == 2 and
+            not _has_float(obj)):
+        option = orjson.OPT_INDENT_2
+        if sort_keys:
+            # Non-string keys are rejected, json.dumps sorts them before converting them.
+            option |= orjson.OPT_SORT_KEYS
+        else:
+            option |= orjson.OPT_NON_STR_KEYS
+        try:
+            raw = orjson.dumps(obj, default=_no_float_default(default), option=option)
+        except TypeError:
+            pass
+        else:
+            try:
+                return raw.decode('ascii')
+            except UnicodeDecodeError:
+                pass
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys, default=default)
+
+
+def _has_float(obj):
+    if isinstance(obj, float):
+        return True
+    if isinstance(obj, dict):
+        return any(_has_float(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_float(v) for v in obj)
+    return False
+
+
+def _no_float_default(default):
+    """
+    Wrap the default function of json_dumps, so that objects converted to floats make orjson
+    fail, and json.dumps is used instead.
+    """
+    if default is None:
+        return None
+
+    def wrapped(obj):
+        value = default(obj)
+        if _has_float(value):
+            raise TypeError("float in %r" % obj)
+        return value
+    return wrapped
+
+
+def toml_dumps(obj):
+    """
+    Encode TOML like toml.dumps. The fast backend encodes the tables of plain keys, strings,
+    numbers and booleans itself, and falls back to toml for everything else (e.g. lists and
+    strings that need escaping).
+    """
+    if _backend == BACKEND_FAST:
+        raw = _toml_dumps_simple(obj)
+        if raw is not None:
+            return raw
+    return toml.dumps(obj)
+
+
+def _toml_dumps_simple(obj):
+    # Follows the section order and spacing of toml.dumps.
+    raw, tables = _toml_table(obj)
+    if raw is None:
+        return None
+    while tables:
+        subtables = {}
+        for name, table in tables.items():
+            values, sub = _toml_table(table)
+            if values is None:
+                return None
+            if values or not sub:
+                if raw and raw[-2:] != "\n\n":
+                    raw += "\n"
+                raw += "[" + name + "]\n" + values
+            for sub_name, sub_table in sub.items():
+                subtables[name + "." + sub_name] = sub_table
+        tables = subtables
+    return raw
+
+
+def _toml_table(table):
+    """
+    Encode the values of a table, and collect its subtables. Returns (None, None) if the
+    table contains anything else than plain keys, strings, numbers and booleans.
+    """
+    lines = []
+    subtables = {}
+    for key, value in table.items():
+        if type(key) is not str or not _TOML_BARE_KEY.match(key):
+            return None, None
+        if isinstance(value, dict):
+            subtables[key] = value
+        elif value is None:
+            # Like toml, skip the unset values.
+            continue
+        elif type(value) is str:
+            if not _toml_plain_str(value):
+                return None, None
+            lines.append('%s = "%s"\n' % (key, value))
+        elif type(value) is bool:
+            lines.append('%s = %s\n' % (key, 'true' if value else 'false'))
+        elif type(value) is int:
+            lines.append('%s = %d\n' % (key, value))
+        elif type(value) is float:
+            raw = "{}".format(value).replace("e+0", "e+").replace("e-0", "e-")
+            lines.append('%s = %s\n' % (key, raw))
+        else:
+            return None, None
+    return ''.join(lines), subtables
+
+
+def _toml_plain_str(s):
+    return all(ord(c) < 128 for c in s) and s.isprintable() and not any(c in s for c in '"\'\\')
@@ -19,6 +19,7 @@ Various utilities for SCION functionality.
 """
 # Stdlib
 import os
+import shutil
 
 # External packages
 import json
@@ -29,27 +30,26 @@ from lib.errors import (
     SCIONIOError,
     SCIONYAMLError,
 )
+from lib.serialization import yaml_load
 
 
-def write_file(file_path, text):
+def write_file(file_path, text, mkdir=True):
     """
     Write some text into a temporary file, creating its directory as needed, and
     then atomically move to target location.
 
     :param str file_path: the path to the file.
     :param str text: the file content.
+    :param bool mkdir: whether to create the directory. Callers that already
+        created it can skip the syscall.
     :raises:
         lib.errors.SCIONIOError: IO error occurred
     """
     # ":" is an illegal filename char on both windows and OSX, so disallow it globally to prevent
     # incompatibility.
     assert ":" not in file_path, file_path
-    dir_ = os.path.dirname(file_path)
-    try:
-        os.makedirs(dir_, exist_ok=True)
-    except OSError as e:
-        raise SCIONIOError("Error creating '%s' dir: %s" %
-                           (dir_, e.strerror)) from None
+    if mkdir:
+        make_dirs(os.path.dirname(file_path))
     tmp_file = file_path + ".new"
     try:
         with open(tmp_file, 'w') as f:
@@ -64,6 +64,55 @@ def write_file(file_path, text):
                            (tmp_file, file_path, e.strerror)) from None
 
 
+def link_file(src, dst):
+    """
+    Atomically replace dst with a hard link to src. If the file system does not
+    support the link (e.g. src and dst are on different devices), dst becomes a
+    copy of src instead.
+
+    :param str src: the path to the existing file.
+    :param str dst: the path to the link.
+    :raises:
+        lib.errors.SCIONIOError: IO error occurred
+    """
+    try:
+        if os.path.samefile(src, dst):
+            return
+    except OSError:
+        pass
+    tmp_file = dst + ".new"
+    try:
+        if os.path.lexists(tmp_file):
+            os.remove(tmp_file)
+        try:
+            os.link(src, tmp_file)
+        except OSError:
+            shutil.copy(src, tmp_file)
+    except OSError as e:
+        raise SCIONIOError("Error linking '%s' to '%s': %s" %
+                           (dst, src, e.strerror)) from None
+    try:
+        os.rename(tmp_file, dst)
+    except OSError as e:
+        raise SCIONIOError("Error moving '%s' to '%s': %s" %
+                           (tmp_file, dst, e.strerror)) from None
+
+
+def make_dirs(dir_):
+    """
+    Create a directory and its parents, if they do not exist yet.
+
+    :param str dir_: the path to the directory.
+    :raises:
+        lib.errors.SCIONIOError: IO error occurred
+    """
+    try:
+        os.makedirs(dir_, exist_ok=True)
+    except OSError as e:
+        raise SCIONIOError("Error creating '%s' dir: %s" %
+                           (dir_, e.strerror)) from None
+
+
 def load_yaml_file(file_path):
     """
     Read and parse a YAML config file.
@@ -77,7 +126,7 @@ def load_yaml_file(file_path):
     """
     try:
         with open(file_path) as f:
-            return yaml.load(f, Loader=yaml.SafeLoader)
+            return yaml_load(f)
     except OSError as e:
         raise SCIONIOError("Error opening '%s': %s" %
                            (file_path, e.strerror)) from None
@@ -0,0 +1,89 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`scion_addr_test` --- lib.scion_addr unit tests
+====================================================
+"""
+# Stdlib
+import pickle
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.errors import SCIONParseError
+from lib.scion_addr import ISD_AS
+
+
+class TestISDASParse(object):
+    """
+    Unit tests for lib.scion_addr.ISD_AS._parse
+    """
+    def test_hex(self):
+        # Call
+        ia = ISD_AS('1-ff00:0:110')
+        # Tests
+        ntools.eq_(ia.int(), 1 << 48 | 0xff0000000110)
+        ntools.eq_(str(ia), '1-ff00:0:110')
+        ntools.eq_(ia.file_fmt(), '1-ff00_0_110')
+        ntools.eq_(ia, ISD_AS('1-ff00_0_110'))
+
+    def test_dec(self):
+        # Call
+        ia = ISD_AS('2-64512')
+        # Tests
+        ntools.eq_(ia.int(), 2 << 48 | 64512)
+        ntools.eq_(str(ia), '2-64512')
+
+    def test_invalid(self):
+        for raw in ('1', '1-ff00:0', '65536-1', '1-4294967296', '1-ff00:0:10000'):
+            ntools.assert_raises(SCIONParseError, ISD_AS, raw)
+
+    def test_empty(self):
+        # Call
+        ia = ISD_AS('')
+        # Tests
+        ntools.eq_(ia.int(), 0)
+        ntools.eq_(str(ia), '0-0')
+
+
+class TestISDASIntern(object):
+    """
+    Unit tests for the interning of lib.scion_addr.ISD_AS
+    """
+    def test_same_string(self):
+        # Tests
+        ntools.assert_is(ISD_AS('1-ff00:0:111'), ISD_AS('1-ff00:0:111'))
+
+    def test_limit(self):
+        limit = ISD_AS.INTERN_LIMIT
+        ISD_AS.INTERN_LIMIT = len(ISD_AS._interned)
+        try:
+            # Call
+            ia = ISD_AS('1-ff00:0:113')
+        finally:
+            ISD_AS.INTERN_LIMIT = limit
+        # Tests
+        ntools.assert_not_in((ISD_AS, '1-ff00:0:113'), ISD_AS._interned)
+        ntools.eq_(str(ia), '1-ff00:0:113')
+
+    def test_hash(self):
+        ia = ISD_AS('1-ff00:0:112')
+        # Call
+        copy = pickle.loads(pickle.dumps(ia))
+        # Tests
+        ntools.assert_is_not(copy, ia)
+        ntools.eq_(copy, ia)
+        ntools.eq_(hash(copy), hash(ia))
+        ntools.eq_(str(copy), str(ia))
@@ -0,0 +1,91 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`serialization_test` --- lib.serialization unit tests
+==========================================================
+"""
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.serialization import (
+    BACKEND_FAST,
+    BACKEND_PYTHON,
+    json_dumps,
+    set_backend,
+    toml_dumps,
+    yaml_dump,
+    yaml_load,
+)
+
+DATA = {
+    'general': {'id': 'cs1-ff00_0_110-1', 'config_dir': '/share/conf', 'reconnect': True},
+    'log': {'console': {'level': 'debug'}, 'file': {'path': 'logs/cs1.log', 'max_size': 1.5e-7}},
+    'metrics': {'prometheus': '127.0.0.1:30452', 'unset': None},
+    'quoted': {'name': 'it\'s "quoted"', 'ñ': 'ü'},
+    'list': [1, 'two'],
+    'ports': {31000: 'br1'},
+}
+
+
+def _both(func, *args, **kwargs):
+    try:
+        set_backend(BACKEND_PYTHON)
+        expected = func(*args, **kwargs)
+        set_backend(BACKEND_FAST)
+        return func(*args, **kwargs), expected
+    finally:
+        set_backend(BACKEND_FAST)
+
+
+class TestBackends(object):
+    """
+    Unit tests for the lib.serialization backends
+    """
+    def test_json(self):
+        for sort_keys in (False, True):
+            data = DATA if not sort_keys else dict(DATA, ports={})
+            # Call
+            fast, expected = _both(json_dumps, data, sort_keys=sort_keys)
+            # Tests
+            ntools.eq_(fast, expected)
+
+    def test_json_floats(self):
+        for value in (1e-05, 1e+20, 0.1, float('nan'), float('inf'), -0.0):
+            data = {'value': value, 'nested': [{'value': value}]}
+            # Call
+            fast, expected = _both(json_dumps, data)
+            # Tests
+            ntools.eq_(fast, expected)
+
+    def test_json_default_float(self):
+        # Call
+        fast, expected = _both(json_dumps, {'value': object()}, default=lambda obj: 1e-05)
+        # Tests
+        ntools.eq_(fast, expected)
+
+    def test_yaml(self):
+        # Call
+        fast, expected = _both(yaml_dump, DATA, default_flow_style=False)
+        # Tests
+        ntools.eq_(fast, expected)
+        ntools.eq_(_both(yaml_load, fast), (DATA, DATA))
+
+    def test_toml(self):
+        for data in ({k: DATA[k] for k in ('general', 'log', 'metrics')},
+                     {k: DATA[k] for k in ('general', 'quoted', 'list')}):
+            # Call
+            fast, expected = _both(toml_dumps, data)
+            # Tests
+            ntools.eq_(fast, expected)
@@ -16,7 +16,9 @@
 ===================================================
 """
 # Stdlib
-from unittest.mock import MagicMock
+import argparse
+import os
+from unittest.mock import MagicMock, patch
 
 # External
 import nose.tools as ntools
@@ -87,3 +89,54 @@ def assert_these_call_lists(mock, call_lists, any_order=False):
     for x in call_lists:
         calls.extend(x.call_list())
     assert_these_calls(mock, calls, any_order=any_order)
+
+
+def write_text(path, text):
+    """
+    Write text to path, creating the missing parent directories.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def read_text(path):
+    with open(path) as f:
+        return f.read()
+
+
+def read_tree(dir_):
+    """
+    Return the contents of all files below dir_, keyed by their path relative to dir_.
+    """
+    files = {}
+    for root, _, names in os.walk(dir_):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, dir_)] = f.read()
+    return files
+
+
+def generate_topology(out_dir, *argv, topo='Tiny.topo'):
+    """
+    Run the topology generator with the command line arguments argv into out_dir. The
+    certificates are not generated, as they need scion-pki, and the docker host address
+    is fixed.
+
+    :param str out_dir: The output directory.
+    :param str topo: The name of the topology file in the topology directory of the repo.
+    :returns: The ConfigGenerator of the run.
+    """
+    from topology.config import ConfigGenArgs, ConfigGenerator
+    from topology.generator import add_arguments
+    topo_path = os.path.join(os.path.dirname(__file__), '..', '..', 'topology', topo)
+    parser = add_arguments(argparse.ArgumentParser())
+    args = ConfigGenArgs(parser.parse_args(['-c', topo_path, '-o', out_dir,
+                                            '--crypto-cache', ''] + list(argv)))
+    with patch('topology.common.docker_ip', return_value='172.17.0.1'), \
+            patch('topology.cert.CertGenerator.generate'), \
+            patch('topology.cert.CertGenerator.distribute'):
+        gen = ConfigGenerator(args)
+        gen.generate_all()
+    return gen
@@ -0,0 +1,94 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`archive_test` --- topology.archive unit tests
+===================================================
+"""
+# Stdlib
+import os
+import tarfile
+import tempfile
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from test.testcommon import read_text, write_text
+from topology.archive import INDEX_NAME, extract, read_index, write_archive
+
+AS_DIR = os.path.join('ISD1', 'ASff00_0_110')
+
+
+def _populate(out):
+    write_text(os.path.join(out, 'as_list.yml'), 'ases')
+    write_text(os.path.join(out, 'ISD1', 'trcs', 'ISD1-V1.trc'), 'trc')
+    write_text(os.path.join(out, AS_DIR, 'topology.json'), 'topo')
+    os.makedirs(os.path.join(out, AS_DIR, 'cs1-ff00_0_110-1'))
+    os.link(os.path.join(out, AS_DIR, 'topology.json'),
+            os.path.join(out, AS_DIR, 'cs1-ff00_0_110-1', 'topology.json'))
+    write_text(os.path.join(out, 'ISD1', 'ASff00_0_111', 'topology.json'), 'other')
+
+
+class TestWriteArchive(object):
+    """
+    Unit tests for topology.archive.write_archive
+    """
+    def test_index(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            _populate(out)
+            path = os.path.join(dir_, 'gen.tar.gz')
+            # Call
+            write_archive(out, path)
+            # Tests
+            index = read_index(path)
+            ntools.eq_(sorted(index), ['', 'ISD1', AS_DIR, 'ISD1/ASff00_0_111'])
+            with tarfile.open(path) as tar:
+                names = tar.getnames()
+            ntools.eq_(names[0], INDEX_NAME)
+            ntools.ok_(names.index('ISD1/trcs/ISD1-V1.trc') < names.index(AS_DIR))
+
+
+class TestExtract(object):
+    """
+    Unit tests for topology.archive.extract
+    """
+    def test_as_dir(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            _populate(out)
+            path = os.path.join(dir_, 'gen.tar')
+            write_archive(out, path)
+            dest = os.path.join(dir_, 'dest')
+            # Call
+            extract(path, dest, [AS_DIR])
+            # Tests
+            ntools.eq_(sorted(os.listdir(dest)), ['ISD1'])
+            ntools.eq_(os.listdir(os.path.join(dest, 'ISD1')), ['ASff00_0_110'])
+            ntools.eq_(read_text(os.path.join(dest, AS_DIR, 'cs1-ff00_0_110-1', 'topology.json')),
+                       'topo')
+
+    def test_all(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            _populate(out)
+            path = os.path.join(dir_, 'gen.tar')
+            write_archive(out, path)
+            dest = os.path.join(dir_, 'dest')
+            # Call
+            extract(path, dest)
+            # Tests
+            ntools.eq_(sorted(os.listdir(dest)), ['ISD1', 'as_list.yml'])
+            ntools.eq_(read_text(os.path.join(dest, 'ISD1', 'ASff00_0_111', 'topology.json')),
+                       'other')
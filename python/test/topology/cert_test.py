@@ -0,0 +1,90 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`cert_test` --- topology.cert unit tests
+=============================================
+"""
+# Stdlib
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from test.testcommon import read_text, write_text
+from topology.cert import PKI_PATH, CertGenerator
+from topology.crypto_cache import CryptoCache
+from topology.profiling import Profiler
+
+
+class TestCertGeneratorGenerate(object):
+    """
+    Unit tests for topology.cert.CertGenerator.generate
+    """
+    @patch("topology.cert.CertGenerator._pki", autospec=True)
+    def test_cached(self, pki):
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            cache_dir = os.path.join(dir_, 'cache')
+            args = SimpleNamespace(profiler=Profiler(enabled=False), crypto_cache=cache_dir,
+                                   output_dir=out, config={'ASes': {'1-ff00:0:110': {}}},
+                                   topo_config='test.topo', cert_jobs=1, link_duplicates=False)
+            cache = CryptoCache(cache_dir, out, PKI_PATH)
+            write_text(os.path.join(out, 'ISD1', 'trcs', 'ISD1-V1.trc'), 'trc')
+            cache.store('1', cache.isd_key('1', args.config))
+            # Call
+            CertGenerator(args).generate({}, ['1'])
+        # Tests
+        ntools.eq_([call[0][2:4] for call in pki.call_args_list], [('tmpl', 'topo')])
+
+
+class TestCertGeneratorCopyElem(object):
+    """
+    Unit tests for topology.cert.CertGenerator._copy_elem
+    """
+    def _regenerate(self, link_duplicates):
+        with tempfile.TemporaryDirectory() as dir_:
+            as_dir = os.path.join(dir_, 'ISD1', 'ASff00_0_110')
+            elem_dir = os.path.join(as_dir, 'cs1-ff00_0_110-1')
+            trc = os.path.join(dir_, 'ISD1', 'trcs', 'ISD1-V1.trc')
+            write_text(os.path.join(as_dir, 'certs', 'ISD1-ASff00_0_110-V1.crt'), 'old crt')
+            write_text(os.path.join(as_dir, 'keys', 'as-signing.key'), 'old key')
+            write_text(trc, 'old trc')
+            gen = CertGenerator(SimpleNamespace(link_duplicates=link_duplicates))
+            copy = (elem_dir, ('certs', 'keys'), [trc])
+            gen._copy_elem(copy)
+            # The crypto material is regenerated, the element directory is kept.
+            for path in os.listdir(os.path.join(as_dir, 'keys')):
+                os.remove(os.path.join(as_dir, 'keys', path))
+            write_text(os.path.join(as_dir, 'keys', 'as-signing-v2.key'), 'new key')
+            os.remove(trc)
+            write_text(trc, 'new trc')
+            write_text(os.path.join(as_dir, 'certs', 'ISD1-ASff00_0_110-V1.crt'), 'new crt')
+            # Call
+            gen._copy_elem(copy)
+            # Tests
+            ntools.eq_(read_text(os.path.join(elem_dir, 'certs', 'ISD1-ASff00_0_110-V1.crt')),
+                       'new crt')
+            ntools.eq_(read_text(os.path.join(elem_dir, 'certs', 'ISD1-V1.trc')), 'new trc')
+            ntools.eq_(os.listdir(os.path.join(elem_dir, 'keys')), ['as-signing-v2.key'])
+            ntools.eq_(read_text(trc), 'new trc')
+
+    def test_copy(self):
+        self._regenerate(False)
+
+    def test_link(self):
+        self._regenerate(True)
@@ -0,0 +1,69 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`common_test` --- topology.common unit tests
+=================================================
+"""
+# Stdlib
+from types import SimpleNamespace
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from topology.common import TopoID, disp_addr_elem, disp_names
+
+TOPO_ID = TopoID('1-ff00:0:110')
+TOPO = SimpleNamespace(border_routers={'br1-ff00_0_110-1': None, 'br1-ff00_0_110-2': None},
+                       control_services={'cs1-ff00_0_110-1': None})
+
+
+class TestDispNames(object):
+    """
+    Unit tests for topology.common.disp_names
+    """
+    def test_per_service(self):
+        args = SimpleNamespace(docker_per_as=False, shared_dispatcher=False, sig=True)
+        # Call
+        names = disp_names(args, TOPO_ID, TOPO)
+        # Tests
+        ntools.eq_(names, ['disp_br1-ff00_0_110-1', 'disp_br1-ff00_0_110-2',
+                           'disp_cs1-ff00_0_110-1', 'disp_sig_1-ff00_0_110'])
+
+    def test_shared(self):
+        args = SimpleNamespace(docker_per_as=False, shared_dispatcher=True, sig=True)
+        # Call
+        names = disp_names(args, TOPO_ID, TOPO)
+        # Tests
+        ntools.eq_(names, ['disp_br1-ff00_0_110-1', 'disp_br1-ff00_0_110-2',
+                           'disp_1-ff00_0_110'])
+
+    def test_per_as(self):
+        args = SimpleNamespace(docker_per_as=True, shared_dispatcher=False, sig=False)
+        # Call
+        names = disp_names(args, TOPO_ID, TOPO)
+        # Tests
+        ntools.eq_(names, ['disp_1-ff00_0_110'])
+
+
+class TestDispAddrElem(object):
+    """
+    Unit tests for topology.common.disp_addr_elem
+    """
+    def test(self):
+        for name, elem in (('disp_br1-ff00_0_110-12', 'br1-ff00_0_110-12_ctrl'),
+                           ('disp_cs1-ff00_0_110-1', 'cs1-ff00_0_110-1'),
+                           ('disp_sig_1-ff00_0_110', 'sig1-ff00_0_110'),
+                           ('disp_1-ff00_0_110', 'cs1-ff00_0_110-1')):
+            ntools.eq_(disp_addr_elem(TOPO_ID, name), elem)
@@ -0,0 +1,89 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`crypto_cache_test` --- topology.crypto_cache unit tests
+=============================================================
+"""
+# Stdlib
+import os
+import tempfile
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from test.testcommon import read_text, write_text
+from topology.crypto_cache import CryptoCache
+
+TOPO = {'ASes': {
+    '1-ff00:0:110': {'core': True, 'voting': True, 'issuing': True, 'authoritative': True},
+    '1-ff00:0:111': {'cert_issuer': '1-ff00:0:110'},
+    '2-ff00:0:210': {'core': True, 'voting': True, 'issuing': True, 'authoritative': True},
+}}
+
+
+class TestCryptoCacheIsdKey(object):
+    """
+    Unit tests for topology.crypto_cache.CryptoCache.isd_key
+    """
+    def test_pki_attrs(self):
+        cache = CryptoCache('cache', 'gen', 'missing')
+        mtu = {'ASes': dict(TOPO['ASes'], **{'1-ff00:0:111': {
+            'cert_issuer': '1-ff00:0:110', 'mtu': 1400}})}
+        issuer = {'ASes': dict(TOPO['ASes'], **{'1-ff00:0:111': {}})}
+        # Call
+        key = cache.isd_key('1', TOPO)
+        # Tests
+        ntools.eq_(cache.isd_key('1', mtu), key)
+        ntools.assert_not_equal(cache.isd_key('1', issuer), key)
+        ntools.assert_not_equal(cache.isd_key('2', TOPO), key)
+
+    def test_other_isd(self):
+        cache = CryptoCache('cache', 'gen', 'missing')
+        added = {'ASes': dict(TOPO['ASes'], **{'2-ff00:0:211': {}})}
+        # Tests
+        ntools.eq_(cache.isd_key('1', added), cache.isd_key('1', TOPO))
+
+
+class TestCryptoCacheStore(object):
+    """
+    Unit tests for topology.crypto_cache.CryptoCache.store
+    """
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            cache = CryptoCache(os.path.join(dir_, 'cache'), out, 'missing')
+            as_dir = os.path.join(out, 'ISD1', 'ASff00_0_110')
+            write_text(os.path.join(as_dir, 'keys', 'master0.key'), 'master')
+            write_text(os.path.join(as_dir, 'as-v1.toml'), 'tmpl')
+            write_text(os.path.join(as_dir, 'pub', 'ISD1-ASff00_0_110-as-signing-v1.pub'), 'pub')
+            write_text(os.path.join(as_dir, 'cs1-ff00_0_110-1', 'cs.toml'), 'config')
+            write_text(os.path.join(out, 'ISD1', 'trcs', 'ISD1-V1.trc'), 'trc')
+            old_key = cache.isd_key('1', {'ASes': {}})
+            cache.store('1', old_key)
+            key = cache.isd_key('1', TOPO)
+            # Call
+            cache.store('1', key)
+            # Tests
+            ntools.assert_is_none(cache.lookup('1', old_key))
+            entry = cache.lookup('1', key)
+            ntools.ok_(entry)
+            ntools.assert_false(os.path.exists(os.path.join(entry, 'ASff00_0_110',
+                                                            'cs1-ff00_0_110-1')))
+            write_text(os.path.join(as_dir, 'keys', 'master0.key'), 'changed')
+            cache.restore('1', entry)
+            ntools.eq_(read_text(os.path.join(as_dir, 'keys', 'master0.key')), 'master')
+            ntools.eq_(read_text(os.path.join(out, 'ISD1', 'trcs', 'ISD1-V1.trc')), 'trc')
+            ntools.ok_(os.path.exists(os.path.join(entry, 'ASff00_0_110', 'pub',
+                                                   'ISD1-ASff00_0_110-as-signing-v1.pub')))
@@ -0,0 +1,143 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`docker_test` --- topology.docker unit tests
+=================================================
+"""
+# Stdlib
+import json
+import os
+import tempfile
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.util import load_yaml_file
+from test.testcommon import generate_topology
+from topology.common import DOCKER_DISP_SOCK, DOCKER_HEALTHCHECK
+from topology.docker import DOCKER_CONF, DOCKER_SHARD_CONF, DOCKER_SHARDS_CONF
+from topology.prometheus import CS_PROM_PORT, DEFAULT_BR_PROM_PORT, SCIOND_PROM_PORT
+
+PROM_PORTS = (
+    ('scion_br', DEFAULT_BR_PROM_PORT),
+    ('scion_cs', CS_PROM_PORT),
+    ('scion_sd', SCIOND_PROM_PORT),
+    ('scion_as', SCIOND_PROM_PORT),
+)
+
+
+class TestDockerGeneratorHealthchecks(object):
+    """
+    Unit tests for the healthchecks and the dependencies of topology.docker.DockerGenerator
+    """
+    def _services(self, *argv):
+        with tempfile.TemporaryDirectory() as dir_:
+            generate_topology(dir_, '-d', *argv)
+            return load_yaml_file(os.path.join(dir_, DOCKER_CONF))['services']
+
+    def _addrs(self, services, name):
+        """
+        Return the addresses of the network namespace of a service.
+        """
+        service = services[name]
+        mode = service.get('network_mode')
+        if mode:
+            return self._addrs(services, mode[len('service:'):])
+        return [addr for net in service['networks'].values() for addr in net.values()]
+
+    def _check(self, services):
+        probed = set()
+        for name, service in services.items():
+            for prefix, port in PROM_PORTS:
+                if not name.startswith(prefix):
+                    continue
+                test = service['healthcheck']['test']
+                ntools.eq_(test[:3], ['CMD', DOCKER_HEALTHCHECK, '-http'], name)
+                host, _, probe_port = test[3].rpartition(':')
+                ntools.eq_(probe_port, str(port), name)
+                # The AS container adds the other addresses of the AS itself.
+                if prefix != 'scion_as':
+                    ntools.assert_in(host.strip('[]'), self._addrs(services, name), name)
+                probed.add(prefix)
+            if name.startswith('scion_disp_'):
+                ntools.eq_(service['healthcheck']['test'],
+                           ['CMD', DOCKER_HEALTHCHECK, '-unix', DOCKER_DISP_SOCK], name)
+                probed.add('scion_disp_')
+            for dep, cond in service.get('depends_on', {}).items():
+                ntools.eq_(cond, {'condition': 'service_healthy'}, name)
+                ntools.assert_in('healthcheck', services[dep], name)
+        return probed
+
+    def test_per_service(self):
+        # Call
+        services = self._services()
+        # Tests
+        ntools.eq_(self._check(services),
+                   {'scion_br', 'scion_cs', 'scion_sd', 'scion_disp_'})
+        ntools.eq_(services['scion_cs1-ff00_0_110-1']['depends_on'],
+                   {'scion_disp_cs1-ff00_0_110-1': {'condition': 'service_healthy'}})
+
+    def test_per_as(self):
+        # Call
+        services = self._services('--docker-per-as')
+        # Tests
+        ntools.eq_(self._check(services), {'scion_as'})
+
+
+class TestDockerGeneratorShards(object):
+    """
+    Unit tests for the sharded compose projects of topology.docker.DockerGenerator
+    """
+    def _confs(self, *argv):
+        with tempfile.TemporaryDirectory() as dir_:
+            generate_topology(dir_, '-d', *argv)
+            main = load_yaml_file(os.path.join(dir_, DOCKER_CONF))
+            if not os.path.exists(os.path.join(dir_, DOCKER_SHARDS_CONF)):
+                return main, None, {}
+            with open(os.path.join(dir_, DOCKER_SHARDS_CONF)) as f:
+                index = json.load(f)
+            shards = {shard: load_yaml_file(os.path.join(dir_, path))
+                      for shard, path in index['shards'].items()}
+            return main, index, shards
+
+    def test_shards(self):
+        # Call
+        main, index, shards = self._confs('--docker-shards', '1')
+        plain, _, _ = self._confs()
+        # Tests
+        ntools.eq_(index, {'shards': {shard: DOCKER_SHARD_CONF % shard
+                                      for shard in ('g000', 'g001', 'g002')}})
+        services = set(main['services'])
+        for shard, conf in shards.items():
+            ntools.eq_(services & set(conf['services']), set(), shard)
+            services.update(conf['services'])
+            used = {net for service in conf['services'].values()
+                    for net in service.get('networks', {})}
+            ntools.eq_(set(conf['networks']), used, shard)
+            for net, net_conf in conf['networks'].items():
+                if net in main['networks']:
+                    ntools.eq_(net_conf, {'external': True, 'name': net}, shard)
+                else:
+                    ntools.assert_not_in('external', net_conf, shard)
+            for vol, vol_conf in conf['volumes'].items():
+                ntools.eq_(vol_conf, {'name': vol}, shard)
+                ntools.eq_(main['volumes'][vol], vol_conf, shard)
+        ntools.eq_(services, set(plain['services']))
+        # The main compose file declares exactly the networks used by several shards.
+        shared = {net for net in main['networks']
+                  if sum(net in conf['networks'] for conf in shards.values()) > 1}
+        ntools.eq_(shared, set(main['networks']))
+        for net, net_conf in main['networks'].items():
+            ntools.eq_(net_conf['name'], net)
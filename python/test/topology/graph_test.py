@@ -0,0 +1,76 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`graph_test` --- topology.graph unit tests
+===============================================
+"""
+# Stdlib
+from ipaddress import ip_interface, ip_network
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from topology.common import TopoID
+from topology.graph import TopoGraph
+
+
+def _graph():
+    graph = TopoGraph()
+    core1, core2, leaf = TopoID('1-ff00:0:110'), TopoID('2-ff00:0:210'), TopoID('1-ff00:0:111')
+    graph.add_as(core1, True)
+    graph.add_as(core2, True)
+    graph.add_as(leaf, False)
+    graph.add_link(core1, leaf, 'CHILD', 'br1-ff00_0_110-1', 1)
+    graph.add_link(leaf, core1, 'PARENT', 'br1-ff00_0_111-1', 41)
+    graph.add_link(core1, core2, 'CORE', 'br1-ff00_0_110-1', 2)
+    graph.add_link(core2, core1, 'CORE', 'br2-ff00_0_210-1', 1)
+    return graph, core1, core2, leaf
+
+
+class TestTopoGraph(object):
+    """
+    Unit tests for topology.graph.TopoGraph
+    """
+    def test_cores(self):
+        graph, core1, core2, leaf = _graph()
+        # Tests
+        ntools.eq_(graph.cores(), [core1, core2])
+        ntools.eq_(graph.cores('1'), [core1])
+        ntools.eq_(graph.cores('3'), [])
+        ntools.ok_(not graph.is_core(leaf))
+
+    def test_neighbors(self):
+        graph, core1, core2, leaf = _graph()
+        # Tests
+        ntools.eq_(graph.neighbors(core1), [leaf, core2])
+        ntools.eq_(graph.neighbors(core1, 'child'), [leaf])
+        ntools.eq_(graph.neighbors(leaf, 'PARENT'), [core1])
+        ntools.eq_(graph.border_routers(core1), {'br1-ff00_0_110-1': [1, 2]})
+        ntools.eq_(graph.interfaces(leaf), {41: ('br1-ff00_0_111-1', core1, 'PARENT')})
+
+    def test_networks(self):
+        graph, core1, core2, leaf = _graph()
+        net1, net2 = ip_network('10.0.0.0/29'), ip_network('10.0.0.8/29')
+        # The SIG networks are allocated in a different order than the ASes.
+        graph.index_networks({
+            net1: {'sig2-ff00_0_210': ip_interface('10.0.0.1/29')},
+            net2: {'sig1-ff00_0_110': ip_interface('10.0.0.9/29'),
+                   'sd1-ff00_0_110': ip_interface('10.0.0.10/29')},
+        })
+        # Tests
+        ntools.eq_(str(graph.elem_addr('sd1-ff00_0_110').ip), '10.0.0.10')
+        ntools.assert_is_none(graph.elem_addr('sd1-ff00_0_111'))
+        ntools.eq_(graph.sig_nets(), [(core1, net2), (core2, net1)])
+        ntools.eq_(graph.sig_nets(net_order=True), [(core2, net1), (core1, net2)])
@@ -0,0 +1,155 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`launcher_test` --- topology.launcher unit tests
+=====================================================
+"""
+# Stdlib
+import os
+import tempfile
+from unittest.mock import patch
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from test.testcommon import write_text
+from topology.launcher import Launcher, Service, plan_waves
+
+AS_DIR = os.path.join('ISD1', 'ASff00_0_110')
+
+
+def _metrics(addr):
+    return '[metrics]\nprometheus = "%s"\n' % addr
+
+
+class TestLauncherServices(object):
+    """
+    Unit tests for topology.launcher.Launcher.services
+    """
+    def test_supervisor(self):
+        with tempfile.TemporaryDirectory() as gen:
+            write_text(os.path.join(gen, 'dispatcher', 'disp.toml'), _metrics('[127.0.0.1]:30441'))
+            write_text(os.path.join(gen, AS_DIR, 'br1-ff00_0_110-1', 'br.toml'),
+                       _metrics('[127.0.0.9]:30442'))
+            write_text(os.path.join(gen, AS_DIR, 'cs1-ff00_0_110-1', 'cs.toml'),
+                       _metrics('[127.0.0.10]:30452'))
+            write_text(os.path.join(gen, AS_DIR, 'endhost', 'sd.toml'), _metrics('0.0.0.0:30455'))
+            # Call
+            services = Launcher(gen, 1, 1).services()
+        # Tests
+        ntools.eq_(sorted(services), ['br1-ff00_0_110-1', 'cs1-ff00_0_110-1', 'dispatcher',
+                                      'sd1-ff00_0_110'])
+        ntools.eq_(services['dispatcher'].deps, [])
+        ntools.eq_(services['cs1-ff00_0_110-1'].deps, ['br1-ff00_0_110-1', 'dispatcher'])
+        ntools.eq_(services['sd1-ff00_0_110'].deps, ['cs1-ff00_0_110-1', 'dispatcher'])
+        ntools.eq_(services['br1-ff00_0_110-1'].metrics, '[127.0.0.9]:30442')
+        ntools.assert_is_none(services['sd1-ff00_0_110'].metrics)
+
+    def test_docker_per_as(self):
+        with tempfile.TemporaryDirectory() as gen:
+            as_dir = os.path.join(gen, AS_DIR)
+            write_text(os.path.join(gen, 'scion-dc.yml'),
+                       'services:\n'
+                       '  scion_as1-ff00_0_110:\n'
+                       '    volumes: ["%s:%s:ro"]\n' % (as_dir, as_dir))
+            write_text(os.path.join(as_dir, 'br1-ff00_0_110-1', 'br.toml'),
+                       _metrics('[172.20.0.2]:30442'))
+            write_text(os.path.join(as_dir, 'disp_1-ff00_0_110', 'disp.toml'),
+                       _metrics('[172.20.0.3]:30441'))
+            write_text(os.path.join(as_dir, 'endhost', 'sd.toml'), _metrics('172.20.0.4:30455'))
+            # Call
+            services = Launcher(gen, 1, 1).services()
+        # Tests
+        ntools.eq_(sorted(services), ['scion_as1-ff00_0_110'])
+        ntools.eq_(services['scion_as1-ff00_0_110'].kind, 'sd')
+        ntools.eq_(services['scion_as1-ff00_0_110'].metrics, '172.20.0.4:30455')
+        ntools.eq_(services['scion_as1-ff00_0_110'].deps, [])
+
+
+class TestLauncherWaitReady(object):
+    """
+    Unit tests for topology.launcher.Launcher._wait_ready
+    """
+    def _wave(self, gen, timeout):
+        write_text(os.path.join(gen, 'scion-dc.yml'),
+                   'services:\n'
+                   '  scion_br1-ff00_0_110-1:\n'
+                   '    container_name: scion_br1-ff00_0_110-1\n'
+                   '    healthcheck: {test: [CMD, /sbin/healthcheck]}\n'
+                   '  scion_co1-ff00_0_110-1:\n'
+                   '    container_name: scion_co1-ff00_0_110-1\n')
+        launcher = Launcher(gen, 1, timeout)
+        project = launcher.projects[0]
+        wave = [Service('scion_br1-ff00_0_110-1', 'br', '[172.20.0.2]:30442', project),
+                Service('scion_co1-ff00_0_110-1', 'co', '[172.20.0.3]:30453', project)]
+        return launcher, wave
+
+    @patch("topology.launcher._ready", autospec=True)
+    @patch("topology.launcher._healthy", autospec=True)
+    def test_docker(self, healthy, ready):
+        healthy.return_value = {'scion_br1-ff00_0_110-1'}
+        with tempfile.TemporaryDirectory() as gen:
+            launcher, wave = self._wave(gen, 1)
+            # Call
+            ntools.ok_(launcher._wait_ready(wave))
+        # Tests
+        healthy.assert_called_once_with(['scion_br1-ff00_0_110-1'])
+        ntools.assert_false(ready.called)
+
+    @patch("topology.launcher._healthy", autospec=True)
+    def test_timeout(self, healthy):
+        healthy.return_value = set()
+        with tempfile.TemporaryDirectory() as gen:
+            launcher, wave = self._wave(gen, 0)
+            # Call
+            ntools.assert_false(launcher._wait_ready(wave))
+
+
+class TestLauncherUp(object):
+    """
+    Unit tests for topology.launcher.Launcher.up
+    """
+    @patch("topology.launcher._supervisor_programs", autospec=True)
+    @patch("topology.launcher.Launcher._wait_ready", autospec=True)
+    @patch("topology.launcher.Launcher._start", autospec=True)
+    def test_not_ready(self, start, wait_ready, programs):
+        wait_ready.side_effect = [False, True]
+        with tempfile.TemporaryDirectory() as gen:
+            write_text(os.path.join(gen, AS_DIR, 'br1-ff00_0_110-1', 'br.toml'),
+                       _metrics('[127.0.0.9]:30442'))
+            write_text(os.path.join(gen, AS_DIR, 'cs1-ff00_0_110-1', 'cs.toml'),
+                       _metrics('[127.0.0.10]:30452'))
+            # Call
+            ntools.assert_raises(SystemExit, Launcher(gen, 1, 1).up)
+        # Tests
+        ntools.eq_(start.call_count, 2)
+
+
+class TestPlanWaves(object):
+    """
+    Unit tests for topology.launcher.plan_waves
+    """
+    def test(self):
+        services = {}
+        for name, kind, deps in (('sd', 'sd', ['cs', 'disp_cs']), ('cs', 'cs', ['br', 'disp_cs']),
+                                 ('br', 'br', ['disp_br']), ('disp_br', 'disp', []),
+                                 ('disp_cs', 'disp', [])):
+            services[name] = Service(name, kind, None)
+            services[name].deps = deps
+        # Call
+        waves = plan_waves(services)
+        # Tests
+        ntools.eq_([sorted(s.name for s in wave) for wave in waves],
+                   [['disp_br', 'disp_cs'], ['br'], ['cs'], ['sd']])
@@ -0,0 +1,148 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`manifest_test` --- topology.manifest unit tests
+=====================================================
+"""
+# Stdlib
+import copy
+import json
+import os
+import tempfile
+
+# External packages
+import nose.tools as ntools
+import yaml
+
+# SCION
+from lib.defines import MANIFEST_FILE
+from lib.util import load_yaml_file
+from test.testcommon import generate_topology, read_text, write_text
+from topology.manifest import Manifest
+
+TINY = load_yaml_file(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'topology',
+                                   'Tiny.topo'))
+AS_110 = os.path.join('ISD1', 'ASff00_0_110')
+AS_112 = os.path.join('ISD1', 'ASff00_0_112')
+
+
+class TestIncremental(object):
+    """
+    Unit tests for topology.manifest.Manifest and the incremental generation of
+    topology.config.ConfigGenerator.
+    """
+    def _generate(self, dir_, topo, *argv):
+        """
+        Run the generator with --incremental, and return the manifests before and after.
+        """
+        out = os.path.join(dir_, 'gen')
+        path = os.path.join(dir_, 'test.topo')
+        write_text(path, yaml.dump(topo))
+        old = Manifest.load(os.path.join(out, MANIFEST_FILE))
+        generate_topology(out, '--incremental', *argv, topo=path)
+        return old, Manifest.load(os.path.join(out, MANIFEST_FILE))
+
+    def _mark(self, dir_, as_dir):
+        """
+        Create a file in an AS directory, which is kept unless the directory is removed.
+        """
+        write_text(os.path.join(dir_, 'gen', as_dir, 'marker'), 'marker')
+
+    def _marked(self, dir_, as_dir):
+        return os.path.exists(os.path.join(dir_, 'gen', as_dir, 'marker'))
+
+    def test_link_edit(self):
+        topo = copy.deepcopy(TINY)
+        topo['links'][0]['mtu'] = 1300
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            self._mark(dir_, AS_112)
+            # Call
+            old, new = self._generate(dir_, topo)
+            # Tests
+            ntools.eq_(sorted(new.changed(old)), ['1-ff00:0:110', '1-ff00:0:111'])
+            ntools.assert_false(new.full_regen(old))
+            ntools.eq_(new.changed_isds(old), [])
+            ntools.ok_(self._marked(dir_, AS_112))
+            topo_json = json.loads(read_text(os.path.join(
+                dir_, 'gen', AS_110, 'br1-ff00_0_110-1', 'topology.json')))
+            ntools.eq_(topo_json['BorderRouters']['br1-ff00_0_110-1']['Interfaces']['1']['MTU'],
+                       1300)
+
+    def test_as_edit(self):
+        topo = copy.deepcopy(TINY)
+        topo['ASes']['1-ff00:0:112']['mtu'] = 1350
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            # Call
+            old, new = self._generate(dir_, topo)
+            # Tests
+            ntools.eq_(new.changed(old), ['1-ff00:0:112'])
+            ntools.eq_(new.changed_isds(old), [])
+
+    def test_pki_edit(self):
+        topo = copy.deepcopy(TINY)
+        topo['ASes']['1-ff00:0:112']['issuing'] = True
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            # Call
+            old, new = self._generate(dir_, topo)
+            # Tests
+            ntools.assert_false(new.full_regen(old))
+            ntools.eq_(new.changed_isds(old), ['1'])
+
+    def test_removed_as(self):
+        topo = copy.deepcopy(TINY)
+        del topo['ASes']['1-ff00:0:112']
+        topo['links'] = topo['links'][:1]
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            # Call
+            old, new = self._generate(dir_, topo)
+            # Tests
+            ntools.eq_(new.removed(old), ['1-ff00:0:112'])
+            ntools.assert_false(os.path.exists(os.path.join(dir_, 'gen', AS_112)))
+            ntools.ok_(os.path.exists(os.path.join(dir_, 'gen', AS_110)))
+
+    def test_changed_args(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            self._mark(dir_, AS_112)
+            # Call
+            old, new = self._generate(dir_, TINY, '--svcfrac', '0.5')
+            # Tests
+            ntools.ok_(new.full_regen(old))
+            ntools.assert_false(self._marked(dir_, AS_112))
+
+    def test_unchanged(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            self._generate(dir_, TINY)
+            self._mark(dir_, AS_112)
+            # Call
+            old, new = self._generate(dir_, TINY)
+            # Tests
+            ntools.eq_(new.changed(old), [])
+            ntools.eq_(new.changed_isds(old), [])
+            ntools.ok_(self._marked(dir_, AS_112))
+
+    def test_non_canonical_keys(self):
+        topo = copy.deepcopy(TINY)
+        topo['ASes']['1-FF00:0:112'] = topo['ASes'].pop('1-ff00:0:112')
+        topo['ASes']['1-ff00:0:0110'] = topo['ASes'].pop('1-ff00:0:110')
+        with tempfile.TemporaryDirectory() as dir_:
+            # Call
+            _, new = self._generate(dir_, topo)
+            # Tests
+            ntools.eq_(sorted(new.ases), ['1-ff00:0:110', '1-ff00:0:111', '1-ff00:0:112'])
+            ntools.ok_(os.path.exists(os.path.join(dir_, 'gen', AS_112)))
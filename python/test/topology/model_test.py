@@ -0,0 +1,63 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`model_test` --- topology.model unit tests
+===============================================
+"""
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.defines import SCION_ROUTER_PORT
+from topology.common import TopoID
+from topology.model import AS, Address, BorderRouter, Interface, ServiceInstance
+
+
+class TestASToTopo(object):
+    """
+    Unit tests for topology.model.AS.to_topo
+    """
+    def test_layout(self):
+        as_topo = AS(TopoID('1-ff00:0:110'), ['core'], 1472, 'UDP/IPv4', sig=True)
+        as_topo.control_services['cs1'] = ServiceInstance(
+            'cs1', Address('IPv4', '127.0.0.2', 30252))
+        br = BorderRouter('br1', Address('IPv4', '127.0.0.3', 30242),
+                          Address('IPv4', '127.0.0.4', 30042))
+        br.interfaces[1] = Interface('UDP/IPv4', '127.0.0.5', '127.0.0.6', 1000,
+                                     '1-ff00:0:111', 'CHILD', 1280)
+        as_topo.border_routers['br1'] = br
+        # Call
+        topo = as_topo.to_topo()
+        # Tests
+        ntools.eq_(list(topo), ['Attributes', 'ISD_AS', 'MTU', 'Overlay', 'ControlService',
+                                'BorderRouters', 'ColibriService', 'SIG'])
+        ntools.eq_(topo['ISD_AS'], '1-ff00:0:110')
+        ntools.eq_(topo['ControlService']['cs1'], {
+            'Addrs': {'IPv4': {'Public': {'Addr': '127.0.0.2', 'L4Port': 30252}}}})
+        br_topo = topo['BorderRouters']['br1']
+        ntools.eq_(br_topo['InternalAddrs'], {
+            'IPv4': {'PublicOverlay': {'Addr': '127.0.0.4', 'OverlayPort': 30042}}})
+        ntools.eq_(br_topo['Interfaces'][1]['RemoteOverlay'], {
+            'Addr': '127.0.0.6', 'OverlayPort': SCION_ROUTER_PORT})
+        ntools.eq_(topo['SIG'], {})
+        ntools.ok_(as_topo.core)
+
+    def test_no_sig(self):
+        as_topo = AS(TopoID('1-ff00:0:111'), [], 1472, 'UDP/IPv4')
+        # Call
+        topo = as_topo.to_topo()
+        # Tests
+        ntools.assert_not_in('SIG', topo)
+        ntools.eq_(as_topo.sigs, {})
+        ntools.ok_(not as_topo.core)
@@ -0,0 +1,184 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`net_test` --- topology.net unit tests
+===========================================
+"""
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.defines import DEFAULT6_NETWORK
+from topology.net import (
+    DEFAULT_NETWORK,
+    AddressProxy,
+    ComputedSubnetGenerator,
+    PortGenerator,
+    SubnetGenerator,
+)
+
+
+SUBNETS = (('as1', ('cs1', 'br1', 'sd1')), ('link1', ('br1', 'br2')), ('link2', ('br1', 'br3')))
+
+
+def _alloc(docker, allocated=None, subnets=SUBNETS):
+    subnet_gen = SubnetGenerator(DEFAULT_NETWORK, docker, False, allocated)
+    for location, elems in subnets:
+        subnet = subnet_gen.register(location)
+        for elem in elems:
+            subnet.register(elem)
+    networks = subnet_gen.alloc_subnets()
+    return [(str(net), {elem: str(intf) for elem, intf in elems.items()})
+            for net, elems in networks.items()]
+
+
+class TestSubnetGeneratorAllocSubnets(object):
+    """
+    Unit tests for topology.net.SubnetGenerator.alloc_subnets
+    """
+    def test_local(self):
+        # Call
+        networks = _alloc(False)
+        # Tests
+        ntools.eq_(networks, [
+            ('127.0.0.8/29', {'br1': '127.0.0.9/29', 'cs1': '127.0.0.10/29',
+                              'sd1': '127.0.0.11/29'}),
+            ('127.0.0.4/31', {'br1': '127.0.0.4/31', 'br2': '127.0.0.5/31'}),
+            ('127.0.0.6/31', {'br1': '127.0.0.6/31', 'br3': '127.0.0.7/31'}),
+        ])
+
+    def test_docker(self):
+        # Call
+        networks = _alloc(True)
+        # Tests
+        ntools.eq_(networks, [
+            ('172.20.0.0/29', {'br1': '172.20.0.2/29', 'cs1': '172.20.0.3/29',
+                               'sd1': '172.20.0.4/29'}),
+            ('172.20.0.8/29', {'br1': '172.20.0.10/29', 'br2': '172.20.0.11/29'}),
+            ('172.20.0.16/29', {'br1': '172.20.0.18/29', 'br3': '172.20.0.19/29'}),
+        ])
+
+    def test_kept(self):
+        allocated = {
+            'as1': {'net': '127.0.0.16/29', 'addrs': {'cs1': '127.0.0.18/29'}},
+            'link1': {'net': '127.0.0.4/31', 'addrs': {}},
+        }
+        # Call
+        networks = _alloc(False, allocated, (('as0', ('cs0', 'sd0')),
+                                             ('as1', ('cs1', 'br1', 'sd1')),
+                                             ('link1', ('br1', 'br2'))))
+        # Tests
+        ntools.eq_(networks, [
+            ('127.0.0.6/31', {'cs0': '127.0.0.6/31', 'sd0': '127.0.0.7/31'}),
+            ('127.0.0.16/29', {'br1': '127.0.0.17/29', 'cs1': '127.0.0.18/29',
+                               'sd1': '127.0.0.19/29'}),
+            ('127.0.0.4/31', {'br1': '127.0.0.4/31', 'br2': '127.0.0.5/31'}),
+        ])
+
+    def test_kept_too_small(self):
+        allocated = {'as1': {'net': '127.0.0.4/31', 'addrs': {}}}
+        # Call
+        networks = _alloc(False, allocated, (('as1', ('cs1', 'br1', 'sd1')),))
+        # Tests
+        ntools.eq_(networks, [
+            ('127.0.0.8/29', {'br1': '127.0.0.9/29', 'cs1': '127.0.0.10/29',
+                              'sd1': '127.0.0.11/29'}),
+        ])
+
+
+class TestPortGeneratorRegister(object):
+    """
+    Unit tests for topology.net.PortGenerator.register
+    """
+    def test_per_addr(self):
+        port_gen = PortGenerator()
+        addr1, addr2 = AddressProxy(), AddressProxy()
+        # Call
+        ports = [port_gen.register(id_, addr) for id_, addr in (
+            ('br1_ctrl', addr1), ('br1_internal', addr1), ('cs1', addr2))]
+        # Tests
+        ntools.eq_(ports, [31000, 31002, 31000])
+
+    def test_kept(self):
+        port_gen = PortGenerator({'cs1': 31000, 'cs1quic': 31001})
+        addr = AddressProxy()
+        # Call
+        ports = [port_gen.register(id_, addr) for id_ in ('br1', 'cs1')]
+        # Tests
+        ntools.eq_(ports, [31002, 31000])
+        ntools.eq_(port_gen.allocated(), {'br1': 31002, 'br1quic': 31003, 'cs1': 31000,
+                                          'cs1quic': 31001})
+
+    def test_exhausted(self):
+        port_gen = PortGenerator()
+        addr = AddressProxy()
+        for i in range((port_gen.END_PORT - port_gen.FIRST_PORT) // 2):
+            port_gen.register('elem%d' % i, addr)
+        # Tests
+        ntools.assert_raises(SystemExit, port_gen.register, 'elem', addr)
+
+
+def _alloc_computed(network, ases, links=()):
+    subnet_gen = ComputedSubnetGenerator(network, False, False)
+    for index, (location, elems) in enumerate(ases):
+        subnet = subnet_gen.register(location, index)
+        for elem in elems:
+            subnet.register(elem)
+    for index, (location, elems) in enumerate(links):
+        subnet = subnet_gen.register(location, index, link=True)
+        for elem in elems:
+            subnet.register(elem)
+    networks = subnet_gen.alloc_subnets()
+    return {str(net): {elem: str(intf) for elem, intf in elems.items()}
+            for net, elems in networks.items()}
+
+
+class TestComputedSubnetGeneratorAllocSubnets(object):
+    """
+    Unit tests for topology.net.ComputedSubnetGenerator.alloc_subnets
+    """
+    def test_local(self):
+        # Call
+        networks = _alloc_computed(DEFAULT_NETWORK, [('as1', ('cs1', 'br1')), ('as2', ('cs2',))],
+                                   [('link1', ('br1', 'br2'))])
+        # Tests
+        ntools.eq_(networks, {
+            '127.0.1.0/24': {'br1': '127.0.1.1/24', 'cs1': '127.0.1.2/24'},
+            '127.0.2.0/24': {'cs2': '127.0.2.1/24'},
+            '127.128.0.0/31': {'br1': '127.128.0.0/31', 'br2': '127.128.0.1/31'},
+        })
+
+    def test_stable(self):
+        ases = [('as1', ('cs1', 'br1')), ('as2', ('cs2',))]
+        networks = _alloc_computed(DEFAULT_NETWORK, ases)
+        # Call
+        added = _alloc_computed(DEFAULT_NETWORK, ases + [('as3', ('cs3',))])
+        # Tests
+        ntools.eq_(added, dict(networks, **{'127.0.3.0/24': {'cs3': '127.0.3.1/24'}}))
+
+    def test_ipv6(self):
+        # Call
+        networks = _alloc_computed(DEFAULT6_NETWORK, [('as1', ('cs1',))],
+                                   [('link1', ('br1', 'br2'))])
+        # Tests
+        ntools.eq_(networks, {
+            'fd00:f00d:cafe::7f00:100/120': {'cs1': 'fd00:f00d:cafe::7f00:101/120'},
+            'fd00:f00d:cafe::7f80:0/127': {'br1': 'fd00:f00d:cafe::7f80:0/127',
+                                           'br2': 'fd00:f00d:cafe::7f80:1/127'},
+        })
+
+    def test_overflow(self):
+        # Tests
+        ntools.assert_raises(SystemExit, _alloc_computed, '10.0.0.0/16',
+                             [('as%d' % i, ('cs',)) for i in range(128)])
@@ -0,0 +1,75 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`parallel_test` --- topology.parallel unit tests
+=====================================================
+"""
+# Stdlib
+import os
+import shutil
+import tempfile
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from test.testcommon import generate_topology, read_tree
+from topology.parallel import map_shards
+
+
+def _shard_pids(topo_ids):
+    return topo_ids, os.getpid()
+
+
+class TestMapShards(object):
+    """
+    Unit tests for topology.parallel.map_shards
+    """
+    def test_order(self):
+        topo_ids = list(range(50))
+        # Call
+        results = map_shards(_shard_pids, topo_ids, 3)
+        # Tests
+        ntools.ok_(len(results) > 1)
+        ntools.eq_([i for shard, _ in results for i in shard], topo_ids)
+        ntools.ok_(all(pid != os.getpid() for _, pid in results))
+
+    def test_single_job(self):
+        # Call
+        results = map_shards(_shard_pids, [1, 2, 3], 1)
+        # Tests
+        ntools.eq_(results, [([1, 2, 3], os.getpid())])
+
+
+class TestParallelGeneration(object):
+    """
+    Tests that the generator writes the same files with and without --jobs.
+    """
+    def _generate(self, out, *argv):
+        shutil.rmtree(out, ignore_errors=True)
+        generate_topology(out, *argv)
+        return read_tree(out)
+
+    def test_identical(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            # The output directory is part of the generated paths, it is reused.
+            out = os.path.join(dir_, 'gen')
+            for argv in ((), ('-d',)):
+                expected = self._generate(out, *argv)
+                # Call
+                files = self._generate(out, '-j', '3', *argv)
+                # Tests
+                ntools.eq_(sorted(files), sorted(expected))
+                for path, content in expected.items():
+                    ntools.eq_(files[path], content, path)
@@ -0,0 +1,92 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`profiling_test` --- topology.profiling unit tests
+=======================================================
+"""
+# Stdlib
+import tracemalloc
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from topology.profiling import Profiler
+
+
+class TestProfilerPhase(object):
+    """
+    Unit tests for topology.profiling.Profiler.phase
+    """
+    def test_nested_peak(self):
+        prof = Profiler()
+        try:
+            # Call
+            with prof.phase('outer'):
+                data = bytearray(4 << 20)
+                del data
+                with prof.phase('inner'):
+                    pass
+                with prof.phase('inner'):
+                    pass
+        finally:
+            tracemalloc.stop()
+        # Tests
+        ntools.eq_(list(prof.phases), ['inner', 'outer'])
+        ntools.eq_(prof.phases['inner']['calls'], 2)
+        ntools.assert_greater_equal(prof.phases['outer']['peak_bytes'], 4 << 20)
+        ntools.assert_less(prof.phases['inner']['peak_bytes'], 4 << 20)
+
+    def test_lower_peak(self):
+        prof = Profiler()
+        try:
+            # Call
+            with prof.phase('high'):
+                data = bytearray(4 << 20)
+                del data
+            with prof.phase('low'):
+                data = bytearray(1 << 20)
+            del data
+        finally:
+            tracemalloc.stop()
+        # Tests
+        ntools.assert_greater_equal(prof.phases['high']['peak_bytes'], 4 << 20)
+        ntools.assert_greater_equal(prof.phases['low']['peak_bytes'], 1 << 20)
+        ntools.assert_less(prof.phases['low']['peak_bytes'], 4 << 20)
+
+    def test_disabled(self):
+        prof = Profiler(enabled=False)
+        # Call
+        with prof.phase('a'), prof.command('b'):
+            pass
+        # Tests
+        ntools.eq_(prof.results(), ({}, {}))
+
+
+class TestProfilerMerge(object):
+    """
+    Unit tests for topology.profiling.Profiler.merge
+    """
+    def test_child(self):
+        prof = Profiler(memory=False)
+        with prof.phase('a'):
+            pass
+        child = prof.child()
+        with child.phase('a'), child.command('cp'):
+            pass
+        # Call
+        prof.merge(*child.results())
+        # Tests
+        ntools.eq_(prof.phases['a']['calls'], 2)
+        ntools.eq_(prof.commands['cp']['calls'], 1)
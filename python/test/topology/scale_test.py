@@ -0,0 +1,57 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`scale_test` --- topology.scale unit tests
+===============================================
+"""
+# Stdlib
+from collections import Counter
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from topology.scale import scale_topo
+
+
+class TestScaleTopo(object):
+    """
+    Unit tests for topology.scale.scale_topo
+    """
+    def test_basic(self):
+        # Call
+        topo = scale_topo(3, 2, 10, parents=2, peers=1)
+        # Tests
+        ases = topo['ASes']
+        ntools.eq_(len(ases), 36)
+        cores = [ia for ia, conf in ases.items() if conf.get('core')]
+        ntools.eq_(len(cores), 6)
+        for ia, conf in ases.items():
+            if not conf.get('core'):
+                ntools.assert_in(conf['cert_issuer'], cores)
+                ntools.eq_(conf['cert_issuer'].split('-')[0], ia.split('-')[0])
+        types = Counter(link['linkAtoB'] for link in topo['links'])
+        # Core ring of 2 ASes per ISD, and a ring of 3 ISDs.
+        ntools.eq_(types['CORE'], 3 + 3)
+        ntools.eq_(types['CHILD'], 3 * 10 * 2)
+
+    def test_unique_ifids(self):
+        # Call
+        topo = scale_topo(2, 3, 20, core_degree=3, isd_degree=1, parents=3, peers=2)
+        # Tests
+        eps = [link[k] for link in topo['links'] for k in ('a', 'b')]
+        ntools.eq_(len(eps), len(set(eps)))
+
+    def test_deterministic(self):
+        ntools.eq_(scale_topo(2, 3, 20, peers=2), scale_topo(2, 3, 20, peers=2))
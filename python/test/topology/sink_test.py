@@ -0,0 +1,136 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`sink_test` --- topology.sink unit tests
+=============================================
+"""
+# Stdlib
+import os
+import tempfile
+from unittest.mock import patch
+
+# External packages
+import nose.tools as ntools
+
+# SCION
+from lib.errors import SCIONIOError
+from test.testcommon import read_text
+from topology.sink import OutputSink
+
+
+class TestOutputSinkWrite(object):
+    """
+    Unit tests for topology.sink.OutputSink.write
+    """
+    def test_basic(self):
+        sink = OutputSink(writers=2)
+        with tempfile.TemporaryDirectory() as dir_:
+            paths = [os.path.join(dir_, 'd%d' % (i % 3), 'f%d' % i) for i in range(20)]
+            # Call
+            for i, path in enumerate(paths):
+                sink.write(path, 'content %d' % i)
+            sink.flush()
+            # Tests
+            for i, path in enumerate(paths):
+                ntools.eq_(read_text(path), 'content %d' % i)
+                ntools.assert_false(os.path.exists(path + '.new'))
+
+    def test_last_write_wins(self):
+        sink = OutputSink(writers=4)
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, 'f')
+            # Call
+            for i in range(100):
+                sink.write(path, 'content %d' % i)
+            sink.flush()
+            # Tests
+            ntools.eq_(read_text(path), 'content 99')
+
+    @patch("topology.sink.write_file", autospec=True)
+    def test_unchanged(self, write_file):
+        sink = OutputSink()
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, 'f')
+            with open(path, 'w') as f:
+                f.write('content')
+            # Call
+            sink.write(path, 'content')
+            sink.flush()
+        # Tests
+        ntools.assert_false(write_file.called)
+
+    @patch("topology.sink.write_file", autospec=True)
+    def test_error(self, write_file):
+        write_file.side_effect = SCIONIOError
+        sink = OutputSink()
+        with tempfile.TemporaryDirectory() as dir_:
+            sink.write(os.path.join(dir_, 'f'), 'content')
+            # Call
+            ntools.assert_raises(SCIONIOError, sink.flush)
+
+
+class TestOutputSinkWriteLinked(object):
+    """
+    Unit tests for topology.sink.OutputSink.write_linked
+    """
+    def test_basic(self):
+        sink = OutputSink()
+        with tempfile.TemporaryDirectory() as dir_:
+            paths = [os.path.join(dir_, 'd%d' % i, 'f') for i in range(3)]
+            with open(os.path.join(dir_, 'old'), 'w') as f:
+                f.write('old')
+            os.mkdir(os.path.dirname(paths[2]))
+            os.link(os.path.join(dir_, 'old'), paths[2])
+            # Call
+            sink.write_linked(paths, 'content')
+            sink.flush()
+            # Tests
+            for path in paths:
+                with open(path) as f:
+                    ntools.eq_(f.read(), 'content')
+                ntools.ok_(os.path.samefile(paths[0], path))
+                ntools.assert_false(os.path.exists(path + '.new'))
+            with open(os.path.join(dir_, 'old')) as f:
+                ntools.eq_(f.read(), 'old')
+
+
+class TestOutputSinkStream(object):
+    """
+    Unit tests for topology.sink.OutputSink.stream
+    """
+    def test_basic(self):
+        sink = OutputSink()
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, 'd', 'f')
+            # Call
+            with sink.stream(path) as f:
+                f.write('a\n')
+                ntools.assert_false(os.path.exists(path))
+                f.write('b\n')
+            # Tests
+            with open(path) as f:
+                ntools.eq_(f.read(), 'a\nb\n')
+            ntools.assert_false(os.path.exists(path + '.new'))
+
+    def test_error(self):
+        sink = OutputSink()
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, 'f')
+            # Call
+            with ntools.assert_raises(ValueError):
+                with sink.stream(path) as f:
+                    f.write('a\n')
+                    raise ValueError
+            # Tests
+            ntools.assert_false(os.path.exists(path))
@@ -0,0 +1,166 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`topo_test` --- topology.topo unit tests
+=============================================
+"""
+# Stdlib
+import collections
+import copy
+import json
+import os
+import random
+import tempfile
+from unittest.mock import create_autospec, patch
+
+# External packages
+import nose.tools as ntools
+import yaml
+
+# SCION
+from lib.util import load_yaml_file
+from test.testcommon import generate_topology, read_text, write_text
+from topology.common import TopoID
+from topology.topo import IFIDGenerator, StreamedTopoDicts, TopoGenerator
+
+
+class TestStreamedTopoDicts(object):
+    """
+    Unit tests for topology.topo.StreamedTopoDicts
+    """
+    def _setup(self):
+        topo_gen = create_autospec(TopoGenerator, instance=True)
+        topo_gen.build_as_topo.side_effect = lambda topo_id, as_conf: {
+            'ISD_AS': str(topo_id), 'conf': as_conf}
+        as_confs = {TopoID('1-ff00:0:110'): 'a', TopoID('1-ff00:0:111'): 'b'}
+        return topo_gen, StreamedTopoDicts(topo_gen, as_confs)
+
+    def test_items(self):
+        topo_gen, topo_dicts = self._setup()
+        # Call
+        items = [(str(topo_id), as_topo['conf']) for topo_id, as_topo in topo_dicts.items()]
+        # Tests
+        ntools.eq_(items, [('1-ff00:0:110', 'a'), ('1-ff00:0:111', 'b')])
+        ntools.eq_(len(topo_dicts), 2)
+        ntools.eq_(topo_gen.build_as_topo.call_count, 2)
+
+    def test_keeps_last(self):
+        topo_gen, topo_dicts = self._setup()
+        topo_id = TopoID('1-ff00:0:111')
+        # Call
+        first = topo_dicts[topo_id]
+        second = topo_dicts[topo_id]
+        # Tests
+        ntools.assert_is(first, second)
+        topo_gen.build_as_topo.assert_called_once_with(topo_id, 'b')
+
+
+class TestStreamGeneration(object):
+    """
+    Tests that the generator builds every AS only once for emitting it with --stream.
+    """
+    @patch.object(TopoGenerator, 'build_as_topo', autospec=True,
+                  side_effect=TopoGenerator.build_as_topo)
+    def _builds(self, argv, build_as_topo):
+        with tempfile.TemporaryDirectory() as dir_:
+            generate_topology(dir_, '--stream', *argv)
+        return collections.Counter(str(c[0][1]) for c in build_as_topo.call_args_list)
+
+    def test_supervisor(self):
+        # Call
+        builds = self._builds(())
+        # Tests
+        ntools.eq_(builds, {'1-ff00:0:110': 1, '1-ff00:0:111': 1, '1-ff00:0:112': 1})
+
+    def test_docker(self):
+        # Call
+        builds = self._builds(('-d',))
+        # Tests
+        ntools.eq_(builds, {'1-ff00:0:110': 1, '1-ff00:0:111': 1, '1-ff00:0:112': 1})
+
+
+class TestKeepAllocations(object):
+    """
+    Tests that --keep-allocations keeps the addresses of the existing links.
+    """
+    def _br_addrs(self, out, as_dir):
+        topo = json.loads(read_text(os.path.join(out, as_dir, 'endhost', 'topology.json')))
+        return {ifid: intf for br in topo['BorderRouters'].values()
+                for ifid, intf in br['Interfaces'].items()}
+
+    def test_insert_link(self):
+        tiny = load_yaml_file(os.path.join(os.path.dirname(__file__), '..', '..', '..',
+                                           'topology', 'Tiny.topo'))
+        topo = copy.deepcopy(tiny)
+        topo['ASes']['1-ff00:0:113'] = {'cert_issuer': '1-ff00:0:110'}
+        topo['links'].insert(0, {'a': '1-ff00:0:110#3', 'b': '1-ff00:0:113#1',
+                                 'linkAtoB': 'CHILD'})
+        with tempfile.TemporaryDirectory() as dir_:
+            out = os.path.join(dir_, 'gen')
+            path = os.path.join(dir_, 'test.topo')
+            write_text(path, yaml.dump(tiny))
+            generate_topology(out, '--keep-allocations', topo=path)
+            old = [self._br_addrs(out, os.path.join('ISD1', 'ASff00_0_%s' % as_))
+                   for as_ in ('110', '111', '112')]
+            write_text(path, yaml.dump(topo))
+            # Call
+            generate_topology(out, '--keep-allocations', topo=path)
+            # Tests
+            new = [self._br_addrs(out, os.path.join('ISD1', 'ASff00_0_%s' % as_))
+                   for as_ in ('110', '111', '112')]
+        ntools.eq_(new[1:], old[1:])
+        ntools.eq_({ifid: new[0][ifid] for ifid in old[0]}, old[0])
+
+
+class TestIFIDGeneratorNew(object):
+    """
+    Unit tests for topology.topo.IFIDGenerator.new
+    """
+    def test_all(self):
+        ifid_gen = IFIDGenerator(random.Random(1))
+        ifid_gen.add(7)
+        # Call
+        ifids = [ifid_gen.new() for _ in range(IFIDGenerator.MAX_IFID - 1)]
+        # Tests
+        ntools.eq_(sorted(ifids + [7]), list(range(1, IFIDGenerator.MAX_IFID + 1)))
+        ntools.assert_raises(SystemExit, ifid_gen.new)
+
+    def test_seed(self):
+        first, second = IFIDGenerator(random.Random(5)), IFIDGenerator(random.Random(5))
+        # Call
+        ifids = [(first.new(), second.new()) for _ in range(100)]
+        # Tests
+        ntools.ok_(all(a == b for a, b in ifids))
+
+    def test_dense_add(self):
+        ifid_gen = IFIDGenerator(random.Random(1))
+        ifids = {ifid_gen.new() for _ in range(IFIDGenerator.MAX_IFID - 10)}
+        free = [i for i in range(1, IFIDGenerator.MAX_IFID + 1) if i not in ifids]
+        # Call
+        ifid_gen.add(free[0])
+        # Tests
+        ntools.ok_(ifid_gen.used(free[0]))
+        ntools.eq_(sorted(ifid_gen.new() for _ in range(9)), free[1:])
+
+    def test_dense_add_many(self):
+        ifid_gen = IFIDGenerator(random.Random(1))
+        ifids = [ifid_gen.new() for _ in range(IFIDGenerator.MAX_IFID - 100)]
+        free = [i for i in range(1, IFIDGenerator.MAX_IFID + 1) if i not in set(ifids)]
+        # Call
+        for ifid in free[::2]:
+            ifid_gen.add(ifid)
+        ifids += [ifid_gen.new() for _ in range(len(free[1::2]))]
+        # Tests
+        ntools.eq_(sorted(ifids + free[::2]), list(range(1, IFIDGenerator.MAX_IFID + 1)))
+        ntools.assert_raises(SystemExit, ifid_gen.new)
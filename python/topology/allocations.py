@@ -0,0 +1,85 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`allocations` --- Persistent address, port and IFID allocations
+====================================================================
+
+The allocation store records the subnets, addresses, ports and generated
+interface IDs of a run. With --keep-allocations, the next run reuses them, so
+that adding an AS or a link does not change the allocations of the existing
+elements.
+"""
+# Stdlib
+import json
+import logging
+
+# SCION
+from lib.serialization import json_dumps
+from lib.util import write_file
+
+ALLOCATIONS_VERSION = 1
+
+
+class AllocationStore(object):
+    def __init__(self, subnets=None, ports=None, ifids=None):
+        """
+        :param dict subnets: The allocated subnets per address type ('IPv4', 'IPv6'), keyed by
+            location (an ISD-AS or link name). Each entry contains the subnet ('net') and the
+            addresses of its elements ('addrs').
+        :param dict ports: The allocated ports, keyed by element ID.
+        :param dict ifids: The generated interface IDs of both ends of a link, keyed by link.
+        """
+        self.subnets = subnets or {}
+        self.ports = ports or {}
+        self.ifids = ifids or {}
+
+    @classmethod
+    def build(cls, subnet_gens, port_gen, link_ifids):
+        """
+        Collect the allocations of a generation run.
+
+        :param dict subnet_gens: The SubnetGenerators per address type.
+        :param PortGenerator port_gen: The port generator.
+        :param dict link_ifids: The interface IDs of the links, see TopoGenerator.
+        """
+        subnets = {addr_type: gen.allocated for addr_type, gen in subnet_gens.items()}
+        return cls(subnets, port_gen.allocated(), link_ifids)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the allocations of a previous run. Returns an empty store if there is none.
+
+        :param str path: The path to the allocations file.
+        """
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable allocations '%s': %s", path, e)
+            return cls()
+        if raw.get('version') != ALLOCATIONS_VERSION:
+            return cls()
+        return cls(raw['subnets'], raw['ports'], raw['ifids'])
+
+    def write(self, path):
+        raw = {
+            'version': ALLOCATIONS_VERSION,
+            'subnets': self.subnets,
+            'ports': self.ports,
+            'ifids': self.ifids,
+        }
+        write_file(path, json_dumps(raw, sort_keys=True) + '\n')
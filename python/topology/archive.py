@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`archive` --- Single-archive output of the generated topology
+==================================================================
+
+Packs the output directory into one tar archive (optionally compressed with
+gzip, xz or zstd, according to the file extension), written as a single
+sequential stream. The members are grouped by directory: the global files, the
+files of every ISD, and the files of every AS directory. The first member of the
+archive is an index with the byte range of every group in the uncompressed
+stream, so that single AS directories can be extracted without unpacking the
+whole archive. Hard links are only stored within a group.
+
+Extract an archive (or only the directories of some ASes) into the gen directory:
+
+    ./scion.sh extract gen.tar.zst [1-ff00:0:110 ...]
+"""
+# Stdlib
+import argparse
+import gzip
+import io
+import json
+import logging
+import lzma
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+
+# SCION
+from topology.common import TopoID
+
+ARCHIVE_VERSION = 1
+INDEX_NAME = 'archive-index.json'
+# The group of the files that are not in an ISD directory.
+GLOBAL_GROUP = ''
+_ISD_DIR = re.compile(r'^ISD\d+$')
+
+
+def write_archive(src_dir, path):
+    """
+    Pack the files of src_dir into the archive at path.
+
+    :param str src_dir: The directory to pack, e.g. the output directory of the generator.
+    :param str path: The path to the archive (.tar, .tar.gz, .tgz, .tar.xz or .tar.zst).
+    """
+    groups = _collect(src_dir, os.path.abspath(path))
+    stream, proc = _open_write(path)
+    with tarfile.open(fileobj=stream, mode='w|', format=tarfile.GNU_FORMAT) as tar:
+        members, index = _tar_members(tar, groups)
+        raw = _json_index(index)
+        info = tarfile.TarInfo(INDEX_NAME)
+        info.size = len(raw)
+        info.mtime = int(time.time())
+        tar.addfile(info, io.BytesIO(raw))
+        for info, abs_path in members:
+            if info.isreg():
+                with open(abs_path, 'rb') as f:
+                    tar.addfile(info, f)
+            else:
+                tar.addfile(info)
+    _close(stream, proc, path)
+
+
+def read_index(path):
+    """
+    :returns: The byte range (offset after the index member, length) of every group.
+    :rtype: dict
+    """
+    stream, proc = _open_read(path)
+    try:
+        return _read_index(stream)[0]
+    finally:
+        _close(stream, proc, path)
+
+
+def extract(path, dest, groups=None):
+    """
+    Extract the archive at path into dest.
+
+    :param str path: The path to the archive.
+    :param str dest: The destination directory.
+    :param list groups: If set, only these groups (e.g. 'ISD1/ASff00_0_110') are extracted.
+    """
+    os.makedirs(dest, exist_ok=True)
+    if groups is None:
+        _extract_all(path, dest)
+        return
+    stream, proc = _open_read(path)
+    try:
+        index, _ = _read_index(stream)
+        missing = [group for group in groups if group not in index]
+        if missing:
+            logging.critical("Not in archive '%s': %s", path, ', '.join(missing))
+            sys.exit(1)
+        pos = 0
+        for offset, length in sorted(index[group] for group in groups):
+            _skip(stream, offset - pos)
+            data = _read(stream, length)
+            pos = offset + length
+            with tarfile.open(fileobj=io.BytesIO(data), mode='r:') as tar:
+                tar.extractall(dest)
+    finally:
+        _close(stream, proc, path)
+
+
+def _collect(src_dir, skip):
+    """
+    Walk src_dir, and return the (relative path, absolute path) pairs of every group.
+    The parent directories precede their contents.
+    """
+    groups = {GLOBAL_GROUP: []}
+    for dir_, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        rel_dir = os.path.relpath(dir_, src_dir)
+        if rel_dir != '.':
+            groups.setdefault(_group(rel_dir), []).append((rel_dir, dir_))
+        for name in sorted(files):
+            abs_path = os.path.join(dir_, name)
+            if abs_path == skip:
+                continue
+            rel = os.path.normpath(os.path.join(rel_dir, name))
+            groups.setdefault(_group(rel), []).append((rel, abs_path))
+    return groups
+
+
+def _group(rel):
+    parts = rel.split(os.sep)
+    if not _ISD_DIR.match(parts[0]):
+        return GLOBAL_GROUP
+    if len(parts) > 1 and parts[1].startswith('AS'):
+        return os.path.join(parts[0], parts[1])
+    return parts[0]
+
+
+def _tar_members(tar, groups):
+    """
+    Build the tar headers of all members, and compute the byte range of every group.
+    """
+    members = []
+    index = {}
+    pos = 0
+    for group in sorted(groups):
+        # Hard links must point to a member of the same group, so that the groups
+        # can be extracted on their own.
+        tar.inodes = {}
+        start = pos
+        for rel, abs_path in groups[group]:
+            info = tar.gettarinfo(abs_path, arcname=rel)
+            if info is None:
+                continue
+            members.append((info, abs_path))
+            pos += len(info.tobuf(tar.format, tar.encoding, tar.errors))
+            if info.isreg():
+                pos += -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        index[group] = [start, pos - start]
+    return members, index
+
+
+def _json_index(index):
+    return json.dumps({'version': ARCHIVE_VERSION, 'groups': index}, sort_keys=True).encode()
+
+
+def _read_index(stream):
+    header = _read(stream, tarfile.BLOCKSIZE)
+    info = tarfile.TarInfo.frombuf(header, tarfile.ENCODING, 'surrogateescape')
+    if info.name != INDEX_NAME:
+        logging.critical("Archive without index")
+        sys.exit(1)
+    size = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+    raw = json.loads(_read(stream, size)[:info.size].decode())
+    if raw.get('version') != ARCHIVE_VERSION:
+        logging.critical("Unsupported archive version: %s", raw.get('version'))
+        sys.exit(1)
+    return raw['groups'], tarfile.BLOCKSIZE + size
+
+
+def _extract_all(path, dest):
+    tar_cmd = shutil.which('tar')
+    if tar_cmd is None:
+        stream, proc = _open_read(path)
+        try:
+            with tarfile.open(fileobj=stream, mode='r|') as tar:
+                tar.extractall(dest, members=(m for m in tar if m.name != INDEX_NAME))
+        finally:
+            _close(stream, proc, path)
+        return
+    # The tar command is considerably faster for archives with many small files.
+    cmd = [tar_cmd, '-x', '-C', dest, '--exclude', INDEX_NAME]
+    if path.endswith('.zst'):
+        zstd = subprocess.Popen(['zstd', '-q', '-d', '-c', path], stdout=subprocess.PIPE)
+        ret = subprocess.call(cmd, stdin=zstd.stdout)
+        zstd.stdout.close()
+        ret = zstd.wait() or ret
+    else:
+        ret = subprocess.call(cmd + ['-f', path])
+    if ret:
+        logging.critical("Extracting '%s' failed", path)
+        sys.exit(1)
+
+
+def _open_write(path):
+    if path.endswith('.zst'):
+        try:
+            proc = subprocess.Popen(['zstd', '-q', '-f', '-T0', '-o', path],
+                                    stdin=subprocess.PIPE)
+        except FileNotFoundError:
+            logging.critical("zstd is required to write '%s'", path)
+            sys.exit(1)
+        return proc.stdin, proc
+    if path.endswith(('.tar.gz', '.tgz')):
+        return gzip.open(path, 'wb', compresslevel=6), None
+    if path.endswith('.tar.xz'):
+        return lzma.open(path, 'wb'), None
+    return open(path, 'wb'), None
+
+
+def _open_read(path):
+    if path.endswith('.zst'):
+        try:
+            proc = subprocess.Popen(['zstd', '-q', '-d', '-c', path], stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            logging.critical("zstd is required to read '%s'", path)
+            sys.exit(1)
+        return proc.stdout, proc
+    if path.endswith(('.tar.gz', '.tgz')):
+        return gzip.open(path, 'rb'), None
+    if path.endswith('.tar.xz'):
+        return lzma.open(path, 'rb'), None
+    return open(path, 'rb'), None
+
+
+def _close(stream, proc, path):
+    stream.close()
+    # The exit status of a reading zstd is ignored, as closing the pipe early terminates it.
+    if proc is not None and proc.wait() and proc.stdin is not None:
+        logging.critical("Writing '%s' failed", path)
+        sys.exit(1)
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        logging.critical("Truncated archive")
+        sys.exit(1)
+    return data
+
+
+def _skip(stream, size):
+    if size <= 0:
+        return
+    if stream.seekable():
+        stream.seek(size, io.SEEK_CUR)
+        return
+    while size > 0:
+        size -= len(_read(stream, min(size, 1 << 20)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract a generated topology archive.')
+    parser.add_argument('archive', help='The archive written with --output-archive')
+    parser.add_argument('ases', nargs='*', metavar='ISD-AS',
+                        help='Only extract the directories of these ASes')
+    parser.add_argument('-C', '--directory', default='gen',
+                        help='Destination directory (default: %(default)s)')
+    parser.add_argument('-l', '--list', action='store_true',
+                        help='List the groups in the index of the archive')
+    args = parser.parse_args()
+    if args.list:
+        for group, (offset, length) in sorted(read_index(args.archive).items()):
+            print('%-24s %12d %12d' % (group or '(global)', offset, length))
+        return
+    groups = None
+    if args.ases:
+        groups = [TopoID(ia).base_dir('').rstrip(os.sep) for ia in args.ases]
+    extract(args.archive, args.directory, groups)
+
+
+if __name__ == "__main__":
+    main()
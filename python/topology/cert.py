@@ -17,12 +17,31 @@
 =============================================
 """
 import base64
+import filecmp
+import glob
+import logging
 import os
+import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from plumbum import local
 
-from topology.common import ArgsTopoConfig, srv_iter
+from lib.util import link_file
+from topology.common import ArgsTopoConfig, srv_iter, topo_iter
+from topology.crypto_cache import CryptoCache
+
+PKI_PATH = './bin/scion-pki'
+
+# The scion-pki commands that are run per ISD, in this order, after the templates are
+# generated for the whole topology.
+PKI_STAGES = (
+    ('keys', 'private'),
+    ('keys', 'master'),
+    ('trcs', 'gen'),
+    ('certs', 'issuer'),
+    ('certs', 'chain'),
+)
 
 
 class CertGenArgs(ArgsTopoConfig):
@@ -36,42 +55,159 @@ class CertGenerator(object):
         arguments and the parsed topo config.
         """
         self.args = args
-        self.pki = local['./bin/scion-pki']
+        self.pki = local[PKI_PATH]
         self.core_count = defaultdict(int)
 
-    def generate(self, topo_dicts):
-        self.pki('tmpl', 'topo', self.args.topo_config, '-d', self.args.output_dir)
-        self.pki('keys', 'private', '*', '-d', self.args.output_dir)
-        self.pki('keys', 'master', '*', '-d', self.args.output_dir)
-        self.pki('trcs', 'gen', '*', '-d', self.args.output_dir)
-        self.pki('certs', 'issuer', '*', '-d', self.args.output_dir)
-        self.pki('certs', 'chain', '*', '-d', self.args.output_dir)
-        self._master_keys(topo_dicts)
-        self._copy_files(topo_dicts)
-
-    def _master_keys(self, topo_dicts):
+    def generate(self, topo_dicts, isds=None):
+        """
+        Generate the crypto material of the given ISDs, and copy it into the element
+        directories of all ASes (which contain the TRCs of all ISDs).
+
+        :param dict topo_dicts: The generated topo dicts from TopoGenerator.
+        :param list isds: The ISD numbers whose crypto material is (re)generated, all ISDs if
+            not set.
+        """
+        profiler = self.args.profiler
+        if isds is None:
+            isds = sorted({topo_id.isd_str() for topo_id in topo_dicts}, key=int)
+        cache, keys, cached = None, {}, {}
+        if self.args.crypto_cache:
+            cache = CryptoCache(self.args.crypto_cache, self.args.output_dir, PKI_PATH)
+            for isd in isds:
+                keys[isd] = cache.isd_key(isd, self.args.config)
+                entry = cache.lookup(isd, keys[isd])
+                if entry:
+                    cached[isd] = entry
+        missing = [isd for isd in isds if isd not in cached]
+        # The templates are generated for all ISDs, also if all of them are cached, so that a
+        # restored tree contains the templates of a fresh run. The cached ISDs are restored
+        # over them.
+        with profiler.phase('cert templates'):
+            self._pki(profiler, 'tmpl', 'topo', self.args.topo_config,
+                      '-d', self.args.output_dir)
+        with profiler.phase('cert cache'):
+            for isd, entry in cached.items():
+                cache.restore(isd, entry)
+        with profiler.phase('cert pki'):
+            # The ISDs are independent, their scion-pki runs are only limited by cert_jobs.
+            for results in self._map(self._generate_isd, missing):
+                profiler.merge(*results)
+        with profiler.phase('cert master keys'):
+            self._master_keys(topo_dicts, missing)
+        if cache:
+            with profiler.phase('cert cache'):
+                for isd in missing:
+                    cache.store(isd, keys[isd])
+        if cached:
+            logging.info("Restored the crypto material of %d of %d ISDs from the cache",
+                         len(cached), len(isds))
+        with profiler.phase('cert copy'):
+            self._copy_files(topo_dicts)
+
+    def _generate_isd(self, isd):
+        # Runs in a worker thread, the commands are recorded by a child profiler.
+        prof = self.args.profiler.child()
+        for stage in PKI_STAGES:
+            self._pki(prof, *stage, isd, '-d', self.args.output_dir, name=' '.join(stage))
+        return prof.results()
+
+    def _pki(self, profiler, *args, name=None):
+        with profiler.command('scion-pki %s' % (name or ' '.join(args[:2]))):
+            self.pki(*args)
+
+    def _map(self, func, items):
+        """
+        Call func on all items with up to cert_jobs threads, and return the results in order.
+        """
+        if self.args.cert_jobs <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.args.cert_jobs) as pool:
+            return list(pool.map(func, items))
+
+    def distribute(self, topo_dicts, topo_ids):
+        """
+        Copy the already generated certificates and keys into the element directories of the
+        given ASes. This is used by incremental runs, where the crypto material of the previous
+        run is reused.
+
+        :param dict topo_dicts: The generated topo dicts from TopoGenerator.
+        :param list topo_ids: The ASes whose element directories are populated.
+        """
+        with self.args.profiler.phase('cert copy'):
+            self._copy_files(topo_dicts, topo_ids)
+
+    def _master_keys(self, topo_dicts, isds):
+        isds = set(isds)
         for topo_id, as_topo in topo_dicts.items():
+            if topo_id.isd_str() not in isds:
+                continue
             base = topo_id.base_dir(self.args.output_dir)
             with open(os.path.join(base, 'keys', 'master0.key'), 'w') as f:
                 f.write(base64.b64encode(os.urandom(16)).decode())
             with open(os.path.join(base, 'keys', 'master1.key'), 'w') as f:
                 f.write(base64.b64encode(os.urandom(16)).decode())
 
-    def _copy_files(self, topo_dicts):
-        cp = local['cp']
-        # Copy the certs and key dir for all elements.
+    def _copy_files(self, topo_dicts, topo_ids=None):
+        # The files are copied in-process (like cp, without preserving the timestamps), which
+        # avoids spawning thousands of cp processes for large topologies.
+        trcs = sorted(glob.glob(os.path.join(self.args.output_dir, '*', 'trcs', '*.trc')))
+        copies = []
+        # Copy the certs and key dir for all elements. The directories of elements that exist
+        # from a previous run are updated, as the crypto material may have been regenerated.
         for topo_id, as_topo, base in srv_iter(
-                topo_dicts, self.args.output_dir, common=True):
-            elem_dir = local.path(base)
-            as_dir = elem_dir.dirname
-            cp('-r', as_dir / 'certs', elem_dir / 'certs')
-            cp('-r', as_dir / 'keys', elem_dir / 'keys')
-            cp(as_dir.dirname.dirname // '*/trcs/*.trc', elem_dir / 'certs')
+                topo_dicts, self.args.output_dir, common=True, topo_ids=topo_ids):
+            copies.append((base, ('certs', 'keys'), trcs))
         # Copy the customers dir for all certificate servers.
-        for topo_id, as_topo in topo_dicts.items():
-            as_dir = local.path(topo_id.base_dir(self.args.output_dir))
-            custom_dir = as_dir / 'customers'
-            if not custom_dir.exists():
+        for topo_id, as_topo in topo_iter(topo_dicts, topo_ids):
+            as_dir = topo_id.base_dir(self.args.output_dir)
+            if not os.path.exists(os.path.join(as_dir, 'customers')):
+                continue
+            for elem in as_topo.control_services:
+                copies.append((os.path.join(as_dir, elem), ('customers',), ()))
+        self._map(self._copy_elem, copies)
+
+    def _copy_elem(self, copy):
+        """
+        Copy the given directories of the AS directory, and the given files into the certs
+        directory of an element. With --link-duplicates, the files are hard-linked instead.
+        Files that already have the same content are kept, the files in the directories that
+        are not in the source (e.g. of a previous crypto generation) are removed.
+
+        :param tuple copy: The element directory, the names of the directories and the files.
+        """
+        elem_dir, dirs, files = copy
+        as_dir = os.path.dirname(elem_dir)
+        srcs = {}
+        for name in dirs:
+            for dir_, _, names in os.walk(os.path.join(as_dir, name)):
+                target = os.path.join(elem_dir, os.path.relpath(dir_, as_dir))
+                for file_name in names:
+                    srcs[os.path.join(target, file_name)] = os.path.join(dir_, file_name)
+        for path in files:
+            srcs[os.path.join(elem_dir, 'certs', os.path.basename(path))] = path
+        for dst, src in srcs.items():
+            if self._up_to_date(src, dst):
+                continue
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if self.args.link_duplicates:
+                link_file(src, dst)
                 continue
-            for elem in as_topo["ControlService"]:
-                cp('-r', as_dir / 'customers', as_dir / elem / 'customers')
+            # dst may be a hard link of a previous run with --link-duplicates, which must not
+            # be written through.
+            if os.path.lexists(dst):
+                os.remove(dst)
+            shutil.copy(src, dst)
+        for name in dirs:
+            for dir_, _, names in os.walk(os.path.join(elem_dir, name)):
+                for file_name in names:
+                    path = os.path.join(dir_, file_name)
+                    if path not in srcs:
+                        os.remove(path)
+
+    def _up_to_date(self, src, dst):
+        try:
+            if self.args.link_duplicates:
+                return os.path.samefile(src, dst)
+            return filecmp.cmp(src, dst, shallow=False)
+        except OSError:
+            return False
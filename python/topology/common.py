@@ -19,7 +19,6 @@ import sys
 
 # SCION
 from lib.scion_addr import ISD_AS
-from topology.net import AddressProxy
 
 COMMON_DIR = 'endhost'
 
@@ -39,6 +38,10 @@ DISP_CONFIG_NAME = 'disp.toml'
 SIG_CONFIG_NAME = 'sig.toml'
 
 DOCKER_USR_VOL = ['/etc/passwd:/etc/passwd:ro', '/etc/group:/etc/group:ro']
+# The healthcheck tool of the app images (go/tools/healthcheck), and the application socket of
+# the dispatcher in the containers.
+DOCKER_HEALTHCHECK = '/sbin/healthcheck'
+DOCKER_DISP_SOCK = '/run/shm/dispatcher/default.sock'
 
 SD_API_PORT = 30255
 
@@ -70,6 +73,8 @@ class ArgsTopoDicts(ArgsBase):
 
 
 class TopoID(ISD_AS):
+    __slots__ = ('_base_dir',)
+
     def ISD(self):
         return "ISD%s" % self.isd_str()
 
@@ -79,11 +84,17 @@ class TopoID(ISD_AS):
     def AS_file(self):
         return "AS%s" % self.as_file_fmt()
 
-    def file_fmt(self):
-        return "%s-%s" % (self.isd_str(), self.as_file_fmt())
-
     def base_dir(self, out_dir):
-        return os.path.join(out_dir, self.ISD(), self.AS_file())
+        # Memoized for the last output directory, which is the same during a run.
+        try:
+            last_dir, base = self._base_dir
+            if last_dir == out_dir:
+                return base
+        except AttributeError:
+            pass
+        base = os.path.join(out_dir, self.ISD(), self.AS_file())
+        self._base_dir = out_dir, base
+        return base
 
     def __lt__(self, other):
         return str(self) < str(other)
@@ -92,62 +103,63 @@ class TopoID(ISD_AS):
         return "<TopoID: %s>" % self
 
 
-def prom_addr_br(br_id, br_ele, port):
+def prom_addr_br(br_id, br, port):
     """Get the prometheus address for a border router"""
-    pub = get_pub(br_ele['InternalAddrs'])
-    return "[%s]:%s" % (pub['PublicOverlay']['Addr'].ip, port)
+    return "[%s]:%s" % (br.internal_addr.ip, port)
 
 
-def prom_addr_infra(docker, infra_id, infra_ele, port):
+def prom_addr_infra(docker, infra_id, infra, port):
     """Get the prometheus address for an infrastructure element."""
-    pub = get_pub(infra_ele['Addrs'])
-    return "[%s]:%s" % (pub['Public']['Addr'].ip, port)
+    return "[%s]:%s" % (infra.addr.ip, port)
 
 
-def sciond_ip(docker, topo_id, networks):
-    for i, net in enumerate(networks):
-        for prog, ip_net in networks[net].items():
-            if prog == 'sd%s' % topo_id.file_fmt():
-                return ip_net.ip
-    return None
+def sciond_ip(docker, topo_id, graph):
+    addr = graph.elem_addr(sciond_name(topo_id))
+    if addr is None:
+        return None
+    return addr.ip
 
 
-def prom_addr_dispatcher(docker, topo_id, networks, port, name):
+def prom_addr_dispatcher(docker, topo_id, graph, port, name, shared=False):
+    """
+    :param bool shared: Whether the dispatchers of the AS are shared (see shared_disps). Their
+        addresses are then looked up with disp_addr_elem.
+    """
     if not docker:
         return "[127.0.0.1]:%s" % port
-    target_name = ''
-    if name.startswith('disp_br'):
+    if shared:
+        target_name = disp_addr_elem(topo_id, name)
+    elif name.startswith('disp_br'):
         target_name = 'br%s%s_ctrl' % (topo_id.file_fmt(), name[-2:])
     elif name.startswith('disp_sig'):
         target_name = 'sig%s' % topo_id.file_fmt()
     else:
         target_name = 'disp%s' % topo_id.file_fmt()
-    for _, net in enumerate(networks):
-        if target_name in networks[net]:
-            return '[%s]:%s' % (networks[net][target_name].ip, port)
-    return None
-
+    addr = graph.elem_addr(target_name)
+    if addr is None:
+        return None
+    return '[%s]:%s' % (addr.ip, port)
 
-def get_pub(topo_addr):
-    pub = topo_addr.get('IPv6')
-    if pub is not None:
-        return pub
-    return topo_addr['IPv4']
-
-
-def get_pub_ip(topo_addr):
-    return get_pub(topo_addr)["Public"]["Addr"].ip
 
+def topo_iter(topo_dicts, topo_ids=None):
+    """
+    Iterate over the (topo_id, as_topo) pairs of topo_dicts, in generation order.
 
-def get_l4_port(topo_addr):
-    return get_pub(topo_addr)["Public"]["L4Port"]
+    :param dict topo_dicts: The generated topo dicts from TopoGenerator.
+    :param list topo_ids: If set, only these ASes are visited (in the given order).
+    """
+    if topo_ids is None:
+        yield from topo_dicts.items()
+        return
+    for topo_id in topo_ids:
+        yield topo_id, topo_dicts[topo_id]
 
 
-def srv_iter(topo_dicts, out_dir, common=False):
-    for topo_id, as_topo in topo_dicts.items():
+def srv_iter(topo_dicts, out_dir, common=False, topo_ids=None):
+    for topo_id, as_topo in topo_iter(topo_dicts, topo_ids):
         base = topo_id.base_dir(out_dir)
         for service in SCION_SERVICE_NAMES:
-            for elem in as_topo[service]:
+            for elem in as_topo.services[service]:
                 yield topo_id, as_topo, os.path.join(base, elem)
         if common:
             yield topo_id, as_topo, os.path.join(base, COMMON_DIR)
@@ -163,6 +175,28 @@ def docker_image(args, image):
     return image
 
 
+def docker_healthcheck(*args):
+    """
+    Return the compose healthcheck that runs the healthcheck tool of the app images with args.
+    The failed checks in the start period are not counted, a service is healthy as soon as one
+    check passes.
+    """
+    return {
+        'test': ['CMD', DOCKER_HEALTHCHECK, *args],
+        'interval': '2s',
+        'timeout': '1s',
+        'retries': 3,
+        'start_period': '30s',
+    }
+
+
+def docker_healthy(*services):
+    """
+    Return the compose depends_on entries on services that have to be healthy.
+    """
+    return {service: {'condition': 'service_healthy'} for service in services}
+
+
 def docker_host(in_docker, docker, addr=None):
     if in_docker:
         # If in-docker we need to know the DOCKER0 IP
@@ -181,18 +215,14 @@ def docker_ip():
     return subprocess.check_output(['tools/docker-ip']).decode("utf-8").strip()
 
 
-def remote_nets(networks, topo_id):
+def remote_nets(graph, topo_id):
     """
     Returns the subnets of all remote ASes the SIG in topo_id is connected to.
-    :param networks dict: Scion elem to subnet/IP map.
+    :param graph TopoGraph: The topology index from TopoGenerator.
     :param topo_id: A key of a topo dict generated by TopoGenerator.
     :return: String of comma separated subnets.
     """
-    rem_nets = []
-    for key in networks:
-        if 'sig' in key and topo_id.file_fmt() not in key:
-            rem_nets.append(str(networks[key][0]['net']))
-    return ','.join(rem_nets)
+    return ','.join(str(net) for t_id, net in graph.sig_nets(net_order=True) if t_id != topo_id)
 
 
 def sciond_name(topo_id):
@@ -203,7 +233,68 @@ def sciond_svc_name(topo_id):
     return 'scion_%s' % sciond_name(topo_id)
 
 
+def disp_name(args, topo_id, elem_id):
+    """
+    Return the name of the dispatcher used by a BR or CS in the docker topology. SCIOND and the
+    tester use the dispatcher of the first CS. With one container per AS, all elements of the AS
+    use the dispatcher of the container.
+
+    :param str elem_id: The BR or CS id, e.g. 'cs1-ff00_0_110-1'.
+    """
+    if args.docker_per_as or (args.shared_dispatcher and not elem_id.startswith('br')):
+        return 'disp_%s' % topo_id.file_fmt()
+    return 'disp_%s' % elem_id
+
+
+def sig_disp_name(args, topo_id):
+    """
+    Return the name of the dispatcher used by the SIG in the docker topology.
+    """
+    if args.shared_dispatcher:
+        return 'disp_%s' % topo_id.file_fmt()
+    return 'disp_sig_%s' % topo_id.file_fmt()
+
+
+def shared_disps(args):
+    """
+    Whether elements of an AS share a dispatcher in the docker topology, i.e. with the shared
+    dispatcher mode or one container per AS.
+    """
+    return args.shared_dispatcher or args.docker_per_as
+
+
+def disp_names(args, topo_id, topo):
+    """
+    Return the names of all dispatchers of an AS in the docker topology. Every BR has its own
+    dispatcher. The CS, SCIOND, tester and SIG share one dispatcher per AS with the shared
+    dispatcher mode, otherwise every CS and the SIG have their own.
+    """
+    names = [disp_name(args, topo_id, k)
+             for k in list(topo.border_routers) + list(topo.control_services)]
+    if args.sig:
+        names.append(sig_disp_name(args, topo_id))
+    return list(dict.fromkeys(names))
+
+
+def disp_addr_elem(topo_id, name):
+    """
+    Return the element whose address is used by a dispatcher in the docker topology. The CS and
+    SIG run in the network namespace of their dispatcher, the dispatcher of a BR uses its
+    control address.
+    """
+    elem = name[len('disp_'):]
+    if elem.startswith('br'):
+        return '%s_ctrl' % elem
+    if elem.startswith('sig_'):
+        return 'sig%s' % topo_id.file_fmt()
+    if elem == topo_id.file_fmt():
+        # The shared dispatcher of the AS.
+        return 'cs%s-1' % topo_id.file_fmt()
+    return elem
+
+
 def json_default(o):
+    from topology.net import AddressProxy
     if isinstance(o, AddressProxy):
         return str(o.ip)
     raise TypeError
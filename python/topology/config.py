@@ -18,35 +18,24 @@
 """
 # Stdlib
 import configparser
-import json
 import logging
 import os
+import shutil
 import sys
 from io import StringIO
 
 # SCION
+# The generators and their dependencies (e.g. plumbum, yaml and toml) are imported where they
+# are used, so that the generator starts quickly, e.g. for --help.
 from lib.defines import (
+    ALLOCATIONS_FILE,
     DEFAULT_MTU,
     DEFAULT6_NETWORK,
+    MANIFEST_FILE,
     NETWORKS_FILE,
 )
 from lib.scion_addr import ISD_AS
-from lib.util import (
-    load_yaml_file,
-    write_file,
-)
-from topology.cert import CertGenArgs, CertGenerator
-from topology.common import ArgsBase
-from topology.docker import DockerGenArgs, DockerGenerator
-from topology.go import GoGenArgs, GoGenerator
-from topology.jaeger import JaegerGenArgs, JaegerGenerator
-from topology.net import (
-    SubnetGenerator,
-    DEFAULT_NETWORK,
-)
-from topology.prometheus import PrometheusGenArgs, PrometheusGenerator
-from topology.supervisor import SupervisorGenArgs, SupervisorGenerator
-from topology.topo import TopoGenArgs, TopoGenerator
+from topology.common import ArgsBase, TopoID
 
 DEFAULT_TOPOLOGY_FILE = "topology/Default.topo"
 
@@ -68,32 +57,120 @@ class ConfigGenerator(object):
 
         :param ConfigGenArgs args: Contains the passed command line arguments.
         """
+        from lib.util import load_yaml_file
+        from topology.allocations import AllocationStore
+        from topology.profiling import Profiler
+        from topology.sink import OutputSink
         self.args = args
         self.topo_config = load_yaml_file(self.args.topo_config)
         if self.args.sig and not self.args.docker:
             logging.critical("Cannot use sig without docker!")
             sys.exit(1)
+        if self.args.docker_shards and not self.args.docker:
+            logging.critical("Cannot use docker-shards without docker!")
+            sys.exit(1)
+        if self.args.shared_dispatcher and not self.args.docker:
+            logging.critical("Cannot use shared-dispatcher without docker!")
+            sys.exit(1)
+        if self.args.docker_per_as and not self.args.docker:
+            logging.critical("Cannot use docker-per-as without docker!")
+            sys.exit(1)
+        if self.args.docker_per_as and self.args.sig:
+            logging.critical("Cannot use sig with docker-per-as!")
+            sys.exit(1)
         self.default_mtu = None
+        self.topo_gen = None
+        self.args.sink = OutputSink()
+        self.args.profiler = Profiler(enabled=bool(self.args.profile or self.args.profile_dir),
+                                      pstats_dir=self.args.profile_dir)
+        self.allocations = AllocationStore()
+        if self.args.keep_allocations:
+            self.allocations = AllocationStore.load(
+                os.path.join(self.args.output_dir, ALLOCATIONS_FILE))
         self._read_defaults(self.args.network)
 
     def _read_defaults(self, network):
         """
         Configure default network.
         """
+        from topology.net import DEFAULT_NETWORK, ComputedSubnetGenerator, SubnetGenerator
+        from topology.topo import ADDR_TYPE_4, ADDR_TYPE_6
         defaults = self.topo_config.get("defaults", {})
-        self.subnet_gen4 = SubnetGenerator(DEFAULT_NETWORK, self.args.docker, self.args.in_docker)
-        self.subnet_gen6 = SubnetGenerator(DEFAULT6_NETWORK, self.args.docker, self.args.in_docker)
+        subnet_gen_cls = SubnetGenerator
+        if self.args.computed_addressing:
+            subnet_gen_cls = ComputedSubnetGenerator
+        subnets = self.allocations.subnets
+        self.subnet_gen4 = subnet_gen_cls(network or DEFAULT_NETWORK, self.args.docker,
+                                          self.args.in_docker, subnets.get(ADDR_TYPE_4))
+        self.subnet_gen6 = subnet_gen_cls(DEFAULT6_NETWORK, self.args.docker, self.args.in_docker,
+                                          subnets.get(ADDR_TYPE_6))
         self.default_mtu = defaults.get("mtu", DEFAULT_MTU)
 
     def generate_all(self):
         """
         Generate all needed files.
         """
+        from topology.manifest import Manifest
+        profiler = self.args.profiler
         self._ensure_uniq_ases()
         topo_dicts, self.networks = self._generate_topology()
-        self._generate_with_topo(topo_dicts)
-        self._write_networks_conf(self.networks, NETWORKS_FILE)
-        self._write_sciond_conf(self.networks, SCIOND_ADDRESSES_FILE)
+        # In stream mode, the AS entries of the manifest are computed while the ASes are
+        # emitted, so that every AS is only built once. An incremental run needs them upfront.
+        defer = self.args.stream and not self.args.incremental
+        with profiler.phase('manifest'):
+            manifest = Manifest.build(self.args, self.topo_config, topo_dicts, self.networks,
+                                      [] if defer else None)
+            topo_ids, cert_isds = list(topo_dicts), sorted(manifest.crypto, key=int)
+            if self.args.incremental:
+                topo_ids, cert_isds = self._prepare_incremental(topo_dicts, manifest)
+        self._generate_with_topo(topo_dicts, topo_ids, cert_isds, manifest if defer else None)
+        with profiler.phase('networks'):
+            self._write_networks_conf(self.networks, NETWORKS_FILE)
+            self._write_sciond_conf(self.networks, SCIOND_ADDRESSES_FILE)
+        with profiler.phase('flush'):
+            self.args.sink.flush()
+            # The manifest is written last, so that it only covers files that are on disk.
+            manifest.write(os.path.join(self.args.output_dir, MANIFEST_FILE))
+        if self.args.output_archive:
+            from topology.archive import write_archive
+            with profiler.phase('archive'):
+                write_archive(self.args.output_dir, self.args.output_archive)
+        if profiler.enabled:
+            print(profiler.report())
+            profiler.dump_stats()
+
+    def _prepare_incremental(self, topo_dicts, manifest):
+        """
+        Compare the manifest with the one of the previous run, and remove the output that is
+        outdated.
+
+        :returns: The ASes that need to be re-emitted, and the ISDs whose certificates need to
+            be regenerated.
+        """
+        from topology.manifest import Manifest
+        old = Manifest.load(os.path.join(self.args.output_dir, MANIFEST_FILE))
+        for ia in manifest.removed(old):
+            self._remove_as_dir(TopoID(ia))
+        if manifest.full_regen(old):
+            logging.info("Generation inputs changed, regenerating all ASes")
+            for topo_id in topo_dicts:
+                self._remove_as_dir(topo_id)
+            return list(topo_dicts), sorted(manifest.crypto, key=int)
+        changed = set(manifest.changed(old))
+        for topo_id in topo_dicts:
+            if str(topo_id) not in changed:
+                continue
+            base = topo_id.base_dir(self.args.output_dir)
+            for elem in manifest.stale_elements(old, str(topo_id)):
+                for name in (elem, 'disp_%s' % elem):
+                    shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        cert_isds = manifest.changed_isds(old)
+        logging.info("Regenerating %d of %d ASes, and the certificates of %d of %d ISDs",
+                     len(changed), len(topo_dicts), len(cert_isds), len(manifest.crypto))
+        return [topo_id for topo_id in topo_dicts if str(topo_id) in changed], cert_isds
+
+    def _remove_as_dir(self, topo_id):
+        shutil.rmtree(topo_id.base_dir(self.args.output_dir), ignore_errors=True)
 
     def _ensure_uniq_ases(self):
         seen = set()
@@ -104,70 +181,133 @@ class ConfigGenerator(object):
                 sys.exit(1)
             seen.add(ia.as_str())
 
-    def _generate_with_topo(self, topo_dicts):
-        self._generate_go(topo_dicts)
+    def _generate_with_topo(self, topo_dicts, topo_ids, cert_isds, manifest=None):
+        """
+        Generate the configuration of the services.
+
+        :param dict topo_dicts: The generated topo dicts from TopoGenerator.
+        :param list topo_ids: The ASes whose directories are (re-)emitted. The global files
+            are always generated for all ASes.
+        :param list cert_isds: The ISDs whose certificates are generated. If empty, the existing
+            certificates are only copied into the element directories of topo_ids.
+        :param Manifest manifest: If set, the entries of topo_ids are added to it while the
+            ASes are emitted.
+        """
+        from topology.cert import CertGenerator
+        from topology.docker import DockerGenerator
+        from topology.go import GoGenerator
+        from topology.manifest import elem_networks
+        from topology.parallel import map_shards
+        from topology.prometheus import PrometheusGenerator
+        from topology.supervisor import SupervisorGenerator
+        go_gen = GoGenerator(self._go_args(topo_dicts))
         if self.args.docker:
-            self._generate_docker(topo_dicts)
+            srv_gen = DockerGenerator(self._docker_args(topo_dicts))
         else:
-            self._generate_supervisor(topo_dicts)
-        self._generate_jaeger(topo_dicts)
-        self._generate_prom_conf(topo_dicts)
-        self._generate_certs_trcs(topo_dicts)
+            srv_gen = SupervisorGenerator(self._supervisor_args(topo_dicts))
+        prom_gen = PrometheusGenerator(self._prometheus_args(topo_dicts))
+        srv_name = 'docker' if self.args.docker else 'supervisor'
+        profiler = self.args.profiler
+        elem_nets = elem_networks(self.networks) if manifest else None
+
+        def generate_as(topo_ids):
+            # The shards may run in worker processes, their phases are merged below.
+            prof = profiler.child()
+            groups = [topo_ids]
+            if self.args.stream:
+                # Only the most recently built AS is kept, so every AS is emitted by all
+                # generators before the next one is built.
+                groups = [[topo_id] for topo_id in topo_ids]
+            srv_conf, prom_conf, ases = {}, {}, {}
+            for ids in groups:
+                with prof.phase('topo files'):
+                    self.topo_gen.write_as_topos(ids)
+                with prof.phase('go'):
+                    go_gen.generate_as(ids)
+                with prof.phase(srv_name):
+                    srv_conf.update(srv_gen.generate_as(ids) or {})
+                with prof.phase('prometheus'):
+                    prom_conf.update(prom_gen.generate_as(ids))
+                if manifest:
+                    with prof.phase('manifest'):
+                        ases.update(manifest.as_entries(self.topo_config, topo_dicts, elem_nets,
+                                                        ids))
+            with prof.phase('flush'):
+                self.args.sink.flush()
+            return srv_conf, prom_conf, ases, prof.results()
 
-    def _generate_certs_trcs(self, topo_dicts):
+        # Pending writes must not be inherited by the worker processes.
+        self.args.sink.flush()
+        with profiler.phase('per-AS'):
+            as_confs = map_shards(generate_as, topo_ids, self.args.jobs)
+        for _, _, ases, results in as_confs:
+            profiler.merge(*results)
+            if manifest:
+                manifest.ases.update(ases)
+        if not self.args.docker:
+            with profiler.phase('go'):
+                go_gen.generate_disp()
+        with profiler.phase(srv_name):
+            srv_gen.generate([srv_conf for srv_conf, _, _, _ in as_confs])
+        with profiler.phase('jaeger'):
+            self._generate_jaeger(topo_dicts)
+        with profiler.phase('prometheus'):
+            prom_gen.generate([prom_conf for _, prom_conf, _, _ in as_confs])
+        # The cert generation reads and writes the AS directories with external tools.
+        with profiler.phase('flush'):
+            self.args.sink.flush()
+        with profiler.phase('certs'):
+            if cert_isds:
+                self._generate_certs_trcs(topo_dicts, cert_isds)
+            else:
+                CertGenerator(self._cert_args()).distribute(topo_dicts, topo_ids)
+
+    def _generate_certs_trcs(self, topo_dicts, isds):
+        from topology.cert import CertGenerator
         certgen = CertGenerator(self._cert_args())
-        certgen.generate(topo_dicts)
+        certgen.generate(topo_dicts, isds)
 
     def _cert_args(self):
+        from topology.cert import CertGenArgs
         return CertGenArgs(self.args, self.topo_config)
 
-    def _generate_go(self, topo_dicts):
-        args = self._go_args(topo_dicts)
-        go_gen = GoGenerator(args)
-        go_gen.generate_br()
-        go_gen.generate_sciond()
-        go_gen.generate_control_service()
-        go_gen.generate_co()
-        go_gen.generate_disp()
-
     def _go_args(self, topo_dicts):
+        from topology.go import GoGenArgs
         return GoGenArgs(self.args, topo_dicts, self.networks)
 
     def _generate_jaeger(self, topo_dicts):
+        from topology.jaeger import JaegerGenArgs, JaegerGenerator
         args = JaegerGenArgs(self.args, topo_dicts)
         jaeger_gen = JaegerGenerator(args)
         jaeger_gen.generate()
 
     def _generate_topology(self):
-        topo_gen = TopoGenerator(self._topo_args())
-        return topo_gen.generate()
+        from topology.allocations import AllocationStore
+        from topology.topo import TopoGenerator
+        self.topo_gen = TopoGenerator(self._topo_args())
+        topo_dicts, networks = self.topo_gen.generate()
+        self.args.graph = self.topo_gen.graph
+        topo_args = self.topo_gen.args
+        allocations = AllocationStore.build(topo_args.subnet_gen, topo_args.port_gen,
+                                            self.topo_gen.link_ifids)
+        allocations.write(os.path.join(self.args.output_dir, ALLOCATIONS_FILE))
+        return topo_dicts, networks
 
     def _topo_args(self):
+        from topology.topo import TopoGenArgs
         return TopoGenArgs(self.args, self.topo_config, self.subnet_gen4,
-                           self.subnet_gen6, self.default_mtu)
-
-    def _generate_supervisor(self, topo_dicts):
-        args = self._supervisor_args(topo_dicts)
-        super_gen = SupervisorGenerator(args)
-        super_gen.generate()
+                           self.subnet_gen6, self.default_mtu, self.allocations)
 
     def _supervisor_args(self, topo_dicts):
+        from topology.supervisor import SupervisorGenArgs
         return SupervisorGenArgs(self.args, topo_dicts)
 
-    def _generate_docker(self, topo_dicts):
-        args = self._docker_args(topo_dicts)
-        docker_gen = DockerGenerator(args)
-        docker_gen.generate()
-
     def _docker_args(self, topo_dicts):
+        from topology.docker import DockerGenArgs
         return DockerGenArgs(self.args, topo_dicts, self.networks)
 
-    def _generate_prom_conf(self, topo_dicts):
-        args = self._prometheus_args(topo_dicts)
-        prom_gen = PrometheusGenerator(args)
-        prom_gen.generate()
-
     def _prometheus_args(self, topo_dicts):
+        from topology.prometheus import PrometheusGenArgs
         return PrometheusGenArgs(self.args, topo_dicts, self.networks)
 
     def _write_ca_files(self, topo_dicts, ca_files):
@@ -177,7 +317,7 @@ class ConfigGenerator(object):
         for isd in isds:
             base = os.path.join(self.args.output_dir, "CAS")
             for path, value in ca_files[int(isd)].items():
-                write_file(os.path.join(base, path), value.decode())
+                self.args.sink.write(os.path.join(base, path), value.decode())
 
     def _write_networks_conf(self, networks, out_file):
         config = configparser.ConfigParser(interpolation=None)
@@ -188,14 +328,15 @@ class ConfigGenerator(object):
             config[net] = sub_conf
         text = StringIO()
         config.write(text)
-        write_file(os.path.join(self.args.output_dir, out_file), text.getvalue())
+        self.args.sink.write(os.path.join(self.args.output_dir, out_file), text.getvalue())
 
     def _write_sciond_conf(self, networks, out_file):
+        from lib.serialization import json_dumps
         d = dict()
         for i, net in enumerate(networks):
             for prog, ip_net in networks[net].items():
                 if prog.startswith("sd"):
                     ia = prog[2:].replace("_", ":")
                     d[ia] = str(ip_net.ip)
-        with open(os.path.join(self.args.output_dir, out_file), mode="w") as f:
-            json.dump(d, f, sort_keys=True, indent=4)
+        self.args.sink.write(os.path.join(self.args.output_dir, out_file),
+                             json_dumps(d, indent=4, sort_keys=True))
@@ -0,0 +1,177 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`crypto_cache` --- Cache of the generated crypto material
+==============================================================
+
+The keys, certificates and TRCs that scion-pki generates for an ISD only depend
+on its ASes and their authoritative, core, issuing, voting and cert_issuer
+attributes. The cache stores the material of every ISD under the hash of these
+inputs, so that regenerating an unchanged topology restores it instead of
+running scion-pki again. Every ISD is cached and invalidated independently.
+"""
+# Stdlib
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+# SCION
+from lib.scion_addr import ISD_AS
+from topology.manifest import content_hash
+
+CRYPTO_CACHE_VERSION = 2
+# The AS attributes read by scion-pki tmpl topo.
+PKI_ATTRS = ('authoritative', 'core', 'issuing', 'voting', 'cert_issuer')
+# The files that scion-pki writes to the ISD and AS directories: the versioned templates
+# of tmpl topo, the private (keys) and public (pub) keys, the TRCs (with their parts) and
+# the certificates. The master keys are written to the keys directory. tmpl topo is run
+# before an entry is restored (see CertGenerator.generate), so that the restored tree is
+# the same as a fresh run, including the templates that are not cached.
+ISD_ENTRIES = ('trc-v*.toml', 'trcs')
+AS_ENTRIES = ('as-v*.toml', 'issuer-v*.toml', 'keys.toml', 'keys', 'pub', 'certs', 'customers')
+# scion-pki generates material that is valid for a year, older entries are regenerated
+# well before it expires.
+MAX_AGE = 30 * 24 * 3600
+
+
+class CryptoCache(object):
+    def __init__(self, cache_dir, out_dir, pki_path):
+        """
+        :param str cache_dir: The directory of the cache entries.
+        :param str out_dir: The output directory of the generator.
+        :param str pki_path: The path to scion-pki. The entries of other versions of the
+            tool are not used.
+        """
+        self.cache_dir = cache_dir
+        self.out_dir = out_dir
+        self._tool_hash = _file_hash(pki_path)
+
+    def isd_key(self, isd, topo_config):
+        """
+        Return the cache key of the crypto material of an ISD.
+
+        :param str isd: The ISD number.
+        :param dict topo_config: The parsed topology config.
+        """
+        return content_hash({
+            'version': CRYPTO_CACHE_VERSION,
+            'tool': self._tool_hash,
+            'isd': isd,
+            'ASes': pki_inputs(topo_config).get(isd, {}),
+        })
+
+    def lookup(self, isd, key):
+        """
+        Return the path of the entry of the ISD with the given key, or None if it is
+        not cached (or too old).
+        """
+        entry = self._entry(isd, key)
+        try:
+            if time.time() - os.path.getmtime(entry) <= MAX_AGE:
+                return entry
+        except OSError:
+            pass
+        return None
+
+    def restore(self, isd, entry):
+        """
+        Copy the crypto material of a cache entry into the ISD directory.
+
+        :param str isd: The ISD number.
+        :param str entry: The path of the entry, as returned by lookup.
+        """
+        _copy_tree(entry, os.path.join(self.out_dir, 'ISD%s' % isd))
+
+    def store(self, isd, key):
+        """
+        Store the crypto material of the ISD directory as the entry with the given key,
+        and remove the other entries of the ISD. Failures are logged, as the cache is
+        only an optimization.
+
+        :param str isd: The ISD number.
+        :param str key: The cache key, as returned by isd_key.
+        """
+        isd_dir = os.path.join(self.out_dir, 'ISD%s' % isd)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = tempfile.mkdtemp(prefix='.ISD%s-' % isd, dir=self.cache_dir)
+        except OSError as e:
+            logging.warning("Not caching the crypto material of ISD %s: %s", isd, e)
+            return
+        try:
+            for path in _crypto_entries(isd_dir):
+                rel = os.path.relpath(path, isd_dir)
+                if os.path.isdir(path):
+                    _copy_tree(path, os.path.join(tmp, rel))
+                else:
+                    os.makedirs(os.path.dirname(os.path.join(tmp, rel)), exist_ok=True)
+                    shutil.copy(path, os.path.join(tmp, rel))
+            for old in glob.glob(os.path.join(self.cache_dir, 'ISD%s-*' % isd)):
+                shutil.rmtree(old)
+            os.rename(tmp, self._entry(isd, key))
+        except OSError as e:
+            logging.warning("Not caching the crypto material of ISD %s: %s", isd, e)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _entry(self, isd, key):
+        return os.path.join(self.cache_dir, 'ISD%s-%s' % (isd, key))
+
+
+def pki_inputs(topo_config):
+    """
+    Return the AS attributes read by scion-pki, per ISD.
+
+    :param dict topo_config: The parsed topology config.
+    :returns: The PKI_ATTRS of every AS, keyed by the ISD number and the ISD-AS string.
+    :rtype: dict
+    """
+    isds = {}
+    for ia, as_conf in topo_config['ASes'].items():
+        isds.setdefault(ISD_AS(ia).isd_str(), {})[ia] = {
+            attr: as_conf.get(attr) for attr in PKI_ATTRS}
+    return isds
+
+
+def _crypto_entries(isd_dir):
+    for pattern in ISD_ENTRIES:
+        yield from glob.glob(os.path.join(isd_dir, pattern))
+    for pattern in AS_ENTRIES:
+        yield from glob.glob(os.path.join(isd_dir, 'AS*', pattern))
+
+
+def _copy_tree(src, dst):
+    """
+    Copy the files of src into dst (like cp -r src/. dst), creating the missing
+    directories and replacing the existing files.
+    """
+    for dir_, _, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(dir_, src))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            shutil.copy(os.path.join(dir_, name), os.path.join(target, name))
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
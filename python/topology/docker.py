@@ -14,24 +14,44 @@
 
 # Stdlib
 import copy
+import glob
+import ipaddress
 import os
+import textwrap
+from collections import defaultdict
 # External packages
-import yaml
 # SCION
 from lib.defines import DOCKER_COMPOSE_CONFIG_VERSION
-from lib.util import (
-    write_file,
-)
+from lib.serialization import json_dumps, yaml_dump
 from topology.common import (
     ArgsTopoDicts,
+    disp_addr_elem,
+    disp_name,
+    disp_names,
+    DISP_CONFIG_NAME,
+    DOCKER_DISP_SOCK,
+    docker_healthcheck,
+    docker_healthy,
     docker_image,
     DOCKER_USR_VOL,
-    sciond_svc_name
+    sciond_name,
+    sciond_svc_name,
+    topo_iter,
 )
 from topology.docker_utils import DockerUtilsGenArgs, DockerUtilsGenerator
+from topology.net import socket_address_str
+from topology.prometheus import CS_PROM_PORT, DEFAULT_BR_PROM_PORT, SCIOND_PROM_PORT
 from topology.sig import SIGGenArgs, SIGGenerator
+from topology.supervisor import SupervisorGenArgs, SupervisorGenerator
 
 DOCKER_CONF = 'scion-dc.yml'
+# The index of the per-shard compose projects, see DockerGenerator._write_shards.
+DOCKER_SHARDS_CONF = 'scion-dc-shards.json'
+DOCKER_SHARD_CONF = 'scion-dc-%s.yml'
+# The files in the AS directory that configure the container of the AS with --docker-per-as,
+# see DockerGenerator._as_container_conf.
+DOCKER_AS_ADDRS = 'docker-addrs'
+DOCKER_AS_SUPERVISOR_CONF = 'docker-supervisord.conf'
 
 
 class DockerGenArgs(ArgsTopoDicts):
@@ -58,19 +78,182 @@ class DockerGenerator(object):
         self.output_base = os.environ.get('SCION_OUTPUT_BASE', os.getcwd())
         self.user_spec = os.environ.get('SCION_USERSPEC', '$LOGNAME')
         self.prefix = 'scion_docker_' if self.args.in_docker else 'scion_'
-
-    def generate(self):
         self._create_networks()
+
+    def generate(self, as_confs=None):
+        """
+        Generate the compose file.
+
+        :param list as_confs: The per-AS compose fragments returned by generate_as. The
+            fragments of ASes which are not contained are generated here.
+        """
+        fragments = {}
+        for as_conf in as_confs or []:
+            fragments.update(as_conf)
+        self._remove_stale_shards()
+        if self.args.docker_shards:
+            self._write_shards(fragments)
+            return
+        if self.args.stream:
+            self._write_stream(fragments)
+            return
         for topo_id, topo in self.args.topo_dicts.items():
-            base = os.path.join(self.output_base, topo_id.base_dir(self.args.output_dir))
-            self._gen_topo(topo_id, topo, base)
+            fragment = fragments.get(topo_id)
+            if fragment is None:
+                fragment = self._gen_topo(topo_id, topo)
+            self.dc_conf['services'].update(fragment['services'])
+            self.dc_conf['volumes'].update(fragment['volumes'])
         if self.args.sig:
             self._gen_sig()
         docker_utils_gen = DockerUtilsGenerator(self._docker_utils_args())
         self.dc_conf = docker_utils_gen.generate()
 
-        write_file(os.path.join(self.args.output_dir, DOCKER_CONF),
-                   yaml.dump(self.dc_conf, default_flow_style=False))
+        self.args.sink.write(os.path.join(self.args.output_dir, DOCKER_CONF),
+                             yaml_dump(self.dc_conf, default_flow_style=False))
+
+    def generate_as(self, topo_ids=None):
+        """
+        Generate the compose services and volumes of the per-AS services.
+
+        :param list topo_ids: If set, only generate the services of these ASes.
+        :returns: The compose fragment, containing the 'services' and 'volumes', per AS. In
+            streaming mode, see _stream_fragment.
+        :rtype: dict
+        """
+        fragments = {}
+        if self.args.stream and not self.args.docker_shards:
+            for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+                fragments[topo_id] = self._stream_fragment(topo_id, topo)
+            return fragments
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+            fragments[topo_id] = self._gen_topo(topo_id, topo)
+        return fragments
+
+    def _stream_fragment(self, topo_id, topo):
+        """
+        Generate the services of an AS, including its SIG and tester, for the streamed
+        compose file. The services are rendered right away, so that the topo dict of the AS
+        is only needed while it is emitted by the other generators as well.
+
+        :returns: The rendered 'services', the 'volumes', and the 'sig_volumes'.
+        :rtype: dict
+        """
+        conf = self._gen_topo(topo_id, topo)
+        sig_conf = {'services': conf['services'], 'volumes': {}}
+        if self.args.sig:
+            SIGGenerator(SIGGenArgs(self.args, sig_conf, self.bridges,
+                                    self.elem_networks)).generate_as([topo_id])
+        DockerUtilsGenerator(DockerUtilsGenArgs(self.args, conf, self.bridges,
+                                                self.elem_networks)).generate_as([topo_id])
+        return {
+            'services': _render_services(conf['services']),
+            'volumes': conf['volumes'],
+            'sig_volumes': sig_conf['volumes'],
+        }
+
+    def _write_stream(self, fragments):
+        """
+        Write the compose file one AS at a time, from the fragments rendered by generate_as.
+        Only the rendered services and the volume names of the ASes are kept until the end.
+        The file describes the same config as the one written by generate, but the services
+        are not sorted across ASes.
+
+        :param dict fragments: The fragments of generate_as. The fragments of ASes which are
+            not contained are generated here.
+        """
+        sig_volumes = {}
+        path = os.path.join(self.args.output_dir, DOCKER_CONF)
+        with self.args.sink.stream(path) as f:
+            f.write(yaml_dump({'networks': self.dc_conf['networks']}, default_flow_style=False))
+            f.write('services:\n')
+            for topo_id in self.args.topo_dicts:
+                fragment = fragments.get(topo_id)
+                if fragment is None:
+                    fragment = self._stream_fragment(topo_id, self.args.topo_dicts[topo_id])
+                f.write(fragment['services'])
+                self.dc_conf['volumes'].update(fragment['volumes'])
+                sig_volumes.update(fragment['sig_volumes'])
+            # The SIG volumes follow the ones of the ASes, as in generate.
+            self.dc_conf['volumes'].update(sig_volumes)
+            self.dc_conf['services'] = {}
+            utils_gen = DockerUtilsGenerator(self._docker_utils_args())
+            utils_gen.generate_utils()
+            _write_services(f, self.dc_conf['services'])
+            f.write(yaml_dump({'version': self.dc_conf['version'],
+                               'volumes': self.dc_conf['volumes']}, default_flow_style=False))
+
+    def _write_shards(self, fragments):
+        """
+        Write one compose project per shard of ASes (per ISD, or per group of
+        args.docker_shards ASes), so that the projects can be brought up concurrently.
+
+        The networks that connect the ASes of several shards are declared in the main compose
+        file with a fixed name, and are external in the shards. They are created by the
+        launcher (topology/launcher.py). The volumes are named as well, so that the utility
+        services of the main compose file act on the volumes of all shards.
+        """
+        shard_confs = {}
+        net_shards = defaultdict(set)
+        for shard, topo_ids in self._shards().items():
+            conf = {'version': self.dc_conf['version'], 'services': {}, 'networks': {},
+                    'volumes': {}}
+            for topo_id in topo_ids:
+                fragment = fragments.get(topo_id)
+                if fragment is None:
+                    fragment = self._gen_topo(topo_id, self.args.topo_dicts[topo_id])
+                conf['services'].update(fragment['services'])
+                conf['volumes'].update(fragment['volumes'])
+            if self.args.sig:
+                SIGGenerator(SIGGenArgs(self.args, conf, self.bridges,
+                                        self.elem_networks)).generate_as(topo_ids)
+            DockerUtilsGenerator(DockerUtilsGenArgs(self.args, conf, self.bridges,
+                                                    self.elem_networks)).generate_as(topo_ids)
+            for service in conf['services'].values():
+                for net in service.get('networks', {}):
+                    net_shards[net].add(shard)
+            shard_confs[shard] = conf
+        shared = {net for net, shards in net_shards.items() if len(shards) > 1}
+        for shard, conf in shard_confs.items():
+            for net, net_conf in self.dc_conf['networks'].items():
+                if shard in net_shards[net]:
+                    conf['networks'][net] = ({'external': True, 'name': net} if net in shared
+                                             else net_conf)
+            conf['volumes'] = {vol: {'name': vol} for vol in conf['volumes']}
+            self.dc_conf['volumes'].update(conf['volumes'])
+            self.args.sink.write(os.path.join(self.args.output_dir, DOCKER_SHARD_CONF % shard),
+                                 yaml_dump(conf, default_flow_style=False))
+        self.dc_conf['networks'] = {net: dict(net_conf, name=net) for net, net_conf
+                                    in self.dc_conf['networks'].items() if net in shared}
+        DockerUtilsGenerator(self._docker_utils_args()).generate_utils()
+        self.args.sink.write(os.path.join(self.args.output_dir, DOCKER_CONF),
+                             yaml_dump(self.dc_conf, default_flow_style=False))
+        index = {'shards': {shard: DOCKER_SHARD_CONF % shard for shard in shard_confs}}
+        self.args.sink.write(os.path.join(self.args.output_dir, DOCKER_SHARDS_CONF),
+                             json_dumps(index, sort_keys=True) + '\n')
+
+    def _shards(self):
+        """
+        :returns: The ASes of every shard, keyed by the shard name.
+        :rtype: dict
+        """
+        shards = {}
+        for i, topo_id in enumerate(self.args.topo_dicts):
+            if self.args.docker_shards == 'isd':
+                name = 'isd%s' % topo_id.isd_str()
+            else:
+                name = 'g%03d' % (i // self.args.docker_shards)
+            shards.setdefault(name, []).append(topo_id)
+        return shards
+
+    def _remove_stale_shards(self):
+        # The output directory is kept by incremental runs, the shard projects of a previous run
+        # must not be picked up by the launcher.
+        paths = glob.glob(os.path.join(self.args.output_dir, DOCKER_SHARD_CONF % '*'))
+        for path in paths + [os.path.join(self.args.output_dir, DOCKER_SHARDS_CONF)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
     def _docker_utils_args(self):
         return DockerUtilsGenArgs(self.args, self.dc_conf, self.bridges, self.elem_networks)
@@ -78,11 +261,17 @@ class DockerGenerator(object):
     def _sig_args(self):
         return SIGGenArgs(self.args,  self.dc_conf, self.bridges, self.elem_networks)
 
-    def _gen_topo(self, topo_id, topo, base):
-        self._dispatcher_conf(topo_id, topo, base)
-        self._br_conf(topo_id, topo, base)
-        self._control_service_conf(topo_id, topo, base)
-        self._sciond_conf(topo_id, base)
+    def _gen_topo(self, topo_id, topo):
+        base = os.path.join(self.output_base, topo_id.base_dir(self.args.output_dir))
+        as_conf = {'services': {}, 'volumes': {}}
+        if self.args.docker_per_as:
+            self._as_container_conf(as_conf, topo_id, topo, base)
+            return as_conf
+        self._dispatcher_conf(as_conf, topo_id, topo, base)
+        self._br_conf(as_conf, topo_id, topo, base)
+        self._control_service_conf(as_conf, topo_id, topo, base)
+        self._sciond_conf(as_conf, topo_id, base)
+        return as_conf
 
     def _gen_sig(self):
         sig_gen = SIGGenerator(self._sig_args())
@@ -116,22 +305,22 @@ class DockerGenerator(object):
             if network.version == 6:
                 self.dc_conf['networks'][net_name]['enable_ipv6'] = True
 
-    def _br_conf(self, topo_id, topo, base):
-        for k, _ in topo.get("BorderRouters", {}).items():
-            disp_id = k
+    def _br_conf(self, as_conf, topo_id, topo, base):
+        for k, v in topo.border_routers.items():
+            disp = disp_name(self.args, topo_id, k)
             entry = {
                 'image': docker_image(self.args, 'border'),
                 'container_name': self.prefix + k,
-                'depends_on': [
-                    'scion_disp_%s' % disp_id,
-                ],
+                'depends_on': docker_healthy('scion_%s' % disp),
                 'environment': {
                     'SU_EXEC_USERSPEC': self.user_spec,
                 },
+                'healthcheck': docker_healthcheck(
+                    '-http', socket_address_str(v.internal_addr.ip, DEFAULT_BR_PROM_PORT)),
                 'networks': {},
                 'volumes': [
                     *DOCKER_USR_VOL,
-                    self._disp_vol(disp_id),
+                    self._disp_vol(disp),
                     self._logs_vol(),
                     '%s:/share/conf:ro' % os.path.join(base, k)
                 ],
@@ -153,83 +342,86 @@ class DockerGenerator(object):
                 entry['networks'][self.bridges[net['net']]] = {
                     '%s_address' % ipv: str(net[ipv])
                 }
-            self.dc_conf['services']['scion_%s' % k] = entry
+            as_conf['services']['scion_%s' % k] = entry
 
-    def _control_service_conf(self, topo_id, topo, base):
-        for k, v in topo.get("ControlService", {}).items():
+    def _control_service_conf(self, as_conf, topo_id, topo, base):
+        for k, v in topo.control_services.items():
+            disp = disp_name(self.args, topo_id, k)
             entry = {
                 'image': docker_image(self.args, 'cs'),
                 'container_name': self.prefix + k,
-                'depends_on': ['scion_disp_%s' % k],
+                'depends_on': docker_healthy('scion_%s' % disp),
                 'environment': {
                     'SU_EXEC_USERSPEC': self.user_spec,
                 },
-                'network_mode': 'service:scion_disp_%s' % k,
+                'healthcheck': docker_healthcheck(
+                    '-http', socket_address_str(v.addr.ip, CS_PROM_PORT)),
+                'network_mode': 'service:scion_%s' % disp,
                 'volumes': [
                     *DOCKER_USR_VOL,
                     self._cache_vol(),
                     self._logs_vol(),
                     self._certs_vol(),
                     '%s:/share/conf:ro' % os.path.join(base, k),
-                    self._disp_vol(k),
+                    self._disp_vol(disp),
                 ],
                 'command': []
             }
-            self.dc_conf['services']['scion_%s' % k] = entry
+            as_conf['services']['scion_%s' % k] = entry
 
-    def _dispatcher_conf(self, topo_id, topo, base):
+    def _dispatcher_conf(self, as_conf, topo_id, topo, base):
         image = 'dispatcher_go'
         base_entry = {
             'image': docker_image(self.args, image),
             'environment': {
                 'SU_EXEC_USERSPEC': self.user_spec,
             },
+            'healthcheck': docker_healthcheck('-unix', DOCKER_DISP_SOCK),
             'networks': {},
             'volumes': [
                 *DOCKER_USR_VOL,
                 self._logs_vol()
             ]
         }
-        keys = list(topo.get("BorderRouters", {})) + list(topo.get("ControlService", {}))
-        for disp_id in keys:
+        for disp in disp_names(self.args, topo_id, topo):
+            if disp.startswith('disp_sig_'):
+                # Generated by the SIGGenerator.
+                continue
             entry = copy.deepcopy(base_entry)
-            net_key = disp_id
-            if disp_id.startswith('br'):
-                net_key += '_ctrl'
-            net = self.elem_networks[net_key][0]
+            net = self.elem_networks[disp_addr_elem(topo_id, disp)][0]
             ipv = 'ipv4'
             if ipv not in net:
                 ipv = 'ipv6'
             ip = str(net[ipv])
             entry['networks'][self.bridges[net['net']]] = {'%s_address' % ipv: ip}
-            entry['container_name'] = '%sdisp_%s' % (self.prefix, disp_id)
-            entry['volumes'].append(self._disp_vol(disp_id))
-            conf = '%s:/share/conf:rw' % os.path.join(base, 'disp_%s' % disp_id)
+            entry['container_name'] = self.prefix + disp
+            entry['volumes'].append(self._disp_vol(disp))
+            conf = '%s:/share/conf:rw' % os.path.join(base, disp)
             entry['volumes'].append(conf)
 
-            self.dc_conf['services']['scion_disp_%s' % disp_id] = entry
-            self.dc_conf['volumes'][self._disp_vol(disp_id).split(':')[0]] = None
+            as_conf['services']['scion_%s' % disp] = entry
+            as_conf['volumes'][self._disp_vol(disp).split(':')[0]] = None
 
-    def _sciond_conf(self, topo_id, base):
+    def _sciond_conf(self, as_conf, topo_id, base):
         name = sciond_svc_name(topo_id)
         net = self.elem_networks["sd" + topo_id.file_fmt()][0]
         ipv = 'ipv4'
         if ipv not in net:
             ipv = 'ipv6'
         ip = str(net[ipv])
-        disp_id = 'cs%s-1' % topo_id.file_fmt()
+        disp = disp_name(self.args, topo_id, 'cs%s-1' % topo_id.file_fmt())
         entry = {
             'image': docker_image(self.args, 'sciond'),
             'container_name': '%ssd%s' % (self.prefix, topo_id.file_fmt()),
-            'depends_on': [
-                'scion_disp_%s' % disp_id
-            ],
+            'depends_on': docker_healthy('scion_%s' % disp),
             'environment': {
                 'SU_EXEC_USERSPEC': self.user_spec,
             },
+            'healthcheck': docker_healthcheck(
+                '-http', socket_address_str(net[ipv], SCIOND_PROM_PORT)),
             'volumes': [
                 *DOCKER_USR_VOL,
-                self._disp_vol(disp_id),
+                self._disp_vol(disp),
                 self._cache_vol(),
                 self._logs_vol(),
                 self._certs_vol(),
@@ -239,10 +431,72 @@ class DockerGenerator(object):
                 self.bridges[net['net']]: {'%s_address' % ipv: ip}
             }
         }
-        self.dc_conf['services'][name] = entry
+        as_conf['services'][name] = entry
 
-    def _disp_vol(self, disp_id):
-        return 'vol_%sdisp_%s:/run/shm/dispatcher:rw' % (self.prefix, disp_id)
+    def _as_container_conf(self, as_conf, topo_id, topo, base):
+        """
+        Generate the container that runs all services of the AS with supervisord. The
+        container has the addresses of all elements of the AS: docker assigns the first address
+        on every network, the entrypoint of the image (docker/perapp/app/as.sh) adds the others
+        from the DOCKER_AS_ADDRS file. The AS directory is mounted at its relative path below
+        the working directory, which is where the element configs expect it.
+        """
+        rel_base = topo_id.base_dir(self.args.output_dir)
+        elems = list(topo.control_services) + [sciond_name(topo_id)]
+        for k in topo.border_routers:
+            elems.extend([k + '_ctrl', k + '_internal', k])
+        networks = {}
+        primary = {}
+        addrs = []
+        for elem in elems:
+            for net in self.elem_networks[elem]:
+                ipv = 'ipv4'
+                if ipv not in net:
+                    ipv = 'ipv6'
+                bridge = self.bridges[net['net']]
+                if bridge not in primary:
+                    primary[bridge] = net[ipv]
+                    networks[bridge] = {'%s_address' % ipv: str(net[ipv])}
+                    continue
+                prefixlen = ipaddress.ip_network(net['net']).prefixlen
+                addrs.append('%s %s/%s\n' % (primary[bridge], net[ipv], prefixlen))
+        self.args.sink.write(os.path.join(rel_base, DOCKER_AS_ADDRS), ''.join(addrs))
+        disp = disp_name(self.args, topo_id, 'cs%s-1' % topo_id.file_fmt())
+        sup_gen = SupervisorGenerator(SupervisorGenArgs(self.args, self.args.topo_dicts))
+        sup_conf = sup_gen.container_conf(topo_id, topo, rel_base,
+                                          os.path.join(rel_base, disp, DISP_CONFIG_NAME))
+        self.args.sink.write(os.path.join(rel_base, DOCKER_AS_SUPERVISOR_CONF), sup_conf)
+        sd_net = self.elem_networks[sciond_name(topo_id)][0]
+        sd_ip = sd_net['ipv4'] if 'ipv4' in sd_net else sd_net['ipv6']
+        as_conf['services']['scion_as%s' % topo_id.file_fmt()] = {
+            'image': docker_image(self.args, 'as'),
+            'container_name': '%sas%s' % (self.prefix, topo_id.file_fmt()),
+            # Needed to add the addresses.
+            'cap_add': ['NET_ADMIN'],
+            'environment': {
+                'SU_EXEC_USERSPEC': self.user_spec,
+            },
+            # SCIOND is the last service of the AS to become ready.
+            'healthcheck': docker_healthcheck(
+                '-http', socket_address_str(sd_ip, SCIOND_PROM_PORT)),
+            'networks': networks,
+            'volumes': [
+                *DOCKER_USR_VOL,
+                self._disp_vol(disp),
+                self._cache_vol(),
+                self._logs_vol(),
+                self._certs_vol(),
+                '%s:%s:ro' % (base, os.path.join('/share', rel_base)),
+            ],
+            'command': [
+                os.path.join(rel_base, DOCKER_AS_ADDRS),
+                os.path.join(rel_base, DOCKER_AS_SUPERVISOR_CONF),
+            ]
+        }
+        as_conf['volumes'][self._disp_vol(disp).split(':')[0]] = None
+
+    def _disp_vol(self, disp):
+        return 'vol_%s%s:/run/shm/dispatcher:rw' % (self.prefix, disp)
 
     def _logs_vol(self):
         return self.output_base + '/logs:/share/logs:rw'
@@ -252,3 +506,16 @@ class DockerGenerator(object):
 
     def _certs_vol(self):
         return self.output_base + '/gen-certs:/share/crypto:rw'
+
+
+def _write_services(f, services):
+    """
+    Write services as entries of the top-level services mapping of a compose file.
+    """
+    f.write(_render_services(services))
+
+
+def _render_services(services):
+    if not services:
+        return ''
+    return textwrap.indent(yaml_dump(services, default_flow_style=False), '  ')
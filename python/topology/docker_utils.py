@@ -16,8 +16,14 @@
 # Stdlib
 import os
 # SCION
-from lib.util import write_file
-from topology.common import ArgsBase, docker_image, remote_nets
+from topology.common import (
+    ArgsBase,
+    disp_addr_elem,
+    disp_name,
+    docker_image,
+    remote_nets,
+    sig_disp_name,
+)
 
 
 class DockerUtilsGenArgs(ArgsBase):
@@ -45,12 +51,28 @@ class DockerUtilsGenerator(object):
         self.output_base = os.environ.get('SCION_OUTPUT_BASE', os.getcwd())
 
     def generate(self):
-        self._utils_conf()
-        for topo_id in self.args.topo_dicts:
+        self.generate_utils()
+        self.generate_as()
+        return self.dc_conf
+
+    def generate_as(self, topo_ids=None):
+        """
+        Generate the tester services.
+
+        :param list topo_ids: If set, only generate the testers of these ASes.
+        """
+        if topo_ids is None:
+            topo_ids = list(self.args.topo_dicts)
+        for topo_id in topo_ids:
             self._test_conf(topo_id)
+
+    def generate_utils(self):
+        """
+        Generate the utility services, which need all volumes of the compose config.
+        """
+        self._utils_conf()
         if self.args.sig:
             self._sig_testing_conf()
-        return self.dc_conf
 
     def _utils_conf(self):
         entry_chown = {
@@ -76,6 +98,7 @@ class DockerUtilsGenerator(object):
         docker = 'docker_' if self.args.in_docker else ''
         cntr_base = '/share'
         name = 'tester_%s' % topo_id.file_fmt()
+        disp = disp_name(self.args, topo_id, 'cs%s-1' % topo_id.file_fmt())
         entry = {
             'image': docker_image(self.args, 'tester'),
             'container_name': 'tester_%s%s' % (docker, topo_id.file_fmt()),
@@ -83,7 +106,7 @@ class DockerUtilsGenerator(object):
             'entrypoint': './tester.sh',
             'environment': {},
             'volumes': [
-                'vol_scion_%sdisp_cs%s-1:/run/shm/dispatcher:rw' % (docker, topo_id.file_fmt()),
+                'vol_scion_%s%s:/run/shm/dispatcher:rw' % (docker, disp),
                 self.output_base + '/logs:' + cntr_base + '/logs:rw',
                 self.output_base + '/gen:' + cntr_base + '/gen:rw',
                 self.output_base + '/gen-certs:' + cntr_base + '/gen-certs:rw'
@@ -100,9 +123,10 @@ class DockerUtilsGenerator(object):
             # If the tester container needs to communicate to the SIG, it needs the SIG_IP and
             # REMOTE_NETS which are the remote subnets that need to be routed through the SIG.
             # net information for the connected SIG
-            sig_net = self.args.networks['sig%s' % topo_id.file_fmt()][0]
+            sig_disp = sig_disp_name(self.args, topo_id)
+            sig_net = self.args.networks[disp_addr_elem(topo_id, sig_disp)][0]
             entry['environment']['SIG_IP'] = str(sig_net[ipv])
-            entry['environment']['REMOTE_NETS'] = remote_nets(self.args.networks, topo_id)
+            entry['environment']['REMOTE_NETS'] = remote_nets(self.args.graph, topo_id)
         self.dc_conf['services'][name] = entry
 
     def _sig_testing_conf(self):
@@ -114,5 +138,5 @@ class DockerUtilsGenerator(object):
                 ipv = 'ipv6'
             ip = net[ipv]
             text += str(topo_id) + ' ' + str(ip) + '\n'
-            conf_path = os.path.join(self.args.output_dir, 'sig-testing.conf')
-            write_file(conf_path, text)
+        conf_path = os.path.join(self.args.output_dir, 'sig-testing.conf')
+        self.args.sink.write(conf_path, text)
@@ -19,9 +19,11 @@
 """
 # Stdlib
 import argparse
+import os
 
 # SCION
 from lib.defines import (
+    CRYPTO_CACHE_PATH,
     GEN_PATH,
 )
 from topology.config import (
@@ -45,8 +47,30 @@ def add_arguments(parser):
     parser.add_argument('-f', '--svcfrac', type=float, default=0.4,
                         help='Attempt SVC resolution in RPC calls for a fraction of\
                         available timeout')
+    parser.add_argument('--computed-addressing', action='store_true',
+                        help='Compute the subnets from the position of the ASes and links in the\
+                        topology file, so that they do not change when ASes or links are added\
+                        (requires a larger network with -d, e.g. "-n 10.0.0.0/8")')
+    parser.add_argument('--keep-allocations', action='store_true',
+                        help='Keep the addresses, ports and generated IFIDs of the existing\
+                        elements (according to the allocations of the last run in the output\
+                        directory)')
     parser.add_argument('--random-ifids', action='store_true',
                         help='Generate random IFIDs')
+    parser.add_argument('--seed', type=int,
+                        help='Seed for the generated IFIDs, to make them reproducible')
+    parser.add_argument('--docker-shards', type=_shards_arg,
+                        help="Split the docker-compose configuration into one project per ISD\
+                        ('isd') or per group of N ASes (N), which are brought up concurrently\
+                        by topology/launcher.py")
+    parser.add_argument('--docker-per-as', action='store_true',
+                        help='Run all services of an AS in one container (the scion_as image),\
+                        under a supervisord in the container, instead of one container per\
+                        service (only available with -d, not with --sig)')
+    parser.add_argument('--shared-dispatcher', action='store_true',
+                        help='Run one dispatcher per AS, shared by the control service, SCIOND,\
+                        tester and SIG, instead of one per service (only available with -d, the\
+                        border routers keep their own dispatchers)')
     parser.add_argument('--in-docker', action='store_true',
                         help='Set if running in a docker container')
     parser.add_argument('--docker-registry', help='Specify docker registry to pull images from')
@@ -56,9 +80,55 @@ def add_arguments(parser):
                         to be built manually e.g. when running acceptance tests)')
     parser.add_argument('-qos', '--colibri', action='store_true',
                         help='Generate COLIBRI service')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes used to generate the per-AS\
+                        configuration')
+    parser.add_argument('--cert-jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of ISDs whose certificates are generated concurrently, and\
+                        of threads copying them into the element directories (default: number\
+                        of CPUs)')
+    parser.add_argument('--crypto-cache', default=CRYPTO_CACHE_PATH,
+                        help='Directory of the cached keys, certificates and TRCs, which are\
+                        reused for the ISDs whose ASes did not change (default: %(default)s,\
+                        an empty string disables the cache)')
+    parser.add_argument('--link-duplicates', action='store_true',
+                        help='Store the files that are the same for all elements of an AS (the\
+                        topology.json, certificates, keys and TRCs) once, and hard-link them\
+                        into the element directories. The linked files must not be edited in\
+                        place')
+    parser.add_argument('--output-archive',
+                        help='Additionally pack the output directory into this archive (.tar,\
+                        .tar.gz, .tar.xz or .tar.zst), with an index for extracting single AS\
+                        directories (see ./scion.sh extract)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-emit the ASes whose inputs changed since the last run\
+                        (according to the manifest in the output directory)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Only hold the topology of the AS that is being emitted in memory\
+                        (for large topologies). Every AS is built twice, to allocate its\
+                        addresses and to emit it. The address allocations and networks of all\
+                        ASes are still kept in memory')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the wall time and peak memory of the generation phases, and\
+                        the time spent in external commands')
+    parser.add_argument('--profile-dir',
+                        help='Write a cProfile of every phase to this directory (implies\
+                        --profile, the per-AS phases are only profiled with --jobs=1)')
     return parser
 
 
+def _shards_arg(value):
+    if value == 'isd':
+        return value
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if size < 1:
+        raise argparse.ArgumentTypeError("must be 'isd' or a positive number of ASes")
+    return size
+
+
 def main():
     """
     Main function.
@@ -18,20 +18,17 @@
 """
 # Stdlib
 import os
-import toml
-import yaml
 
 # SCION
-from lib.util import write_file
+from lib.serialization import toml_dumps, yaml_dump
 from topology.common import (
     ArgsTopoDicts,
     BR_CONFIG_NAME,
     COMMON_DIR,
     CS_CONFIG_NAME,
     DISP_CONFIG_NAME,
+    disp_names,
     docker_host,
-    get_pub,
-    get_pub_ip,
     prom_addr_br,
     prom_addr_infra,
     prom_addr_dispatcher,
@@ -40,6 +37,8 @@ from topology.common import (
     SD_API_PORT,
     SD_CONFIG_NAME,
     CO_CONFIG_NAME,
+    shared_disps,
+    topo_iter,
 )
 
 from topology.net import socket_address_str
@@ -75,15 +74,29 @@ class GoGenerator(object):
         self.certs_dir = '/share/crypto' if args.docker else 'gen-certs'
         self.log_level = 'trace' if args.trace else 'debug'
 
-    def generate_br(self):
-        for topo_id, topo in self.args.topo_dicts.items():
-            for k, v in topo.get("BorderRouters", {}).items():
+    def generate_as(self, topo_ids=None):
+        """
+        Generate the configuration files of all per-AS services.
+
+        :param list topo_ids: If set, only generate the services of these ASes.
+        """
+        self.generate_br(topo_ids)
+        self.generate_sciond(topo_ids)
+        self.generate_control_service(topo_ids)
+        self.generate_co(topo_ids)
+        if self.args.docker:
+            self._gen_disp_docker(topo_ids)
+
+    def generate_br(self, topo_ids=None):
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+            for k, v in topo.border_routers.items():
                 base = topo_id.base_dir(self.args.output_dir)
-                br_conf = self._build_br_conf(topo_id, topo["ISD_AS"], base, k, v)
-                write_file(os.path.join(base, k, BR_CONFIG_NAME), toml.dumps(br_conf))
+                br_conf = self._build_br_conf(topo_id, str(topo_id), base, k, v)
+                self.args.sink.write(os.path.join(base, k, BR_CONFIG_NAME),
+                                     toml_dumps(br_conf))
 
     def _build_br_conf(self, topo_id, ia, base, name, v):
-        config_dir = '/share/conf' if self.args.docker else os.path.join(base, name)
+        config_dir = self._config_dir(base, name)
         raw_entry = {
             'general': {
                 'id': name,
@@ -96,20 +109,19 @@ class GoGenerator(object):
         }
         return raw_entry
 
-    def generate_control_service(self):
-        for topo_id, topo in self.args.topo_dicts.items():
-            for elem_id, elem in topo.get("ControlService", {}).items():
+    def generate_control_service(self, topo_ids=None):
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+            for elem_id, elem in topo.control_services.items():
                 # only a single Go-BS per AS is currently supported
                 if elem_id.endswith("-1"):
                     base = topo_id.base_dir(self.args.output_dir)
                     bs_conf = self._build_control_service_conf(
-                        topo_id, topo["ISD_AS"], base, elem_id, elem)
-                    write_file(os.path.join(base, elem_id,
-                                            CS_CONFIG_NAME), toml.dumps(bs_conf))
+                        topo_id, str(topo_id), base, elem_id, elem)
+                    self.args.sink.write(os.path.join(base, elem_id, CS_CONFIG_NAME),
+                                         toml_dumps(bs_conf))
 
     def _build_control_service_conf(self, topo_id, ia, base, name, infra_elem):
-        config_dir = '/share/conf' if self.args.docker else os.path.join(
-            base, name)
+        config_dir = self._config_dir(base, name)
         raw_entry = {
             'general': {
                 'id': name,
@@ -135,25 +147,26 @@ class GoGenerator(object):
         }
         return raw_entry
 
-    def generate_co(self):
+    def generate_co(self, topo_ids=None):
         if not self.args.colibri:
             return
-        for topo_id, topo in self.args.topo_dicts.items():
-            for elem_id, elem in topo.get("ColibriService", {}).items():
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+            for elem_id, elem in topo.colibri_services.items():
                 # only a single Go-CO per AS is currently supported
                 if elem_id.endswith("-1"):
                     base = topo_id.base_dir(self.args.output_dir)
-                    co_conf = self._build_co_conf(topo_id, topo["ISD_AS"], base, elem_id, elem)
-                    write_file(os.path.join(base, elem_id, CO_CONFIG_NAME), toml.dumps(co_conf))
+                    co_conf = self._build_co_conf(topo_id, str(topo_id), base, elem_id, elem)
+                    self.args.sink.write(os.path.join(base, elem_id, CO_CONFIG_NAME),
+                                         toml_dumps(co_conf))
                     traffic_matrix = self._build_co_traffic_matrix(topo_id)
-                    write_file(os.path.join(base, elem_id, 'matrix.yml'),
-                               yaml.dump(traffic_matrix, default_flow_style=False))
+                    self.args.sink.write(os.path.join(base, elem_id, 'matrix.yml'),
+                                         yaml_dump(traffic_matrix, default_flow_style=False))
                     rsvps = self._build_co_reservations(topo_id)
-                    write_file(os.path.join(base, elem_id, 'reservations.yml'),
-                               yaml.dump(rsvps, default_flow_style=False))
+                    self.args.sink.write(os.path.join(base, elem_id, 'reservations.yml'),
+                                         yaml_dump(rsvps, default_flow_style=False))
 
     def _build_co_conf(self, topo_id, ia, base, name, infra_elem):
-        config_dir = '/share/conf' if self.args.docker else os.path.join(base, name)
+        config_dir = self._config_dir(base, name)
         raw_entry = {
             'general': {
                 'ID': name,
@@ -175,8 +188,7 @@ class GoGenerator(object):
         """
         Creates a NxN traffic matrix for colibri with N = len(interfaces)
         """
-        topo = self.args.topo_dicts[ia]
-        if_ids = {iface for br in topo['BorderRouters'].values() for iface in br['Interfaces']}
+        if_ids = set(self.args.graph.interfaces(ia))
         if_ids.add(0)
         bw = int(DEFAULT_LINK_BW / (len(if_ids) - 1))
         traffic_matrix = {}
@@ -192,14 +204,14 @@ class GoGenerator(object):
         excluding itself, or a pair (up and down) per core AS in the ISD if "ia" is not core.
         """
         rsvps = {}
-        this_as = self.args.topo_dicts[ia]
-        if this_as['Core']:
-            for dst_ia, topo in self.args.topo_dicts.items():
-                if dst_ia != ia and topo['Core']:
+        graph = self.args.graph
+        if graph.is_core(ia):
+            for dst_ia in graph.cores():
+                if dst_ia != ia:
                     rsvps['Core-%s' % dst_ia] = self._build_co_reservation(dst_ia, 'Core')
         else:
-            for dst_ia, topo in self.args.topo_dicts.items():
-                if dst_ia != ia and dst_ia._isd == ia._isd and topo['Core']:
+            for dst_ia in graph.cores(ia.isd_str()):
+                if dst_ia != ia:
                     # reach this core AS in the same ISD
                     rsvps['Up-%s' % dst_ia] = self._build_co_reservation(dst_ia, 'Up')
                     rsvps['Down-%s' % dst_ia] = self._build_co_reservation(dst_ia, 'Down')
@@ -226,16 +238,17 @@ class GoGenerator(object):
             }
         }
 
-    def generate_sciond(self):
-        for topo_id, topo in self.args.topo_dicts.items():
+    def generate_sciond(self, topo_ids=None):
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
             base = topo_id.base_dir(self.args.output_dir)
-            sciond_conf = self._build_sciond_conf(topo_id, topo["ISD_AS"], base)
-            write_file(os.path.join(base, COMMON_DIR, SD_CONFIG_NAME), toml.dumps(sciond_conf))
+            sciond_conf = self._build_sciond_conf(topo_id, str(topo_id), base)
+            self.args.sink.write(os.path.join(base, COMMON_DIR, SD_CONFIG_NAME),
+                                 toml_dumps(sciond_conf))
 
     def _build_sciond_conf(self, topo_id, ia, base):
         name = sciond_name(topo_id)
-        config_dir = '/share/conf' if self.args.docker else os.path.join(base, COMMON_DIR)
-        ip = sciond_ip(self.args.docker, topo_id, self.args.networks)
+        config_dir = self._config_dir(base, COMMON_DIR)
+        ip = sciond_ip(self.args.docker, topo_id, self.args.graph)
         raw_entry = {
             'general': {
                 'id': name,
@@ -268,23 +281,24 @@ class GoGenerator(object):
         else:
             elem_dir = os.path.join(self.args.output_dir, "dispatcher")
             config_file_path = os.path.join(elem_dir, DISP_CONFIG_NAME)
-            write_file(config_file_path, toml.dumps(self._build_disp_conf("dispatcher")))
+            self.args.sink.write(config_file_path, toml_dumps(self._build_disp_conf("dispatcher")))
 
-    def _gen_disp_docker(self):
-        for topo_id, topo in self.args.topo_dicts.items():
-            elem = "disp_sig_%s" % topo_id.file_fmt()
-            elem_dir = os.path.join(topo_id.base_dir(self.args.output_dir), elem)
-            disp_conf = self._build_disp_conf(elem, topo_id)
-            write_file(os.path.join(elem_dir, DISP_CONFIG_NAME), toml.dumps(disp_conf))
-            for k in list(topo.get("BorderRouters", {})) + list(topo.get("ControlService", {})):
-                disp_id = 'disp_%s' % k
+    def _gen_disp_docker(self, topo_ids=None):
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
+            disp_ids = disp_names(self.args, topo_id, topo)
+            sig_disp = 'disp_sig_%s' % topo_id.file_fmt()
+            if not shared_disps(self.args) and sig_disp not in disp_ids:
+                # The config of the SIG dispatcher is written also without SIGs.
+                disp_ids.insert(0, sig_disp)
+            for disp_id in disp_ids:
                 elem_dir = os.path.join(topo_id.base_dir(self.args.output_dir), disp_id)
                 disp_conf = self._build_disp_conf(disp_id, topo_id)
-                write_file(os.path.join(elem_dir, DISP_CONFIG_NAME), toml.dumps(disp_conf))
+                self.args.sink.write(os.path.join(elem_dir, DISP_CONFIG_NAME),
+                                     toml_dumps(disp_conf))
 
     def _build_disp_conf(self, name, topo_id=None):
-        prometheus_addr = prom_addr_dispatcher(self.args.docker, topo_id,
-                                               self.args.networks, DISP_PROM_PORT, name)
+        prometheus_addr = prom_addr_dispatcher(self.args.docker, topo_id, self.args.graph,
+                                               DISP_PROM_PORT, name, shared_disps(self.args))
         return {
             'dispatcher': {
                 'id': name,
@@ -295,6 +309,13 @@ class GoGenerator(object):
             },
         }
 
+    def _config_dir(self, base, name):
+        # With one container per AS, the AS directory is mounted at its relative path below the
+        # working directory of the container (see DockerGenerator._as_container_conf).
+        if self.args.docker and not self.args.docker_per_as:
+            return '/share/conf'
+        return os.path.join(base, name)
+
     def _tracing_entry(self):
         docker_ip = docker_host(self.args.in_docker, self.args.docker)
         entry = {
@@ -320,10 +341,9 @@ class GoGenerator(object):
         }
 
     def _quic_conf_entry(self, port, svcfrac, elem=None):
-        addr = "127.0.0.1" if elem is None else get_pub_ip(elem["Addrs"])
+        addr = "127.0.0.1" if elem is None else elem.addr.ip
         if self.args.docker and elem is not None:
-            pub = get_pub(elem['Addrs'])
-            port = pub['Public']['L4Port']+1
+            port = elem.addr.port+1
         return {
             'address':  '[%s]:%s' % (addr, port),
             'cert_file': os.path.join(self.certs_dir, 'tls.pem'),
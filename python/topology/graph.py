@@ -0,0 +1,147 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`graph` --- Index of the generated topology
+================================================
+
+TopoGenerator builds the index while it reads the topology config and allocates
+the networks, the generators query it instead of scanning all ASes or networks
+for every AS.
+"""
+
+
+class TopoGraph(object):
+    def __init__(self):
+        # Whether the AS is core, in the order of the topology config.
+        self._core = {}
+        self._isd_cores = {}
+        # The neighbors of an AS, per link type of the neighbor.
+        self._neighbors = {}
+        # (BR name, remote AS, link type of the remote AS) per interface ID, per AS.
+        self._interfaces = {}
+        # (network, address) per element name, in the order of the networks.
+        self._elem_addrs = {}
+        self._sig_nets = {}
+
+    def add_as(self, topo_id, core):
+        """
+        :param TopoID topo_id: The AS.
+        :param bool core: Whether the AS is core.
+        """
+        self._core[topo_id] = core
+        if core:
+            self._isd_cores.setdefault(topo_id.isd_str(), []).append(topo_id)
+
+    def add_link(self, local, remote, remote_type, local_br, local_ifid):
+        """
+        Add one side of a link, i.e. the interface of the local AS.
+
+        :param TopoID local: The local AS.
+        :param TopoID remote: The remote AS.
+        :param str remote_type: The link type of the remote AS, e.g. 'child'.
+        :param str local_br: The name of the local border router.
+        :param int local_ifid: The local interface ID.
+        """
+        link_types = self._neighbors.setdefault(local, {})
+        link_types.setdefault(remote_type.lower(), []).append(remote)
+        self._interfaces.setdefault(local, {})[local_ifid] = (local_br, remote, remote_type)
+
+    def index_networks(self, networks):
+        """
+        Index the element addresses of the allocated networks.
+
+        :param dict networks: The networks from SubnetGenerator, i.e. the address per
+            element name, per network.
+        """
+        for net, elems in networks.items():
+            for elem, addr in elems.items():
+                # Like a scan over the networks, the first network of an element is used.
+                self._elem_addrs.setdefault(elem, (net, addr))
+        self._sig_nets = {}
+
+    def is_core(self, topo_id):
+        return self._core[topo_id]
+
+    def cores(self, isd=None):
+        """
+        Return the core ASes, in the order of the topology config.
+
+        :param str isd: If set, only return the core ASes of this ISD, e.g. '1'.
+        """
+        if isd is not None:
+            return self._isd_cores.get(isd, [])
+        return [topo_id for topo_ids in self._isd_cores.values() for topo_id in topo_ids]
+
+    def neighbors(self, topo_id, link_type=None):
+        """
+        Return the remote ASes of the links of an AS.
+
+        :param str link_type: If set, only return the neighbors of this link type (as seen
+            from the AS), e.g. 'parent'.
+        """
+        link_types = self._neighbors.get(topo_id, {})
+        if link_type is not None:
+            return link_types.get(link_type.lower(), [])
+        return [remote for remotes in link_types.values() for remote in remotes]
+
+    def interfaces(self, topo_id):
+        """
+        :returns: (BR name, remote AS, link type of the remote AS) per interface ID.
+        :rtype: dict
+        """
+        return self._interfaces.get(topo_id, {})
+
+    def border_routers(self, topo_id):
+        """
+        :returns: The interface IDs per BR name.
+        :rtype: dict
+        """
+        brs = {}
+        for ifid, (br, _, _) in self.interfaces(topo_id).items():
+            brs.setdefault(br, []).append(ifid)
+        return brs
+
+    def elem_addr(self, elem):
+        """
+        Return the address of an element, or None if it has none.
+
+        :param str elem: The element name, e.g. 'sd1-ff00_0_110'.
+        :rtype: IPInterface
+        """
+        entry = self._elem_addrs.get(elem)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def sig_nets(self, net_order=False):
+        """
+        Return the network of the SIG of every AS that has one.
+
+        :param bool net_order: Whether to order the networks by allocation, instead of
+            by the order of the ASes in the topology config.
+        :returns: (topo_id, network) pairs.
+        :rtype: list
+        """
+        sig_nets = self._sig_nets.get(net_order)
+        if sig_nets is None:
+            sig_nets = []
+            for topo_id in self._core:
+                entry = self._elem_addrs.get('sig%s' % topo_id.file_fmt())
+                if entry is not None:
+                    sig_nets.append((topo_id, entry[0]))
+            if net_order:
+                pos = {elem: i for i, elem in enumerate(self._elem_addrs)}
+                sig_nets.sort(key=lambda s: pos['sig%s' % s[0].file_fmt()])
+            self._sig_nets[net_order] = sig_nets
+        return sig_nets
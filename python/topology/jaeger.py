@@ -13,9 +13,8 @@
 # limitations under the License.
 
 import os
-import yaml
 
-from lib.util import write_file
+from lib.serialization import yaml_dump
 from topology.common import (
     ArgsTopoDicts,
 )
@@ -39,8 +38,8 @@ class JaegerGenerator(object):
         dc_conf = self._generate_dc()
         os.makedirs(os.path.join(self.local_jaeger_dir, 'data'), exist_ok=True)
         os.makedirs(os.path.join(self.local_jaeger_dir, 'key'), exist_ok=True)
-        write_file(os.path.join(self.args.output_dir, JAEGER_DC),
-                   yaml.dump(dc_conf, default_flow_style=False))
+        self.args.sink.write(os.path.join(self.args.output_dir, JAEGER_DC),
+                             yaml_dump(dc_conf, default_flow_style=False))
 
     def _generate_dc(self):
         name = 'jaeger-docker' if self.args.in_docker else 'jaeger'
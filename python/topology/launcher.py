@@ -0,0 +1,495 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`launcher` --- Readiness-gated launcher of the generated topology
+======================================================================
+
+Starts the services of the generated topology (supervisor, docker-compose, or the
+compose projects written with --docker-shards) in waves. The waves are the levels
+of the dependency graph of the services: the dispatchers come first, then the
+border routers, the control services, the SCION daemons and the SIGs. A wave is
+started once all services of the previous waves are ready, instead of after fixed
+sleeps. The supervisor programs are ready once they answer on their metrics endpoint,
+the containers once docker reports their compose healthcheck as healthy (the docker
+networks are not necessarily reachable from where the launcher runs, e.g. docker.sh).
+Services without a metrics endpoint or a healthcheck are considered ready once they are
+started. If a wave is not ready within the timeout, the launcher logs the pending
+services and continues with the next wave, but exits with an error after the last one.
+With --docker-per-as, the container of an AS is a single service, which is ready once
+the SCION daemon of the AS is.
+
+The compose projects are brought up concurrently, and the networks shared by the
+shards are created before.
+"""
+# Stdlib
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+import urllib.request
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+# External packages
+import toml
+
+# SCION
+from lib.defines import GEN_PATH
+from lib.util import load_yaml_file
+from topology.common import (
+    BR_CONFIG_NAME,
+    CO_CONFIG_NAME,
+    CS_CONFIG_NAME,
+    DISP_CONFIG_NAME,
+    SD_CONFIG_NAME,
+    SIG_CONFIG_NAME,
+)
+from topology.docker import DOCKER_CONF, DOCKER_SHARDS_CONF
+
+SUPERVISOR = 'supervisor/supervisor.sh'
+# The inet_http_server of supervisor/supervisord.conf.
+SUPERVISOR_URL = 'http://127.0.0.1:9011/RPC2'
+# supervisor.xmlrpc.Faults.ALREADY_STARTED
+SUPERVISOR_ALREADY_STARTED = 60
+# The element kind, by the name of its config file.
+CONFIG_KINDS = {
+    BR_CONFIG_NAME: 'br',
+    CO_CONFIG_NAME: 'co',
+    CS_CONFIG_NAME: 'cs',
+    DISP_CONFIG_NAME: 'disp',
+    SD_CONFIG_NAME: 'sd',
+    SIG_CONFIG_NAME: 'sig',
+}
+# The kinds of the elements of the same AS that an element depends on. The dependencies on the
+# dispatchers are taken from the compose files, or are on the dispatcher of the host.
+KIND_DEPS = {
+    'cs': ('br',),
+    'co': ('br',),
+    'sd': ('cs',),
+    'sig': ('sd',),
+}
+# The AS directory, as mounted into the containers of --docker-per-as.
+_AS_DIR = re.compile(r'/ISD\d+/AS[^/]+/?$')
+# The time between two rounds of readiness checks, and the timeout of a single check.
+POLL_INTERVAL = 0.2
+CHECK_TIMEOUT = 1
+# The metrics endpoints are on the local host or the docker networks, never behind a proxy.
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class Service(object):
+    __slots__ = ('name', 'kind', 'metrics', 'project', 'deps')
+
+    def __init__(self, name, kind, metrics, project=None):
+        """
+        :param str name: The supervisor program or compose service name.
+        :param str kind: The kind of the element, see CONFIG_KINDS.
+        :param str metrics: The address of the metrics endpoint, or None.
+        :param ComposeProject project: The compose project, or None for supervisor.
+        """
+        self.name = name
+        self.kind = kind
+        self.metrics = metrics
+        self.project = project
+        # The names of the services that have to be ready before this one is started.
+        self.deps = []
+
+
+class ComposeProject(object):
+    def __init__(self, name, path):
+        """
+        :param str name: The compose project name.
+        :param str path: The path to the compose file.
+        """
+        self.name = name
+        self.path = path
+        self.services = load_yaml_file(path)['services']
+
+    def compose(self, *args):
+        """
+        Run a docker-compose command for the project, and return its exit code.
+        """
+        env = dict(os.environ, COMPOSE_FILE=self.path)
+        return subprocess.call(['docker-compose', '-p', self.name, '--no-ansi', *args],
+                               env=env, stdin=subprocess.DEVNULL)
+
+
+class Launcher(object):
+    def __init__(self, gen_dir, jobs, timeout):
+        """
+        :param str gen_dir: The generated directory.
+        :param int jobs: The number of concurrent start commands and readiness checks.
+        :param float timeout: The time to wait for the services of a wave to become ready.
+        """
+        self.gen_dir = gen_dir
+        self.jobs = max(jobs, 1)
+        self.timeout = timeout
+        self.projects = []
+        self.networks = {}
+        # The supervisor process names (group:name), by program name.
+        self._programs = {}
+        suffix = '_docker' if _in_docker() else ''
+        shards_path = os.path.join(gen_dir, DOCKER_SHARDS_CONF)
+        dc_path = os.path.join(gen_dir, DOCKER_CONF)
+        if os.path.exists(shards_path):
+            with open(shards_path) as f:
+                index = json.load(f)
+            self.projects = [ComposeProject('scion_%s%s' % (shard, suffix),
+                                            os.path.join(gen_dir, f))
+                             for shard, f in sorted(index['shards'].items())]
+            self.networks = load_yaml_file(dc_path).get('networks') or {}
+        elif os.path.exists(dc_path):
+            self.projects = [ComposeProject('scion' + suffix, dc_path)]
+
+    def up(self):
+        services = self.services()
+        waves = plan_waves(services)
+        self._create_networks()
+        if not self.projects:
+            self._programs = _supervisor_programs()
+        failed = []
+        for i, wave in enumerate(waves):
+            start = time.time()
+            self._start(wave)
+            if self._wait_ready(wave):
+                logging.info("Wave %d/%d: %d services ready after %.1fs", i + 1, len(waves),
+                             len(wave), time.time() - start)
+            else:
+                failed.append(i + 1)
+        if failed:
+            logging.critical("Waves not ready: %s", ', '.join(str(i) for i in failed))
+            sys.exit(1)
+
+    def stop(self):
+        self._run_projects(lambda project: project.compose('stop'))
+
+    def down(self):
+        self._run_projects(lambda project: project.compose('down'))
+        for net in self.networks.values():
+            if _network_exists(net['name']):
+                _check(subprocess.call(['docker', 'network', 'rm', net['name']],
+                                       stdout=subprocess.DEVNULL), net['name'])
+
+    def services(self):
+        """
+        Build the services of the generated topology, and their dependencies.
+
+        :returns: The services, keyed by name.
+        :rtype: dict
+        """
+        conf_services = {}
+        as_containers = {}
+        if self.projects:
+            # The services are matched to the element directories by their config mount, the
+            # containers of --docker-per-as to the AS directories.
+            for project in self.projects:
+                for name, entry in project.services.items():
+                    for vol in entry.get('volumes', []):
+                        parts = vol.split(':')
+                        if len(parts) < 2:
+                            continue
+                        if parts[1] == '/share/conf':
+                            conf_services[_rel_dir(parts[0])] = (name, project)
+                        elif _AS_DIR.search(parts[1]):
+                            as_containers[_rel_dir(parts[0], 2)] = (name, project)
+        services = {}
+        as_services = {}
+        for path in sorted(glob.glob(os.path.join(self.gen_dir, '*', '*', '*', '*.toml')) +
+                           glob.glob(os.path.join(self.gen_dir, 'dispatcher', '*.toml'))):
+            kind = CONFIG_KINDS.get(os.path.basename(path))
+            elem_dir = os.path.dirname(path)
+            if kind is None:
+                continue
+            if self.projects:
+                as_container = as_containers.get(_rel_dir(os.path.dirname(elem_dir), 2))
+                if as_container is not None:
+                    # The container runs all services of the AS, it is ready once its SCION
+                    # daemon is.
+                    if kind != 'sd':
+                        continue
+                    name, project = as_container
+                elif _rel_dir(elem_dir) in conf_services:
+                    name, project = conf_services[_rel_dir(elem_dir)]
+                else:
+                    continue
+            elif kind == 'disp':
+                name, project = 'dispatcher', None
+            else:
+                name, project = _supervisor_name(elem_dir, kind), None
+            service = Service(name, kind, _metrics_addr(path), project)
+            services[name] = service
+            if project or kind != 'disp':
+                as_services.setdefault(os.path.dirname(elem_dir), []).append(service)
+        for as_elems in as_services.values():
+            for service in as_elems:
+                service.deps = [other.name for other in as_elems
+                                if other.kind in KIND_DEPS.get(service.kind, ())]
+                if not service.project:
+                    if 'dispatcher' in services:
+                        service.deps.append('dispatcher')
+                    continue
+                entry = service.project.services[service.name]
+                service.deps.extend(dep for dep in entry.get('depends_on', [])
+                                    if dep in services)
+                net_mode = entry.get('network_mode', '')
+                if net_mode.startswith('service:') and net_mode[8:] in services:
+                    service.deps.append(net_mode[8:])
+                service.deps = list(dict.fromkeys(service.deps))
+        return services
+
+    def _start(self, wave):
+        if self.projects:
+            # docker-compose starts the services of a project concurrently.
+            by_project = {}
+            for service in wave:
+                by_project.setdefault(service.project, []).append(service.name)
+            cmds = [(project.name, project.compose, ('up', '-d', '--no-deps', *names))
+                    for project, names in by_project.items()]
+        else:
+            # The programs are started without waiting for their startsecs, the readiness is
+            # checked below.
+            missing = [service.name for service in wave if service.name not in self._programs]
+            if missing:
+                logging.critical("Not configured in supervisor: %s", ', '.join(missing))
+                sys.exit(1)
+            names = [self._programs[service.name] for service in wave]
+            size = -(-len(names) // self.jobs)
+            cmds = [('supervisor', _supervisor_start, names[i:i + size])
+                    for i in range(0, len(names), size)]
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            results = list(pool.map(lambda cmd: cmd[1](*cmd[2]), cmds))
+        for (name, _, _), ret in zip(cmds, results):
+            _check(ret, name)
+
+    def _wait_ready(self, wave):
+        """
+        Wait until the services of the wave are ready, or the timeout expires.
+
+        :returns: Whether all services are ready.
+        :rtype: bool
+        """
+        if self.projects:
+            pending = [service for service in wave
+                       if 'healthcheck' in service.project.services[service.name]]
+        else:
+            pending = [service for service in wave if service.metrics]
+        deadline = time.time() + self.timeout
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while pending:
+                if self.projects:
+                    healthy = _healthy([service.project.services[service.name]['container_name']
+                                        for service in pending])
+                    ready = [service.project.services[service.name]['container_name'] in healthy
+                             for service in pending]
+                else:
+                    ready = list(pool.map(lambda service: _ready(service.metrics), pending))
+                pending = [service for service, ok in zip(pending, ready) if not ok]
+                if not pending:
+                    break
+                if time.time() > deadline:
+                    logging.error("Not ready after %ss, continuing: %s", self.timeout,
+                                  ', '.join(sorted(service.name for service in pending)))
+                    return False
+                time.sleep(POLL_INTERVAL)
+        return True
+
+    def _run_projects(self, func):
+        if not self.projects:
+            logging.critical("No compose projects in '%s'", self.gen_dir)
+            sys.exit(1)
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            results = list(pool.map(func, self.projects))
+        for project, ret in zip(self.projects, results):
+            _check(ret, project.name)
+
+    def _create_networks(self):
+        """
+        Create the networks of the main compose file, which are external in the shards.
+        """
+        for net in self.networks.values():
+            if _network_exists(net['name']):
+                continue
+            cmd = ['docker', 'network', 'create', '--driver', net['driver']]
+            for ipam in net['ipam']['config']:
+                cmd += ['--subnet', ipam['subnet']]
+            for opt, value in net.get('driver_opts', {}).items():
+                cmd += ['--opt', '%s=%s' % (opt, value)]
+            if net.get('enable_ipv6'):
+                cmd.append('--ipv6')
+            _check(subprocess.call(cmd + [net['name']], stdout=subprocess.DEVNULL), net['name'])
+
+
+def plan_waves(services):
+    """
+    Group the services into waves, such that every service is in a later wave than all its
+    dependencies.
+
+    :param dict services: The services, keyed by name.
+    :returns: The services of every wave.
+    :rtype: list
+    """
+    levels = {}
+
+    def level(name):
+        if name not in levels:
+            levels[name] = None
+            deps = [level(dep) for dep in services[name].deps]
+            levels[name] = 1 + max(deps, default=-1)
+        elif levels[name] is None:
+            logging.critical("Dependency cycle at %s", name)
+            sys.exit(1)
+        return levels[name]
+
+    waves = []
+    for name in services:
+        i = level(name)
+        while len(waves) <= i:
+            waves.append([])
+        waves[i].append(services[name])
+    return waves
+
+
+def _metrics_addr(path):
+    """
+    Return the metrics address from the config of an element, or None if it has none that is
+    reachable from the outside.
+    """
+    addr = (toml.load(path).get('metrics') or {}).get('prometheus')
+    if not addr or addr.rsplit(':', 1)[0] in ('0.0.0.0', '[::]', ''):
+        return None
+    return addr
+
+
+def _ready(addr):
+    # The configs put IPv4 addresses in brackets as well, which is not valid in URLs.
+    host, port = addr.rsplit(':', 1)
+    host = host.strip('[]')
+    if ':' in host:
+        host = '[%s]' % host
+    try:
+        with _opener.open('http://%s:%s/metrics' % (host, port),
+                          timeout=CHECK_TIMEOUT) as resp:
+            return resp.status == 200
+    except (OSError, ValueError):
+        return False
+
+
+def _healthy(containers):
+    """
+    Return the names of the containers whose healthcheck passes.
+    """
+    proc = subprocess.run(['docker', 'inspect', '--format',
+                           '{{.Name}} {{if .State.Health}}{{.State.Health.Status}}{{end}}',
+                           *containers], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, universal_newlines=True)
+    # Containers that do not exist (yet) are missing from the output.
+    healthy = set()
+    for line in proc.stdout.splitlines():
+        name, _, status = line.partition(' ')
+        if status == 'healthy':
+            healthy.add(name.lstrip('/'))
+    return healthy
+
+
+def _rel_dir(path, depth=3):
+    # The element directories are referenced relative to the ISD directory, the compose files
+    # contain absolute paths (below SCION_OUTPUT_BASE).
+    return os.path.join(*os.path.normpath(path).split(os.sep)[-depth:])
+
+
+def _supervisor_name(elem_dir, kind):
+    if kind == 'sd':
+        isd, as_ = os.path.normpath(elem_dir).split(os.sep)[-3:-1]
+        return 'sd%s-%s' % (isd[3:], as_[2:])
+    return os.path.basename(elem_dir)
+
+
+def _supervisor_programs():
+    # supervisor.sh starts supervisord if it is not running yet.
+    _check(subprocess.call([SUPERVISOR, 'pid'], stdin=subprocess.DEVNULL,
+                           stdout=subprocess.DEVNULL), 'supervisord')
+    try:
+        infos = xmlrpc.client.ServerProxy(SUPERVISOR_URL).supervisor.getAllProcessInfo()
+    except (OSError, xmlrpc.client.Error) as e:
+        logging.critical("Cannot connect to supervisord: %s", e)
+        sys.exit(1)
+    return {info['name']: '%s:%s' % (info['group'], info['name']) for info in infos}
+
+
+def _supervisor_start(*names):
+    """
+    Start supervisor processes without waiting for them, and return 0 on success.
+    """
+    # The proxies must not be shared between threads.
+    proxy = xmlrpc.client.ServerProxy(SUPERVISOR_URL)
+    for name in names:
+        try:
+            proxy.supervisor.startProcess(name, False)
+        except xmlrpc.client.Fault as e:
+            if e.faultCode != SUPERVISOR_ALREADY_STARTED:
+                logging.error("Starting %s failed: %s", name, e.faultString)
+                return 1
+        except OSError as e:
+            logging.error("Starting %s failed: %s", name, e)
+            return 1
+    return 0
+
+
+def _network_exists(name):
+    return subprocess.call(['docker', 'network', 'inspect', name], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL) == 0
+
+
+def _check(ret, name):
+    if ret:
+        logging.critical("Failed for %s (exit code %d)", name, ret)
+        sys.exit(1)
+
+
+def _in_docker():
+    # Like tools/dc, the projects of a topology run from within docker have their own names.
+    try:
+        with open('/proc/1/cgroup') as f:
+            return any(line.split(':', 2)[2].startswith('/docker/') for line in f)
+    except (OSError, IndexError):
+        return False
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description='Launch the generated topology.')
+    parser.add_argument('command', choices=('up', 'stop', 'down'),
+                        help='up: start the services in dependency order. stop, down: stop\
+                        or remove the compose projects')
+    parser.add_argument('-o', '--output-dir', default=GEN_PATH,
+                        help='The generated directory (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of concurrent start commands and readiness checks\
+                        (default: number of CPUs)')
+    parser.add_argument('-t', '--timeout', type=float, default=60,
+                        help='Seconds to wait for the services of a wave to become ready, before\
+                        the next wave is started anyway (default: %(default)s)')
+    args = parser.parse_args()
+    launcher = Launcher(args.output_dir, args.jobs, args.timeout)
+    getattr(launcher, args.command)()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`manifest` --- Manifest of the generation inputs
+=====================================================
+
+The manifest records a hash of the inputs of every AS directory, so that an
+incremental run only has to re-emit the ASes whose inputs changed.
+"""
+# Stdlib
+import hashlib
+import json
+import logging
+
+# SCION
+from lib.serialization import json_dumps
+from lib.util import write_file
+from topology.common import (
+    TopoID,
+    json_default,
+    sciond_name,
+)
+
+MANIFEST_VERSION = 2
+
+# Command line arguments which do not influence the generated files.
+IGNORED_ARGS = ('cert_jobs', 'crypto_cache', 'graph', 'incremental', 'jobs', 'keep_allocations',
+                'link_duplicates', 'output_archive', 'profile', 'profile_dir', 'profiler', 'sink',
+                'stream', 'topo_config')
+
+
+class Manifest(object):
+    def __init__(self, args_hash=None, crypto=None, ases=None):
+        """
+        :param str args_hash: The hash of the command line arguments.
+        :param dict crypto: The hash of the AS attributes used by the cert generation, keyed
+            by the ISD number.
+        :param dict ases: The per-AS entries, keyed by the ISD-AS string. Each entry contains
+            the input hashes and the list of generated elements.
+        """
+        self.args_hash = args_hash
+        self.crypto = crypto or {}
+        self.ases = ases or {}
+
+    @classmethod
+    def build(cls, args, topo_config, topo_dicts, networks, topo_ids=None):
+        """
+        Compute the manifest of a generation run.
+
+        :param object args: Contains the passed command line arguments as named attributes.
+        :param dict topo_config: The parsed topology config.
+        :param dict topo_dicts: The generated topo dicts from TopoGenerator.
+        :param dict networks: The generated networks from SubnetGenerator.
+        :param list topo_ids: The ASes whose entries are computed, all by default. The entries
+            of the others can be added later with as_entries.
+        """
+        # crypto_cache uses content_hash of this module.
+        from topology.crypto_cache import pki_inputs
+        args_hash = content_hash(
+            {k: v for k, v in vars(args).items() if k not in IGNORED_ARGS})
+        crypto = {isd: content_hash(inputs) for isd, inputs in pki_inputs(topo_config).items()}
+        manifest = cls(args_hash, crypto)
+        if topo_ids is None:
+            topo_ids = list(topo_dicts)
+        manifest.ases = manifest.as_entries(topo_config, topo_dicts, elem_networks(networks),
+                                            topo_ids)
+        return manifest
+
+    def as_entries(self, topo_config, topo_dicts, elem_nets, topo_ids):
+        """
+        Compute the entries of the ASes, keyed by the ISD-AS string.
+
+        :param dict elem_nets: The subnet and address per element name, see elem_networks.
+        :param list topo_ids: The ASes whose entries are computed.
+        """
+        ases = {}
+        # The AS keys of the topology config are not necessarily in the canonical form.
+        as_confs = {TopoID(key): conf for key, conf in topo_config['ASes'].items()}
+        for topo_id in topo_ids:
+            as_topo = topo_dicts[topo_id]
+            elements = _elements(as_topo)
+            inputs = {
+                'config': content_hash(as_confs[topo_id]),
+                'topo': content_hash(as_topo.to_topo()),
+                'networks': content_hash(_as_networks(elem_nets, topo_id, elements)),
+            }
+            ases[str(topo_id)] = {
+                'hash': content_hash([self.args_hash, inputs]),
+                'inputs': inputs,
+                'elements': elements,
+            }
+        return ases
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the manifest of a previous run. Returns an empty manifest if there is none.
+
+        :param str path: The path to the manifest file.
+        """
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable manifest '%s': %s", path, e)
+            return cls()
+        if raw.get('version') != MANIFEST_VERSION:
+            return cls()
+        return cls(raw['args'], raw['crypto'], raw['ASes'])
+
+    def write(self, path):
+        raw = {
+            'version': MANIFEST_VERSION,
+            'args': self.args_hash,
+            'crypto': self.crypto,
+            'ASes': self.ases,
+        }
+        write_file(path, json_dumps(raw, sort_keys=True) + '\n')
+
+    def full_regen(self, old):
+        """
+        Whether the changes since the old manifest require regenerating everything.
+        This is the case if there is no old manifest, or the command line arguments changed.
+        """
+        return not old.ases or self.args_hash != old.args_hash
+
+    def changed_isds(self, old):
+        """
+        Return the ISD numbers whose crypto inputs differ from the old manifest, i.e. whose
+        certificates need to be regenerated.
+        """
+        return sorted((isd for isd, h in self.crypto.items() if old.crypto.get(isd) != h),
+                      key=int)
+
+    def changed(self, old):
+        """
+        Return the ISD-AS strings of the ASes whose inputs differ from the old manifest.
+        """
+        return [ia for ia, entry in self.ases.items()
+                if old.ases.get(ia, {}).get('hash') != entry['hash']]
+
+    def removed(self, old):
+        """
+        Return the ISD-AS strings of the ASes that are only contained in the old manifest.
+        """
+        return [ia for ia in old.ases if ia not in self.ases]
+
+    def stale_elements(self, old, ia):
+        """
+        Return the elements of the AS that were generated in the old run, but not anymore.
+        """
+        elements = set(self.ases[ia]['elements'])
+        return [e for e in old.ases.get(ia, {}).get('elements', []) if e not in elements]
+
+
+def content_hash(obj):
+    """
+    Return the hex encoded SHA-256 hash of the canonical JSON encoding of obj.
+    """
+    raw = json.dumps(obj, sort_keys=True, default=_json_default)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def elem_networks(networks):
+    """
+    Return the subnet and address per element name.
+
+    :param dict networks: The generated networks from SubnetGenerator.
+    """
+    elem_nets = {}
+    for net, elems in networks.items():
+        for name, intf in elems.items():
+            elem_nets[name] = [str(net), str(intf)]
+    return elem_nets
+
+
+def _json_default(o):
+    try:
+        return json_default(o)
+    except TypeError:
+        return str(o)
+
+
+def _elements(as_topo):
+    elements = []
+    for elems in as_topo.services.values():
+        elements.extend(elems)
+    return sorted(elements)
+
+
+def _as_networks(elem_nets, topo_id, elements):
+    """
+    Return the subnets and addresses allocated to the elements of an AS.
+
+    :param dict elem_nets: The subnet and address per element name.
+    """
+    names = [sciond_name(topo_id), 'tester_%s' % topo_id.file_fmt()]
+    for elem in elements:
+        names.extend((elem, elem + '_ctrl', elem + '_internal'))
+    return {name: elem_nets[name] for name in names if name in elem_nets}
@@ -0,0 +1,189 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`model` --- Object model of the generated topologies
+=========================================================
+
+TopoGenerator builds one AS object per AS, the generators read the elements
+from it directly. to_topo() returns the layout of the topology.json files.
+The addresses are AddressProxy objects, which are only allocated after all
+ASes are built.
+"""
+# SCION
+from lib.defines import SCION_ROUTER_PORT
+from topology.common import SCION_SERVICE_NAMES
+
+
+class AS(object):
+    __slots__ = ('topo_id', 'attributes', 'mtu', 'underlay', 'services')
+
+    def __init__(self, topo_id, attributes, mtu, underlay, sig=False):
+        """
+        :param TopoID topo_id: The ISD-AS.
+        :param list attributes: The AS attributes, e.g. 'core'.
+        :param int mtu: The intra-AS MTU.
+        :param str underlay: The underlay of the AS, e.g. 'UDP/IPv4'.
+        :param bool sig: Whether the AS has a SIG.
+        """
+        self.topo_id = topo_id
+        self.attributes = attributes
+        self.mtu = mtu
+        self.underlay = underlay
+        # The elements by name, per topology.json service key, in the order of the file.
+        self.services = {name: {} for name in SCION_SERVICE_NAMES}
+        if sig:
+            self.services['SIG'] = {}
+
+    @property
+    def core(self):
+        return 'core' in self.attributes
+
+    @property
+    def border_routers(self):
+        return self.services['BorderRouters']
+
+    @property
+    def control_services(self):
+        return self.services['ControlService']
+
+    @property
+    def colibri_services(self):
+        return self.services['ColibriService']
+
+    @property
+    def sigs(self):
+        return self.services.get('SIG', {})
+
+    def to_topo(self):
+        """
+        Return the topology.json layout of the AS.
+        """
+        topo = {
+            'Attributes': self.attributes,
+            'ISD_AS': str(self.topo_id),
+            'MTU': self.mtu,
+            'Overlay': self.underlay,
+        }
+        for key, elems in self.services.items():
+            topo[key] = {name: elem.to_topo() for name, elem in elems.items()}
+        return topo
+
+
+class Address(object):
+    """
+    An allocated address and port of an element.
+    """
+    __slots__ = ('addr_type', 'addr', 'port')
+
+    def __init__(self, addr_type, addr, port):
+        """
+        :param str addr_type: 'IPv4' or 'IPv6'.
+        :param AddressProxy addr: The address.
+        :param int port: The port.
+        """
+        self.addr_type = addr_type
+        self.addr = addr
+        self.port = port
+
+    @property
+    def ip(self):
+        return self.addr.ip
+
+    def to_topo(self, key='Public', port_key='L4Port'):
+        return {self.addr_type: {key: {'Addr': self.addr, port_key: self.port}}}
+
+
+class ServiceInstance(object):
+    """
+    An instance of a control plane service, e.g. a control service or a SIG.
+    """
+    __slots__ = ('name', 'addr')
+
+    def __init__(self, name, addr):
+        """
+        :param str name: The element name.
+        :param Address addr: The public address.
+        """
+        self.name = name
+        self.addr = addr
+
+    def to_topo(self):
+        return {'Addrs': self.addr.to_topo()}
+
+
+class BorderRouter(object):
+    __slots__ = ('name', 'ctrl_addr', 'internal_addr', 'interfaces')
+
+    def __init__(self, name, ctrl_addr, internal_addr):
+        """
+        :param str name: The element name.
+        :param Address ctrl_addr: The control address.
+        :param Address internal_addr: The internal (overlay) address.
+        """
+        self.name = name
+        self.ctrl_addr = ctrl_addr
+        self.internal_addr = internal_addr
+        # The interfaces by interface ID.
+        self.interfaces = {}
+
+    def to_topo(self):
+        return {
+            'CtrlAddr': self.ctrl_addr.to_topo(),
+            'InternalAddrs': self.internal_addr.to_topo('PublicOverlay', 'OverlayPort'),
+            'Interfaces': {ifid: intf.to_topo() for ifid, intf in self.interfaces.items()},
+        }
+
+
+class Interface(object):
+    """
+    An inter-AS interface of a border router. Both ends of the link use SCION_ROUTER_PORT.
+    """
+    __slots__ = ('underlay', 'public_addr', 'remote_addr', 'bandwidth', 'remote_ia',
+                 'link_to', 'mtu')
+
+    def __init__(self, underlay, public_addr, remote_addr, bandwidth, remote_ia, link_to,
+                 mtu):
+        """
+        :param str underlay: The underlay of the link.
+        :param AddressProxy public_addr: The local address of the link.
+        :param AddressProxy remote_addr: The remote address of the link.
+        :param int bandwidth: The link bandwidth.
+        :param str remote_ia: The ISD-AS of the remote AS.
+        :param str link_to: The type of the remote AS, e.g. 'CHILD'.
+        :param int mtu: The link MTU.
+        """
+        self.underlay = underlay
+        self.public_addr = public_addr
+        self.remote_addr = remote_addr
+        self.bandwidth = bandwidth
+        self.remote_ia = remote_ia
+        self.link_to = link_to
+        self.mtu = mtu
+
+    def to_topo(self):
+        return {
+            'Overlay': self.underlay,
+            'PublicOverlay': {
+                'Addr': self.public_addr,
+                'OverlayPort': SCION_ROUTER_PORT
+            },
+            'RemoteOverlay': {
+                'Addr': self.remote_addr,
+                'OverlayPort': SCION_ROUTER_PORT
+            },
+            'Bandwidth': self.bandwidth,
+            'ISD_AS': self.remote_ia,
+            'LinkTo': self.link_to,
+            'MTU': self.mtu,
+        }
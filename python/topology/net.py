@@ -21,7 +21,7 @@ import logging
 import math
 import sys
 from collections import defaultdict
-from ipaddress import ip_interface, ip_network
+from ipaddress import IPv4Interface, IPv6Interface, ip_network
 
 # External packages
 import yaml
@@ -36,8 +36,16 @@ DEFAULT_SCN_IN_D_NETWORK = "172.20.16.0/20"
 
 
 class SubnetGenerator(object):
-    def __init__(self, network, docker, in_docker):
+    def __init__(self, network, docker, in_docker, allocated=None):
+        """
+        :param dict allocated: The subnets of a previous run to keep, see AllocationStore.
+        """
         self.docker = docker
+        self._kept = allocated or {}
+        # The allocated subnets, in the format of AllocationStore.
+        self.allocated = {}
+        # The keys of the locations in the AllocationStore, if not their string form.
+        self._keys = {}
         if self.docker and network == DEFAULT_NETWORK:
             if in_docker:
                 network = DEFAULT_SCN_IN_D_NETWORK
@@ -52,67 +60,225 @@ class SubnetGenerator(object):
             logging.critical("Invalid network '%s'", network)
             sys.exit(1)
         self._subnets = defaultdict(lambda: AddressGenerator(self.docker))
-        self._allocations = defaultdict(list)
+        self._max_prefix = self._net.max_prefixlen
+        self._addr_cls = type(self._net.network_address)
+        # Buddy allocator over the integer address space: the network addresses of the free
+        # blocks, per prefix length. The block that was freed last is allocated first.
+        self._allocations = [[] for _ in range(self._max_prefix + 1)]
         # Initialise the allocations with the supplied network, making sure to
         # exclude 127.0.0.0/30 (for v4) and DEFAULT6_NETWORK_ADDR/126 (for v6)
         # if it's contained in the network.
         # - .0 is treated as a broadcast address by the kernel
         # - .1 is the normal loopback address
         # - .[23] are used for clients to bind to for testing purposes.
-        if self._net.version == 4:
-            exclude = ip_network("127.0.0.0/30")
-        else:
-            exclude = ip_network(DEFAULT6_NETWORK_ADDR + "/126")
-
+        exclude = self._excluded_net()
+        net_addr = int(self._net.network_address)
         if self._net.overlaps(exclude):
-            self._exclude_net(self._net, exclude)
+            if exclude.prefixlen > self._net.prefixlen:
+                self._split(self._net.prefixlen, int(exclude.network_address),
+                            exclude.prefixlen)
             return
 
-        self._allocations[self._net.prefixlen].append(self._net)
+        self._allocations[self._net.prefixlen].append(net_addr)
+
+    def register(self, location, index=None, link=False, key=None):
+        """
+        Register the subnet of a location, i.e. an AS or a link.
 
-    def register(self, location):
+        :param int index: The stable index of the AS or link, only used by
+            ComputedSubnetGenerator.
+        :param bool link: Whether the location is a link.
+        :param str key: The key of the location in the AllocationStore, str(location) by
+            default. It must not change when unrelated locations are added.
+        """
+        if key is not None:
+            self._keys[location] = key
         return self._subnets[location]
 
     def alloc_subnets(self):
-        max_prefix = self._net.max_prefixlen
         networks = {}
-        for topo, subnet in sorted(self._subnets.items(), key=lambda x: str(x)):
-            if not self.docker:
-                # Figure out what size subnet we need. If it's a link, then we just
-                # need a /31 (or /127), otherwise add 2 to the subnet size to cover
-                # the network and broadcast addresses.
-                if len(subnet) == 2:
-                    req_prefix = max_prefix - 1
-                else:
-                    req_prefix = max_prefix - math.ceil(math.log2(len(subnet) + 2))
-            else:
-                # Docker needs space for a network and broadcast address as well as an IP linking
-                # to the host
-                req_prefix = max_prefix - math.ceil(math.log2(len(subnet) + 3))
-
-            # Search all subnets from that size upwards
-            for prefix in range(req_prefix, -1, -1):
-                if not self._allocations[prefix]:
-                    # No subnets available at this size
-                    continue
-                alloc = self._allocations[prefix].pop()
-                # Carve out subnet of the required size
-                new_net = next(alloc.subnets(new_prefix=req_prefix))
-                new_net = _workaround_ip_network_hosts_py35(new_net)
-                logging.debug("Allocating %s from %s for subnet size %d" %
-                              (new_net, alloc, len(subnet)))
-                networks[new_net] = subnet.alloc_addrs(new_net)
-                # Repopulate the allocations list with the left-over space
-                self._exclude_net(alloc, new_net)
-                break
-            else:
-                logging.critical("Unable to allocate /%d subnet" % req_prefix)
+        subnets = sorted(self._subnets.items(), key=lambda x: str(x))
+        # The kept subnets are reserved first, the new subnets are allocated around them.
+        kept = self._reserve_kept(subnets)
+        for topo, subnet in subnets:
+            new_net = kept.get(topo)
+            if new_net is None:
+                new_net = self._alloc_subnet(subnet)
+            networks[new_net] = self._alloc_addrs(topo, subnet, new_net)
+        return networks
+
+    def _req_prefix(self, subnet):
+        max_prefix = self._max_prefix
+        if not self.docker:
+            # Figure out what size subnet we need. If it's a link, then we just
+            # need a /31 (or /127), otherwise add 2 to the subnet size to cover
+            # the network and broadcast addresses.
+            if len(subnet) == 2:
+                return max_prefix - 1
+            return max_prefix - math.ceil(math.log2(len(subnet) + 2))
+        # Docker needs space for a network and broadcast address as well as an IP linking
+        # to the host
+        return max_prefix - math.ceil(math.log2(len(subnet) + 3))
+
+    def _alloc_subnet(self, subnet):
+        req_prefix = self._req_prefix(subnet)
+        # Search all subnets from that size upwards
+        for prefix in range(req_prefix, -1, -1):
+            if not self._allocations[prefix]:
+                # No subnets available at this size
+                continue
+            alloc = self._allocations[prefix].pop()
+            # Carve out subnet of the required size, at the start of the block
+            new_net = self._network(alloc, req_prefix)
+            logging.debug("Allocating %s from %s/%d for subnet size %d",
+                          new_net, self._addr_cls(alloc), prefix, len(subnet))
+            # Repopulate the allocations list with the left-over space
+            self._split(prefix, alloc, req_prefix)
+            return new_net
+        logging.critical("Unable to allocate /%d subnet" % req_prefix)
+        sys.exit(1)
+
+    def _alloc_addrs(self, location, subnet, net):
+        entry = self._kept.get(self._key(location), {})
+        kept = entry.get('addrs') if entry.get('net') == str(net) else None
+        interfaces = subnet.alloc_addrs(net, kept)
+        self.allocated[self._key(location)] = {
+            'net': str(net),
+            'addrs': {elem: str(intf) for elem, intf in interfaces.items()},
+        }
+        return interfaces
+
+    def _reserve_kept(self, subnets):
+        """
+        Reserve the subnets of the previous run that still fit their location.
+
+        :returns: The kept subnets, keyed by location.
+        :rtype: dict
+        """
+        kept = {}
+        for location, subnet in subnets:
+            entry = self._kept.get(self._key(location))
+            if entry is None:
+                continue
+            net = ip_network(entry['net'])
+            if (net.version != self._net.version or net.network_address not in self._net or
+                    net.broadcast_address not in self._net or
+                    net.prefixlen > self._req_prefix(subnet)):
+                continue
+            if self._reserve(int(net.network_address), net.prefixlen):
+                kept[location] = net
+        return kept
+
+    def _key(self, location):
+        return self._keys.get(location, str(location))
+
+    def _reserve(self, addr, prefix):
+        """
+        Remove the subnet addr/prefix from the free blocks. Returns False if it is not free.
+        """
+        for p in range(prefix, self._net.prefixlen - 1, -1):
+            host_bits = self._max_prefix - p
+            block = addr >> host_bits << host_bits
+            if block in self._allocations[p]:
+                self._allocations[p].remove(block)
+                self._split(p, addr, prefix)
+                return True
+        return False
+
+    def _split(self, block_prefix, addr, prefix):
+        """
+        Free the space of the /block_prefix block that contains the subnet addr/prefix, except
+        for the subnet. The block is halved until the subnet remains, the halves that do not
+        contain it are freed, largest first (the order of ip_network.address_exclude).
+        """
+        for p in range(block_prefix + 1, prefix + 1):
+            host_bits = self._max_prefix - p
+            self._allocations[p].append((addr >> host_bits << host_bits) ^ (1 << host_bits))
+
+    def _excluded_net(self):
+        if self._net.version == 4:
+            return ip_network("127.0.0.0/30")
+        return ip_network(DEFAULT6_NETWORK_ADDR + "/126")
+
+    def _network(self, addr, prefix):
+        # Constructed from the string form, as ip_network.hosts() is broken for some other
+        # forms in python 3.5 (https://bugs.python.org/issue27683).
+        return ip_network('%s/%i' % (self._addr_cls(addr), prefix))
+
+
+class ComputedSubnetGenerator(SubnetGenerator):
+    """
+    Addressing plan that computes the subnet of an AS or link from its index, instead of
+    allocating the subnets in one pass over all locations. The subnet of a location does
+    therefore not depend on the other locations, and stays the same when unrelated ASes or
+    links are added. Within a subnet, the addresses are assigned to the elements in the
+    order of their names, as by SubnetGenerator.
+
+    The first half of the network contains the AS subnets, with AS_HOST_BITS host bits
+    each. The first of them is reserved, it contains the excluded addresses. The second half
+    contains the link subnets, i.e. /31 (/127 for IPv6) subnets, or /29 (/125) subnets with
+    docker.
+    """
+    AS_HOST_BITS = 8
+
+    def __init__(self, network, docker, in_docker, allocated=None):
+        super().__init__(network, docker, in_docker, allocated)
+        self._indexes = {}
+        host_bits = self._max_prefix - self._net.prefixlen
+        # Docker needs space for a network, gateway and broadcast address.
+        link_host_bits = 3 if self.docker else 1
+        if host_bits - 1 <= self.AS_HOST_BITS:
+            logging.critical("Network '%s' is too small for the computed addressing plan",
+                             network)
+            sys.exit(1)
+        self._region_size = 1 << (host_bits - 1)
+        self._as_prefix = self._max_prefix - self.AS_HOST_BITS
+        self._link_prefix = self._max_prefix - link_host_bits
+        exclude = self._excluded_net()
+        if (self._net.overlaps(exclude) and int(exclude.network_address) -
+                int(self._net.network_address) >= 1 << self.AS_HOST_BITS):
+            logging.critical("Network '%s' contains %s outside of its first subnet",
+                             network, exclude)
+            sys.exit(1)
+
+    def register(self, location, index=None, link=False, key=None):
+        self._indexes[location] = index, link
+        return super().register(location, index, link, key)
+
+    def alloc_subnets(self):
+        networks = {}
+        for location, subnet in sorted(self._subnets.items(), key=lambda x: str(x)):
+            net = self.network(*self._indexes[location])
+            capacity = net.num_addresses - (3 if self.docker else 2)
+            if not self.docker and net.prefixlen == self._max_prefix - 1:
+                # A /31 (or /127) link subnet has no network and broadcast address.
+                capacity = 2
+            if len(subnet) > capacity:
+                logging.critical("Subnet %s of %s is too small for %d addresses",
+                                 net, location, len(subnet))
                 sys.exit(1)
+            networks[net] = self._alloc_addrs(location, subnet, net)
         return networks
 
-    def _exclude_net(self, alloc, net):
-        for net in alloc.address_exclude(net):
-            self._allocations[net.prefixlen].append(net)
+    def network(self, index, link=False):
+        """
+        Compute the subnet of an AS or link.
+
+        :param int index: The index of the AS or link.
+        :param bool link: Whether the location is a link.
+        :rtype: ip_network
+        """
+        if link:
+            prefix, offset = self._link_prefix, self._region_size
+        else:
+            # The first AS subnet is reserved.
+            prefix, offset, index = self._as_prefix, 0, index + 1
+        size = 1 << (self._max_prefix - prefix)
+        if index is None or (index + 1) * size > self._region_size:
+            logging.critical("Unable to compute the subnet of %s %s in network %s",
+                             'link' if link else 'AS', index, self._net)
+            sys.exit(1)
+        return self._network(int(self._net.network_address) + offset + index * size, prefix)
 
 
 class AddressGenerator(object):
@@ -123,23 +289,59 @@ class AddressGenerator(object):
     def register(self, id_):
         return self._addrs[id_]
 
-    def alloc_addrs(self, subnet):
-        hosts = subnet.hosts()
+    def alloc_addrs(self, subnet, kept=None):
+        """
+        Assign the addresses of the subnet to the elements, in the order of their names.
+
+        :param dict kept: The addresses (interface strings) of the elements to keep from a
+            previous run. They are skipped for the other elements.
+        """
         interfaces = {}
+        if not self._addrs:
+            return interfaces
+        hosts = subnet.hosts()
         # With the docker backend, docker itself claims the first ip of every network
         if self.docker:
             next(hosts)
+        # The hosts are consecutive, the interfaces are built from the integer addresses.
+        host = int(next(hosts))
+        intf_cls = IPv4Interface if subnet.version == 4 else IPv6Interface
+        kept_intfs = self._kept_intfs(subnet, kept, host, intf_cls) if kept else {}
+        used = {int(intf.ip) for intf in kept_intfs.values()}
         for elem, proxy in sorted(self._addrs.items()):
-            intf = ip_interface("%s/%s" % (next(hosts), subnet.prefixlen))
+            intf = kept_intfs.get(elem)
+            if intf is None:
+                while host in used:
+                    host += 1
+                intf = intf_cls((host, subnet.prefixlen))
+                host += 1
             interfaces[elem] = intf
             proxy.set_intf(intf)
         return interfaces
 
+    def _kept_intfs(self, subnet, kept, first_host, intf_cls):
+        last_host = int(subnet.broadcast_address)
+        if subnet.version == 4 and subnet.prefixlen < subnet.max_prefixlen - 1:
+            last_host -= 1
+        intfs = {}
+        used = set()
+        for elem, raw in sorted(kept.items()):
+            if elem not in self._addrs:
+                continue
+            intf = intf_cls(raw)
+            host = int(intf.ip)
+            if intf.network != subnet or not first_host <= host <= last_host or host in used:
+                continue
+            used.add(host)
+            intfs[elem] = intf
+        return intfs
+
     def __len__(self):
         return len(self._addrs)
 
 
 class AddressProxy(yaml.YAMLObject):
+    __slots__ = ('_intf', 'ip')
     yaml_tag = ""
 
     def __init__(self):
@@ -159,30 +361,89 @@ class AddressProxy(yaml.YAMLObject):
 
 
 class PortGenerator(object):
-    def __init__(self):
-        self.iter = iter(range(31000, 35000))
-        self._ports = defaultdict(lambda: next(self.iter))
+    """
+    Allocates the ports of the elements from a pool per address. Every element has its own
+    address, so the same ports are used on all addresses.
+    """
+    FIRST_PORT = 31000
+    END_PORT = 35000
 
-    def register(self, id_):
-        p = self._ports[id_]
+    def __init__(self, allocated=None):
+        """
+        :param dict allocated: The ports of a previous run to keep, keyed by ID.
+        """
+        self._kept = allocated or {}
+        # The addresses of the kept ports are only known after the subnet allocation, new
+        # ports therefore skip the kept ports on all addresses.
+        kept_ports = frozenset(self._kept.values())
+        self._pools = defaultdict(lambda: PortPool(self.FIRST_PORT, self.END_PORT, kept_ports))
+        self._ports = {}
+
+    def register(self, id_, addr):
+        """
+        Allocate a port for the element on its address.
+
+        :param str id_: The element ID.
+        :param AddressProxy addr: The (not yet allocated) address of the element.
+        """
+        pool = self._pools[addr]
+        p = self._port(id_, pool)
         # reserve a quic port
-        self._ports[id_+"quic"]
+        self._port(id_+"quic", pool)
         return p
 
+    def allocated(self):
+        return dict(self._ports)
+
+    def _port(self, id_, pool):
+        p = self._ports.get(id_)
+        if p is None:
+            p = self._kept.get(id_)
+            if p is None or not pool.reserve(p):
+                p = pool.new()
+            if p is None:
+                logging.critical("No free port left in %d-%d for %s", self.FIRST_PORT,
+                                 self.END_PORT - 1, id_)
+                sys.exit(1)
+            self._ports[id_] = p
+        return p
+
+
+class PortPool(object):
+    """The ports of one address"""
+    __slots__ = ('_first', '_next', '_end', '_used', '_skip')
+
+    def __init__(self, first, end, skip=frozenset()):
+        """
+        :param frozenset skip: Ports that are only handed out by reserve.
+        """
+        self._first = first
+        self._next = first
+        self._end = end
+        self._used = set()
+        self._skip = skip
+
+    def new(self):
+        """
+        Return the lowest port that was not handed out yet, or None if the pool is exhausted.
+        """
+        while self._next in self._used or self._next in self._skip:
+            self._next += 1
+        if self._next >= self._end:
+            return None
+        p = self._next
+        self._used.add(p)
+        self._next += 1
+        return p
+
+    def reserve(self, port):
+        if port in self._used or not self._first <= port < self._end:
+            return False
+        self._used.add(port)
+        return True
+
 
 def socket_address_str(ip, port):
     if ip.version == 4:
         return "%s:%d" % (ip, port)
     return "[%s]:%d" % (ip, port)
-
-
-def _workaround_ip_network_hosts_py35(net):
-    """
-    Returns an _identical_ ipaddress.ip_network for which hosts() which will work as it should.
-
-    This works around a regression in python 3.5, where the behaviour of hosts was broken
-    when using a certain form of the ip_network constructor.
-    This regression is fixed in python 3.6.6 / 3.7.0.
-    See https://bugs.python.org/issue27683
-    """
-    return ip_network('%s/%i' % (net.network_address, net.prefixlen))
@@ -0,0 +1,63 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`parallel` --- Per-AS parallel generation
+==============================================
+"""
+# Stdlib
+import math
+import multiprocessing
+
+# Number of shards handed out per worker, so that a few large ASes do not
+# leave the other workers idle.
+SHARDS_PER_JOB = 4
+
+# The function executed by the worker processes, set by _init_worker.
+_shard_func = None
+
+
+def map_shards(func, topo_ids, jobs):
+    """
+    Calls func on contiguous shards of topo_ids, using up to jobs worker processes.
+
+    The workers are forked, so func (and everything it references) is inherited
+    instead of being pickled. Only the shards and the return values are sent
+    between processes, the return values must therefore be picklable.
+
+    :param callable func: Called with a list of topo ids, returns the per-shard result.
+    :param list topo_ids: The topo ids to process, in generation order.
+    :param int jobs: The number of worker processes.
+    :returns: The results of func, in the order of the shards.
+    :rtype: list
+    """
+    if jobs <= 1 or len(topo_ids) <= 1:
+        return [func(topo_ids)]
+    shards = _shard(topo_ids, jobs * SHARDS_PER_JOB)
+    ctx = multiprocessing.get_context('fork')
+    with ctx.Pool(jobs, initializer=_init_worker, initargs=(func,)) as pool:
+        return pool.map(_run_shard, shards)
+
+
+def _shard(items, count):
+    size = math.ceil(len(items) / count)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _init_worker(func):
+    global _shard_func
+    _shard_func = func
+
+
+def _run_shard(topo_ids):
+    return _shard_func(topo_ids)
@@ -0,0 +1,206 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`profiling` --- Phase profiling of the topology generator
+==============================================================
+"""
+# Stdlib
+import copy
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# SCION
+from lib.util import make_dirs
+
+
+class Profiler(object):
+    """
+    Records the wall time and the peak traced memory of the generation phases, and
+    the time spent in external commands. Phases can be nested, the phases of the
+    same name are accumulated. A disabled profiler records nothing.
+    """
+
+    def __init__(self, enabled=True, memory=True, pstats_dir=None):
+        """
+        :param bool enabled: Whether to record anything.
+        :param bool memory: Whether to measure the peak memory. tracemalloc is started
+            by the first phase, if it is not running yet.
+        :param str pstats_dir: If set, a cProfile of every phase is written to
+            <pstats_dir>/<phase>.pstats by dump_stats.
+        """
+        self.enabled = enabled
+        self.memory = memory
+        self.pstats_dir = pstats_dir
+        self.phases = {}
+        self.commands = {}
+        self._pid = os.getpid()
+        # The lower bound of the peak memory and the peak of tracemalloc at the start, of
+        # the enclosing phases.
+        self._peaks = []
+        self._profiles = []
+        self._stats = {}
+
+    def child(self):
+        """
+        Return a profiler with empty phases and commands, to measure a part of the
+        generation that may run in a worker process. Its results are added with merge.
+        cProfile data is only collected in the process of this profiler.
+        """
+        child = copy.copy(self)
+        child.phases = {}
+        child.commands = {}
+        if os.getpid() != self._pid:
+            child.pstats_dir = None
+            child._pid = os.getpid()
+            child._peaks = []
+            child._profiles = []
+            child._stats = {}
+        return child
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Measure the enclosed block as the phase name.
+
+        The peak memory is exact for a phase that raises the peak of the whole run. For the
+        other phases, it is the largest traced memory at the start and the end of the phase
+        and its nested phases, as the peak of tracemalloc cannot be reset before Python 3.9.
+        """
+        if not self.enabled:
+            yield
+            return
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1][0] = max(self._peaks[-1][0], current)
+            self._peaks.append([current, peak])
+        prof = self._start_profile()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            self._stop_profile(name, prof)
+            phase_peak = None
+            if self.memory:
+                bound, start_peak = self._peaks.pop()
+                current, peak = tracemalloc.get_traced_memory()
+                phase_peak = peak if peak > start_peak else max(bound, current)
+                if self._peaks:
+                    self._peaks[-1][0] = max(self._peaks[-1][0], phase_peak)
+            self._add(self.phases, name, wall, phase_peak)
+
+    @contextmanager
+    def command(self, name):
+        """
+        Measure the enclosed block as a run of the external command name.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.commands, name, time.perf_counter() - start, None)
+
+    def wrap(self, name, func):
+        """
+        Wrap func, so that every call is measured as the phase name.
+        """
+        def wrapped(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+        return wrapped
+
+    def merge(self, phases, commands):
+        """
+        Add the phases and commands of a child profiler, as returned by its results().
+        The wall times of parallel workers add up, and can therefore exceed the wall time
+        of the enclosing phase.
+        """
+        for table, entries in ((self.phases, phases), (self.commands, commands)):
+            for name, entry in entries.items():
+                self._add(table, name, entry['wall_s'], entry.get('peak_bytes'),
+                          entry['calls'])
+
+    def results(self):
+        """
+        :returns: The phases and commands, which can be passed to merge of another profiler.
+        :rtype: (dict, dict)
+        """
+        return self.phases, self.commands
+
+    def report(self):
+        """
+        Return the breakdown table of the phases and commands.
+        """
+        lines = ['%-24s %10s %6s %12s' % ('Phase', 'Wall [s]', 'Calls', 'Peak [MiB]')]
+        for name, entry in self.phases.items():
+            peak = entry.get('peak_bytes')
+            lines.append('%-24s %10.3f %6d %12s' % (
+                name, entry['wall_s'], entry['calls'],
+                '-' if peak is None else '%.1f' % (peak / 2**20)))
+        if self.commands:
+            lines.append('')
+            lines.append('%-24s %10s %6s' % ('Command', 'Wall [s]', 'Calls'))
+            for name, entry in self.commands.items():
+                lines.append('%-24s %10.3f %6d' % (name, entry['wall_s'], entry['calls']))
+        return '\n'.join(lines)
+
+    def dump_stats(self):
+        """
+        Write the cProfile data of every phase to pstats_dir.
+        """
+        if not self._stats:
+            return
+        make_dirs(self.pstats_dir)
+        for name, stats in self._stats.items():
+            stats.dump_stats(os.path.join(self.pstats_dir, '%s.pstats' % name.replace(' ', '_')))
+
+    def _start_profile(self):
+        if not self.pstats_dir:
+            return None
+        # Only one cProfile can be active, the one of the enclosing phase is paused.
+        if self._profiles:
+            self._profiles[-1].disable()
+        prof = cProfile.Profile()
+        self._profiles.append(prof)
+        prof.enable()
+        return prof
+
+    def _stop_profile(self, name, prof):
+        if prof is None:
+            return
+        prof.disable()
+        self._profiles.pop()
+        if self._profiles:
+            self._profiles[-1].enable()
+        if name in self._stats:
+            self._stats[name].add(prof)
+        else:
+            self._stats[name] = pstats.Stats(prof)
+
+    def _add(self, table, name, wall, peak, calls=1):
+        entry = table.setdefault(name, {'wall_s': 0.0, 'calls': 0})
+        entry['wall_s'] += wall
+        entry['calls'] += calls
+        if peak is not None:
+            entry['peak_bytes'] = max(entry.get('peak_bytes', 0), peak)
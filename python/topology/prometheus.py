@@ -20,18 +20,18 @@
 import os
 from collections import defaultdict
 
-# External packages
-import yaml
-
 # SCION
 from lib.defines import DOCKER_COMPOSE_CONFIG_VERSION, PROM_FILE
-from lib.util import write_file
+from lib.serialization import yaml_dump
 from topology.common import (
     ArgsTopoDicts,
+    disp_names,
     prom_addr_br,
     prom_addr_infra,
     prom_addr_dispatcher,
     sciond_ip,
+    shared_disps,
+    topo_iter,
 )
 
 CS_PROM_PORT = 30452
@@ -72,41 +72,83 @@ class PrometheusGenerator(object):
         self.args = args
         self.output_base = os.environ.get('SCION_OUTPUT_BASE', os.getcwd())
 
-    def generate(self):
+    def generate(self, as_confs=None):
+        """
+        Generate the prometheus configuration.
+
+        :param list as_confs: The targets returned by generate_as. The targets of ASes which
+            are not contained are computed here, but their target files are not written.
+        """
+        if as_confs is None:
+            as_confs = [self.generate_as()]
+        targets = {}
+        for as_conf in as_confs:
+            targets.update(as_conf)
         config_dict = {}
-        for topo_id, as_topo in self.args.topo_dicts.items():
-            ele_dict = defaultdict(list)
-            for br_id, br_ele in as_topo["BorderRouters"].items():
-                ele_dict["BorderRouters"].append(prom_addr_br(br_id, br_ele, DEFAULT_BR_PROM_PORT))
-            for elem_id, elem in as_topo["ControlService"].items():
-                prom_addr = prom_addr_infra(self.args.docker, elem_id, elem, CS_PROM_PORT)
-                ele_dict["ControlService"].append(prom_addr)
-            if self.args.docker:
-                host_dispatcher = prom_addr_dispatcher(self.args.docker, topo_id,
-                                                       self.args.networks, DISP_PROM_PORT, "")
-                br_dispatcher = prom_addr_dispatcher(self.args.docker, topo_id,
-                                                     self.args.networks, DISP_PROM_PORT, "br")
-                ele_dict["Dispatcher"] = [host_dispatcher, br_dispatcher]
-            sd_prom_addr = '[%s]:%d' % (sciond_ip(self.args.docker, topo_id, self.args.networks),
-                                        SCIOND_PROM_PORT)
-            ele_dict["Sciond"].append(sd_prom_addr)
+        # The topo dicts are only accessed for the missing ASes, as they may be rebuilt on
+        # access (see StreamedTopoDicts).
+        for topo_id in self.args.topo_dicts:
+            ele_dict = targets.get(topo_id)
+            if ele_dict is None:
+                ele_dict = self._as_targets(topo_id, self.args.topo_dicts[topo_id])
             config_dict[topo_id] = ele_dict
         self._write_config_files(config_dict)
         self._write_dc_file()
         self._write_disp_file()
 
+    def generate_as(self, topo_ids=None):
+        """
+        Generate and write the prometheus targets of the per-AS services.
+
+        :param list topo_ids: If set, only generate the targets of these ASes.
+        :returns: The targets per element type, per AS.
+        :rtype: dict
+        """
+        config_dict = {}
+        for topo_id, as_topo in topo_iter(self.args.topo_dicts, topo_ids):
+            ele_dict = self._as_targets(topo_id, as_topo)
+            self._write_as_config_files(topo_id, ele_dict)
+            config_dict[topo_id] = ele_dict
+        return config_dict
+
+    def _as_targets(self, topo_id, as_topo):
+        ele_dict = defaultdict(list)
+        for br_id, br_ele in as_topo.border_routers.items():
+            ele_dict["BorderRouters"].append(prom_addr_br(br_id, br_ele, DEFAULT_BR_PROM_PORT))
+        for elem_id, elem in as_topo.control_services.items():
+            prom_addr = prom_addr_infra(self.args.docker, elem_id, elem, CS_PROM_PORT)
+            ele_dict["ControlService"].append(prom_addr)
+        if self.args.docker and shared_disps(self.args):
+            for disp_id in disp_names(self.args, topo_id, as_topo):
+                ele_dict["Dispatcher"].append(prom_addr_dispatcher(
+                    self.args.docker, topo_id, self.args.graph, DISP_PROM_PORT, disp_id, True))
+        elif self.args.docker:
+            host_dispatcher = prom_addr_dispatcher(self.args.docker, topo_id,
+                                                   self.args.graph, DISP_PROM_PORT, "")
+            br_dispatcher = prom_addr_dispatcher(self.args.docker, topo_id,
+                                                 self.args.graph, DISP_PROM_PORT, "br")
+            ele_dict["Dispatcher"] = [host_dispatcher, br_dispatcher]
+        sd_prom_addr = '[%s]:%d' % (sciond_ip(self.args.docker, topo_id, self.args.graph),
+                                    SCIOND_PROM_PORT)
+        ele_dict["Sciond"].append(sd_prom_addr)
+        return ele_dict
+
+    def _write_as_config_files(self, topo_id, ele_dict):
+        base = topo_id.base_dir(self.args.output_dir)
+        as_local_targets_path = {}
+        for ele_type, target_list in ele_dict.items():
+            local_path = os.path.join(self.PROM_DIR, self.TARGET_FILES[ele_type])
+            as_local_targets_path[self.JOB_NAMES[ele_type]] = [local_path]
+            self._write_target_file(base, target_list, ele_type)
+        self._write_config_file(os.path.join(base, PROM_FILE), as_local_targets_path)
+
     def _write_config_files(self, config_dict):
         targets_paths = defaultdict(list)
         for topo_id, ele_dict in config_dict.items():
-            base = topo_id.base_dir(self.args.output_dir)
-            as_local_targets_path = {}
-            for ele_type, target_list in ele_dict.items():
+            for ele_type in ele_dict:
                 local_path = os.path.join(self.PROM_DIR, self.TARGET_FILES[ele_type])
                 targets_path = os.path.join(topo_id.base_dir(''), local_path)
                 targets_paths[self.JOB_NAMES[ele_type]].append(targets_path)
-                as_local_targets_path[self.JOB_NAMES[ele_type]] = [local_path]
-                self._write_target_file(base, target_list, ele_type)
-            self._write_config_file(os.path.join(base, PROM_FILE), as_local_targets_path)
         if not self.args.docker:
             targets_paths["dispatcher"] = [os.path.join("dispatcher", "prometheus", "disp.yml")]
         self._write_config_file(os.path.join(self.args.output_dir, PROM_FILE), targets_paths)
@@ -128,12 +170,12 @@ class PrometheusGenerator(object):
             },
             'scrape_configs': scrape_configs,
         }
-        write_file(config_path, yaml.dump(config, default_flow_style=False))
+        self.args.sink.write(config_path, yaml_dump(config, default_flow_style=False))
 
     def _write_target_file(self, base_path, target_addrs, ele_type):
         targets_path = os.path.join(base_path, self.PROM_DIR, self.TARGET_FILES[ele_type])
         target_config = [{'targets': target_addrs}]
-        write_file(targets_path, yaml.dump(target_config, default_flow_style=False))
+        self.args.sink.write(targets_path, yaml_dump(target_config, default_flow_style=False))
 
     def _write_disp_file(self):
         if self.args.docker:
@@ -142,7 +184,7 @@ class PrometheusGenerator(object):
                                     PrometheusGenerator.PROM_DIR, "disp.yml")
         target_config = [{'targets': [prom_addr_dispatcher(False, None, None,
                                                            DISP_PROM_PORT, None)]}]
-        write_file(targets_path, yaml.dump(target_config, default_flow_style=False))
+        self.args.sink.write(targets_path, yaml_dump(target_config, default_flow_style=False))
 
     def _write_dc_file(self):
         name_prefix = 'prometheus'
@@ -161,5 +203,5 @@ class PrometheusGenerator(object):
                 }
             }
         }
-        write_file(os.path.join(self.args.output_dir, PROM_DC_FILE),
-                   yaml.dump(prom_dc, default_flow_style=False))
+        self.args.sink.write(os.path.join(self.args.output_dir, PROM_DC_FILE),
+                             yaml_dump(prom_dc, default_flow_style=False))
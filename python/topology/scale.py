@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`scale` --- Synthetic scale topologies
+===========================================
+
+Synthesizes topology configs (.topo files) of arbitrary size, to measure the
+topology generator on topologies that are larger than the checked-in ones.
+
+Every ISD consists of core ASes and leaf ASes. The core ASes of an ISD are
+connected in a ring (core_degree > 2 adds chords), and the ISDs are connected
+by core links between their first core ASes. Every leaf AS is the child of
+``parents`` ASes, chosen among the core ASes and the preceding leaf ASes of its
+ISD, and peers with other leaf ASes of its ISD.
+"""
+# Stdlib
+import argparse
+import random
+from collections import defaultdict
+
+# SCION
+from lib.serialization import yaml_dump
+from lib.types import LinkType
+
+# The first AS number, the ASes are numbered consecutively across ISDs.
+AS_BASE = 0xff0000000100
+
+
+def scale_topo(isds, cores, leaves, core_degree=2, isd_degree=1, parents=1, peers=0, seed=0):
+    """
+    Synthesize a topology config.
+
+    :param int isds: The number of ISDs.
+    :param int cores: The number of core ASes per ISD.
+    :param int leaves: The number of leaf ASes per ISD.
+    :param int core_degree: The number of CORE links of a core AS within its ISD.
+    :param int isd_degree: The number of CORE links of an ISD to the following ISDs.
+    :param int parents: The number of parents of a leaf AS.
+    :param int peers: The number of PEER links of a leaf AS.
+    :param int seed: The seed used to pick the parents and peers.
+    :returns: The topology config, in the format read by TopoGenerator.
+    :rtype: dict
+    """
+    if isds < 1 or cores < 1:
+        raise ValueError("At least one ISD with one core AS is required")
+    rng = random.Random(seed)
+    ifids = defaultdict(int)
+    ases = {}
+    links = []
+    linked = set()
+
+    def link(a, b, link_type):
+        if a == b or (a, b) in linked or (b, a) in linked:
+            return
+        linked.add((a, b))
+        ifids[a] += 1
+        ifids[b] += 1
+        links.append({
+            'a': '%s#%d' % (a, ifids[a]),
+            'b': '%s#%d' % (b, ifids[b]),
+            'linkAtoB': link_type.upper(),
+        })
+
+    isd_cores = []
+    num = AS_BASE
+    for isd in range(1, isds + 1):
+        core_ases = []
+        for _ in range(cores):
+            ia = _ia(isd, num)
+            num += 1
+            ases[ia] = {'core': True, 'voting': True, 'authoritative': True, 'issuing': True}
+            core_ases.append(ia)
+        # Ring of the core ASes, with additional chords for higher degrees.
+        for i, ia in enumerate(core_ases):
+            for step in range(1, core_degree // 2 + 1):
+                link(ia, core_ases[(i + step) % cores], LinkType.CORE)
+            if core_degree % 2 and cores > 2:
+                link(ia, core_ases[(i + cores // 2) % cores], LinkType.CORE)
+        isd_cores.append(core_ases)
+        # Parents are picked among the core ASes and the preceding leaf ASes, which
+        # results in a hierarchy of varying depth.
+        candidates = list(core_ases)
+        leaf_ases = []
+        for _ in range(leaves):
+            ia = _ia(isd, num)
+            num += 1
+            issuer = rng.choice(core_ases)
+            ases[ia] = {'cert_issuer': issuer}
+            link(issuer, ia, LinkType.CHILD)
+            others = [c for c in rng.sample(candidates, min(parents, len(candidates)))
+                      if c != issuer]
+            for parent in others[:parents - 1]:
+                link(parent, ia, LinkType.CHILD)
+            candidates.append(ia)
+            leaf_ases.append(ia)
+        for ia in leaf_ases:
+            others = [o for o in rng.sample(leaf_ases, min(peers + 1, len(leaf_ases)))
+                      if o != ia]
+            for other in others[:peers]:
+                link(ia, other, LinkType.PEER)
+    for i, core_ases in enumerate(isd_cores):
+        for step in range(1, min(isd_degree, isds - 1) + 1):
+            link(core_ases[0], isd_cores[(i + step) % isds][0], LinkType.CORE)
+    return {'ASes': ases, 'links': links}
+
+
+def _ia(isd, num):
+    return '%d-%x:%x:%x' % (isd, num >> 32 & 0xffff, num >> 16 & 0xffff, num & 0xffff)
+
+
+def write_topo(topo, path):
+    """
+    Write a topology config in the format of the checked-in .topo files.
+    """
+    with open(path, 'w') as f:
+        f.write('--- # Synthetic topology: %d ASes, %d links\n' %
+                (len(topo['ASes']), len(topo['links'])))
+        yaml_dump(topo, f, default_flow_style=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthesize a topology config.')
+    parser.add_argument('-o', '--output', required=True, help='Output .topo file')
+    parser.add_argument('-i', '--isds', type=int, default=1, help='Number of ISDs')
+    parser.add_argument('-c', '--cores', type=int, default=3, help='Core ASes per ISD')
+    parser.add_argument('-l', '--leaves', type=int, default=10, help='Leaf ASes per ISD')
+    parser.add_argument('--core-degree', type=int, default=2,
+                        help='CORE links of a core AS within its ISD')
+    parser.add_argument('--isd-degree', type=int, default=1,
+                        help='CORE links of an ISD to the following ISDs')
+    parser.add_argument('--parents', type=int, default=1, help='Parents of a leaf AS')
+    parser.add_argument('--peers', type=int, default=0, help='PEER links of a leaf AS')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the parent/peer choice')
+    args = parser.parse_args()
+    topo = scale_topo(args.isds, args.cores, args.leaves, args.core_degree, args.isd_degree,
+                      args.parents, args.peers, args.seed)
+    write_topo(topo, args.output)
+
+
+if __name__ == "__main__":
+    main()
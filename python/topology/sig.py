@@ -14,20 +14,23 @@
 # limitations under the License.
 
 # Stdlib
-import json
 import os
-# External packages
-import toml
 # SCION
-from lib.util import write_file
+from lib.serialization import json_dumps, toml_dumps
 from topology.common import (
     ArgsBase,
+    disp_addr_elem,
+    DOCKER_DISP_SOCK,
+    docker_healthcheck,
+    docker_healthy,
     DOCKER_USR_VOL,
     json_default,
     remote_nets,
     sciond_svc_name,
     SD_API_PORT,
-    SIG_CONFIG_NAME
+    SIG_CONFIG_NAME,
+    sig_disp_name,
+    topo_iter,
 )
 from topology.net import socket_address_str
 from topology.prometheus import SIG_PROM_PORT
@@ -59,54 +62,68 @@ class SIGGenerator(object):
         self.prefix = 'docker_' if self.args.in_docker else ''
 
     def generate(self):
-        for topo_id, topo in self.args.topo_dicts.items():
+        self.generate_as()
+        return self.dc_conf
+
+    def generate_as(self, topo_ids=None):
+        """
+        Generate the SIG services and configs.
+
+        :param list topo_ids: If set, only generate the SIGs of these ASes.
+        """
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
             base = os.path.join(
                 self.output_base, topo_id.base_dir(self.args.output_dir))
-            self._dispatcher_conf(topo_id, base)
+            if not self.args.shared_dispatcher:
+                # Otherwise the SIG uses the dispatcher of the AS (see DockerGenerator).
+                self._dispatcher_conf(topo_id, base)
             self._sig_dc_conf(topo_id, base)
             self._sig_toml(topo_id, topo)
             self._sig_json(topo_id)
-        return self.dc_conf
 
     def _dispatcher_conf(self, topo_id, base):
         # Create dispatcher config
+        disp = sig_disp_name(self.args, topo_id)
         entry = {
             'image': 'scion_dispatcher_go',
-            'container_name': 'scion_%sdisp_sig_%s' % (self.prefix, topo_id.file_fmt()),
+            'container_name': 'scion_%s%s' % (self.prefix, disp),
             'environment': {
                 'SU_EXEC_USERSPEC': self.user_spec,
             },
+            'healthcheck': docker_healthcheck('-unix', DOCKER_DISP_SOCK),
             'networks': {},
             'volumes': [
                 *DOCKER_USR_VOL,
                 self._logs_vol(),
                 self._disp_vol(topo_id),
-                '%s:/share/conf:rw' % os.path.join(base, 'disp_sig_%s' % topo_id.file_fmt()),
+                '%s:/share/conf:rw' % os.path.join(base, disp),
             ]
         }
 
-        net = self.args.networks['sig%s' % topo_id.file_fmt()][0]
+        net = self.args.networks[disp_addr_elem(topo_id, disp)][0]
         ipv = 'ipv4'
         if ipv not in net:
             ipv = 'ipv6'
         entry['networks'][self.args.bridges[net['net']]] = {'%s_address' % ipv: str(net[ipv])}
-        self.dc_conf['services']['scion_disp_sig_%s' % topo_id.file_fmt()] = entry
-        vol_name = 'vol_scion_%sdisp_sig_%s' % (self.prefix, topo_id.file_fmt())
-        self.dc_conf['volumes'][vol_name] = None
+        self.dc_conf['services']['scion_%s' % disp] = entry
+        self.dc_conf['volumes'][self._disp_vol(topo_id).split(':')[0]] = None
 
     def _sig_dc_conf(self, topo_id, base):
+        disp = sig_disp_name(self.args, topo_id)
         self.dc_conf['services']['scion_sig_%s' % topo_id.file_fmt()] = {
             'image': 'scion_sig_acceptance:latest',
             'container_name': 'scion_%ssig_%s' % (self.prefix, topo_id.file_fmt()),
-            'depends_on': [
-                'scion_disp_sig_%s' % topo_id.file_fmt(),
+            'depends_on': docker_healthy(
+                'scion_%s' % disp,
                 sciond_svc_name(topo_id)
-            ],
+            ),
             'cap_add': ['NET_ADMIN'],
             'privileged': True,
             'environment': {
                 'SU_EXEC_USERSPEC': self.user_spec,
             },
+            # The SIG serves its metrics on all addresses of the network namespace.
+            'healthcheck': docker_healthcheck('-http', '127.0.0.1:%s' % SIG_PROM_PORT),
             'volumes': [
                 *DOCKER_USR_VOL,
                 self._disp_vol(topo_id),
@@ -114,27 +131,26 @@ class SIGGenerator(object):
                 '%s/sig%s:/share/conf' % (base, topo_id.file_fmt()),
                 self._logs_vol()
             ],
-            'network_mode': 'service:scion_disp_sig_%s' % topo_id.file_fmt(),
-            'command': [remote_nets(self.args.networks, topo_id)]
+            'network_mode': 'service:scion_%s' % disp,
+            'command': [remote_nets(self.args.graph, topo_id)]
         }
 
     def _sig_json(self, topo_id):
         sig_cfg = {"ConfigVersion": 1, "ASes": {}}
-        for t_id, topo in self.args.topo_dicts.items():
+        for t_id, net in self.args.graph.sig_nets():
             if topo_id == t_id:
                 continue
-            sig_cfg['ASes'][str(t_id)] = {"Nets": []}
-            net = self.args.networks['sig%s' % t_id.file_fmt()][0]
-            sig_cfg['ASes'][str(t_id)]['Nets'].append(net['net'])
+            sig_cfg['ASes'][str(t_id)] = {"Nets": [str(net)]}
 
         cfg = os.path.join(topo_id.base_dir(self.args.output_dir), 'sig%s' % topo_id.file_fmt(),
                            "cfg.json")
-        contents_json = json.dumps(sig_cfg, default=json_default, indent=2)
-        write_file(cfg, contents_json + '\n')
+        contents_json = json_dumps(sig_cfg, default=json_default)
+        self.args.sink.write(cfg, contents_json + '\n')
 
     def _sig_toml(self, topo_id, topo):
         name = 'sig%s' % topo_id.file_fmt()
-        net = self.args.networks[name][0]
+        # The SIG runs in the network namespace of its dispatcher.
+        net = self.args.networks[disp_addr_elem(topo_id, sig_disp_name(self.args, topo_id))][0]
         log_level = 'trace' if self.args.trace else 'debug'
         ipv = 'ipv4'
         if ipv not in net:
@@ -170,10 +186,11 @@ class SIGGenerator(object):
             }
         }
         path = os.path.join(topo_id.base_dir(self.args.output_dir), name, SIG_CONFIG_NAME)
-        write_file(path, toml.dumps(sig_conf))
+        self.args.sink.write(path, toml_dumps(sig_conf))
 
     def _disp_vol(self, topo_id):
-        return 'vol_scion_%sdisp_sig_%s:/run/shm/dispatcher:rw' % (self.prefix, topo_id.file_fmt())
+        disp = sig_disp_name(self.args, topo_id)
+        return 'vol_scion_%s%s:/run/shm/dispatcher:rw' % (self.prefix, disp)
 
     def _logs_vol(self):
         return self.output_base + '/logs:/share/logs:rw'
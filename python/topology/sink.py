@@ -0,0 +1,209 @@
+# Copyright 2020 Anapaya Systems
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+:mod:`sink` --- Output sink for the generated files
+===================================================
+"""
+# Stdlib
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# SCION
+from lib.errors import SCIONIOError
+from lib.util import link_file, make_dirs, write_file
+
+DEFAULT_WRITERS = 16
+# Maximum number of queued writes per writer thread, bounds the memory used by
+# file contents that are not written yet.
+PENDING_PER_WRITER = 64
+
+# The content of a file that is hard-linked to other paths once it is written.
+_Linked = namedtuple('_Linked', ['text', 'links'])
+
+
+class OutputSink(object):
+    """
+    Writes the generated files through a bounded pool of writer threads.
+
+    Every directory is created once, files whose content is already on disk are
+    left untouched, and all other files are written atomically with
+    lib.util.write_file. Writes are asynchronous: flush() waits for all of them
+    and raises the first error that occurred. Multiple writes to the same path
+    are serialized, the last one wins.
+    """
+
+    def __init__(self, writers=DEFAULT_WRITERS):
+        """
+        :param int writers: The number of writer threads.
+        """
+        self.writers = writers
+        self._dirs = set()
+        self._lock = threading.Lock()
+        # Paths with a queued write, and their latest content.
+        self._pending = {}
+        # Paths that are currently being written by a writer thread.
+        self._writing = set()
+        self._errors = []
+        self._pool = None
+        self._pool_pid = None
+        self._slots = None
+
+    def write(self, path, text):
+        """
+        Queue text to be written to path.
+
+        :param str path: the path to the file.
+        :param str text: the file content.
+        :raises:
+            lib.errors.SCIONIOError: IO error occurred
+        """
+        self._raise_errors()
+        dir_ = os.path.dirname(path)
+        if dir_ not in self._dirs:
+            make_dirs(dir_)
+            self._dirs.add(dir_)
+        pool = self._get_pool()
+        with self._lock:
+            queued = path in self._pending or path in self._writing
+            self._pending[path] = text
+        if queued:
+            # The queued or running writer of this path picks up the new content.
+            return
+        self._slots.acquire()
+        pool.submit(self._run, path).add_done_callback(self._done)
+
+    def write_linked(self, paths, text):
+        """
+        Queue text to be written to the first of paths, and hard-linked to the others, so
+        that the content is only stored once. The other paths must not be written separately.
+
+        :param list paths: the paths to the file and its links.
+        :param str text: the file content.
+        :raises:
+            lib.errors.SCIONIOError: IO error occurred
+        """
+        for path in paths[1:]:
+            dir_ = os.path.dirname(path)
+            if dir_ not in self._dirs:
+                make_dirs(dir_)
+                self._dirs.add(dir_)
+        self.write(paths[0], _Linked(text, tuple(paths[1:])))
+
+    @contextmanager
+    def stream(self, path):
+        """
+        Open path to write a large file incrementally. The file object is written in the
+        caller thread, to a temporary file that replaces path once the block exits without
+        an error.
+
+        :param str path: the path to the file.
+        :raises:
+            lib.errors.SCIONIOError: IO error occurred
+        """
+        dir_ = os.path.dirname(path)
+        if dir_ not in self._dirs:
+            make_dirs(dir_)
+            self._dirs.add(dir_)
+        tmp_file = path + ".new"
+        try:
+            f = open(tmp_file, 'w')
+        except OSError as e:
+            raise SCIONIOError("Error creating temp file '%s': %s" %
+                               (path, e.strerror)) from None
+        try:
+            with f:
+                yield f
+        except OSError as e:
+            raise SCIONIOError("Error writing to temp file '%s': %s" %
+                               (path, e.strerror)) from None
+        try:
+            os.rename(tmp_file, path)
+        except OSError as e:
+            raise SCIONIOError("Error moving '%s' to '%s': %s" %
+                               (tmp_file, path, e.strerror)) from None
+
+    def flush(self):
+        """
+        Wait until all queued files are written.
+
+        :raises:
+            lib.errors.SCIONIOError: IO error occurred
+        """
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=True)
+        self._pool = None
+        self._raise_errors()
+
+    def _get_pool(self):
+        # Worker threads do not survive a fork, a forked process needs its own pool.
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.writers)
+            self._pool_pid = os.getpid()
+            self._lock = threading.Lock()
+            self._pending = {}
+            self._writing = set()
+            self._slots = threading.BoundedSemaphore(self.writers * PENDING_PER_WRITER)
+        return self._pool
+
+    def _run(self, path):
+        while True:
+            with self._lock:
+                text = self._pending.pop(path, None)
+                if text is None:
+                    self._writing.discard(path)
+                    return
+                self._writing.add(path)
+            try:
+                self._write(path, text)
+            except Exception:
+                with self._lock:
+                    self._writing.discard(path)
+                raise
+
+    def _write(self, path, text):
+        links = ()
+        if isinstance(text, _Linked):
+            text, links = text
+        if not _has_content(path, text):
+            write_file(path, text, mkdir=False)
+        for link in links:
+            link_file(path, link)
+
+    def _done(self, future):
+        self._slots.release()
+        if future.exception() is not None:
+            self._errors.append(future.exception())
+
+    def _raise_errors(self):
+        if self._errors:
+            err = self._errors[0]
+            self._errors = []
+            raise err
+
+
+def _has_content(path, text):
+    """
+    Whether the file at path already contains text. Comparing the content directly
+    is cheaper than hashing it, as the file has to be read either way.
+    """
+    try:
+        if os.stat(path).st_size != len(text.encode()):
+            return False
+        with open(path) as f:
+            return f.read() == text
+    except OSError:
+        return False
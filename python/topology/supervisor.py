@@ -22,7 +22,6 @@ import os
 from io import StringIO
 
 # SCION
-from lib.util import write_file
 from topology.common import (
     ArgsTopoDicts,
     BR_CONFIG_NAME,
@@ -30,6 +29,7 @@ from topology.common import (
     CS_CONFIG_NAME,
     DISP_CONFIG_NAME,
     SD_CONFIG_NAME,
+    topo_iter,
 )
 
 
@@ -47,13 +47,64 @@ class SupervisorGenerator(object):
         """
         self.args = args
 
-    def generate(self):
+    def generate(self, as_confs=None):
+        """
+        Generate the supervisor configuration.
+
+        :param list as_confs: The results of generate_as. If not set, the per-AS
+            configuration is generated here.
+        """
         self._write_dispatcher_conf()
-        for topo_id, topo in self.args.topo_dicts.items():
+        if as_confs is None:
+            self.generate_as()
+
+    def generate_as(self, topo_ids=None):
+        """
+        Generate the supervisor configuration of the per-AS services.
+
+        :param list topo_ids: If set, only generate the configuration of these ASes.
+        """
+        for topo_id, topo in topo_iter(self.args.topo_dicts, topo_ids):
             base = topo_id.base_dir(self.args.output_dir)
             entries = self._as_conf(topo, base)
             self._write_as_conf(topo_id, entries)
 
+    def container_conf(self, topo_id, topo, base, disp_conf):
+        """
+        Return the supervisord configuration that runs all services of an AS in one container
+        (see DockerGenerator._as_container_conf). The programs are the ones of the AS in the
+        supervisor topology, and the dispatcher of the AS. They are started with supervisord.
+
+        :param TopoID topo_id: The AS.
+        :param Topology topo: The topo dict of the AS.
+        :param str base: The AS directory, relative to the working directory of the container.
+        :param str disp_conf: The path to the config of the dispatcher of the AS.
+        :rtype: str
+        """
+        config = configparser.ConfigParser(interpolation=None)
+        config['supervisord'] = {
+            'nodaemon': 'true',
+            'logfile': 'logs/supervisord-as%s.log' % topo_id.file_fmt(),
+            'pidfile': '/tmp/supervisord.pid',
+        }
+        config['unix_http_server'] = {'file': '/tmp/supervisor.sock'}
+        config['rpcinterface:supervisor'] = {
+            'supervisor.rpcinterface_factory': 'supervisor.rpcinterface:make_main_rpcinterface',
+        }
+        config['supervisorctl'] = {'serverurl': 'unix:///tmp/supervisor.sock'}
+        disp = 'disp_%s' % topo_id.file_fmt()
+        entries = [(disp, ["bin/godispatcher", "-config", disp_conf])]
+        entries.extend(self._as_conf(topo, base))
+        progs = [(elem, self._program(elem, entry)) for elem, entry in entries]
+        sd_name = "sd%s" % topo_id.file_fmt()
+        progs.append((sd_name, self._sciond_entry(sd_name, os.path.join(base, COMMON_DIR))))
+        for elem, prog in progs:
+            prog['autostart'] = 'true'
+            config["program:%s" % elem] = prog
+        text = StringIO()
+        config.write(text)
+        return text.getvalue()
+
     def _as_conf(self, topo, base):
         entries = []
         entries.extend(self._br_entries(topo, "bin/border", base))
@@ -62,14 +113,14 @@ class SupervisorGenerator(object):
 
     def _br_entries(self, topo, cmd, base):
         entries = []
-        for k, v in topo.get("BorderRouters", {}).items():
+        for k, v in topo.border_routers.items():
             conf = os.path.join(base, k, BR_CONFIG_NAME)
             entries.append((k, [cmd, "-config", conf]))
         return entries
 
     def _control_service_entries(self, topo, base):
         entries = []
-        for k, v in topo.get("ControlService", {}).items():
+        for k, v in topo.control_services.items():
             # only a single control service instance per AS is currently supported
             if k.endswith("-1"):
                 conf = os.path.join(base, k, CS_CONFIG_NAME)
@@ -98,17 +149,20 @@ class SupervisorGenerator(object):
         config.write(text)
         conf_path = os.path.join(topo_id.base_dir(
             self.args.output_dir), SUPERVISOR_CONF)
-        write_file(conf_path, text.getvalue())
+        self.args.sink.write(conf_path, text.getvalue())
 
     def _write_elem_conf(self, elem, entry, elem_dir, topo_id=None):
         config = configparser.ConfigParser(interpolation=None)
+        config["program:%s" % elem] = self._program(elem, entry, elem_dir)
+        text = StringIO()
+        config.write(text)
+        self.args.sink.write(os.path.join(elem_dir, SUPERVISOR_CONF), text.getvalue())
+
+    def _program(self, elem, entry, elem_dir=None):
         prog = self._common_entry(elem, entry, elem_dir)
         if elem.startswith("br"):
             prog['environment'] += ',GODEBUG="cgocheck=0"'
-        config["program:%s" % elem] = prog
-        text = StringIO()
-        config.write(text)
-        write_file(os.path.join(elem_dir, SUPERVISOR_CONF), text.getvalue())
+        return prog
 
     def _write_dispatcher_conf(self):
         elem = "dispatcher"
@@ -129,7 +183,7 @@ class SupervisorGenerator(object):
             'priority': 100,
             'command': self._mk_cmd(name, cmd_args),
         }
-        if name == "dispatcher":
+        if name.startswith("disp"):
             entry['startsecs'] = 1
             entry['priority'] = 50
         return entry
@@ -17,15 +17,12 @@
 =============================================
 """
 # Stdlib
-import json
 import logging
 import os
 import random
 import sys
 from collections import defaultdict
-
-# External packages
-import yaml
+from collections.abc import Mapping
 
 # SCION
 from lib.defines import (
@@ -33,18 +30,20 @@ from lib.defines import (
     DEFAULT_MTU,
     IFIDS_FILE,
     SCION_MIN_MTU,
-    SCION_ROUTER_PORT,
     TOPO_FILE,
 )
+from lib.serialization import json_dumps, yaml_dump
 from lib.types import LinkType
-from lib.util import write_file
+from topology.allocations import AllocationStore
 from topology.common import (
     ArgsBase,
     json_default,
-    SCION_SERVICE_NAMES,
     srv_iter,
-    TopoID
+    topo_iter,
+    TopoID,
 )
+from topology.graph import TopoGraph
+from topology.model import AS, Address, BorderRouter, Interface, ServiceInstance
 from topology.net import PortGenerator
 
 DEFAULT_LINK_BW = 1000
@@ -62,13 +61,15 @@ ADDR_TYPE_6 = 'IPv6'
 
 
 class TopoGenArgs(ArgsBase):
-    def __init__(self, args, topo_config, subnet_gen4, subnet_gen6, default_mtu):
+    def __init__(self, args, topo_config, subnet_gen4, subnet_gen6, default_mtu,
+                 allocations=None):
         """
         :param ArgsBase args: Contains the passed command line arguments.
         :param dict topo_config: The parsed topology config.
         :param SubnetGenerator subnet_gen4: The default network generator for IPv4.
         :param SubnetGenerator subnet_gen6: The default network generator for IPv6.
         :param dict default_mtu: The default mtu.
+        :param AllocationStore allocations: The allocations of a previous run to keep.
         """
         super().__init__(args)
         self.topo_config_dict = topo_config
@@ -77,7 +78,8 @@ class TopoGenArgs(ArgsBase):
             ADDR_TYPE_6: subnet_gen6,
         }
         self.default_mtu = default_mtu
-        self.port_gen = PortGenerator()
+        self.allocations = allocations or AllocationStore()
+        self.port_gen = PortGenerator(self.allocations.ports)
 
 
 class TopoGenerator(object):
@@ -87,42 +89,100 @@ class TopoGenerator(object):
         """
         self.args = args
         self.topo_dicts = {}
+        # The topo dicts returned by generate(), see write_as_topos.
+        self.as_topos = None
+        self.as_confs = {}
         self.hosts = []
         self.virt_addrs = set()
         self.as_list = defaultdict(list)
         self.links = defaultdict(list)
         self.ifid_map = {}
+        self.graph = TopoGraph()
+        # The stable indexes of the ASes and links, in the order of the topology config.
+        self.as_indexes = {}
+        self.link_indexes = {}
+        # The interface IDs of both ends of every link, see AllocationStore.
+        self.link_ifids = {}
+        # The keys of the links in the AllocationStore (see _link_key), by link name. Unlike
+        # the link names, they do not depend on the numbering of the BRs.
+        self.link_keys = {}
 
     def _reg_addr(self, topo_id, elem_id, addr_type):
-        subnet = self.args.subnet_gen[addr_type].register(topo_id)
+        subnet = self.args.subnet_gen[addr_type].register(topo_id, self.as_indexes.get(topo_id))
         return subnet.register(elem_id)
 
     def _reg_link_addrs(self, local_br, remote_br, local_ifid, remote_ifid, addr_type):
+        link_name = self._link_name(local_br, remote_br, local_ifid, remote_ifid)
+        subnet = self.args.subnet_gen[addr_type].register(
+            link_name, self.link_indexes.get(link_name), link=True,
+            key=self.link_keys.get(link_name))
+        return subnet.register(local_br), subnet.register(remote_br)
+
+    def _link_name(self, local_br, remote_br, local_ifid, remote_ifid):
         link_name = str(sorted((local_br, remote_br)))
         link_name += str(sorted((local_ifid, remote_ifid)))
-        subnet = self.args.subnet_gen[addr_type].register(link_name)
-        return subnet.register(local_br), subnet.register(remote_br)
+        return link_name
 
     def _iterate(self, f):
         for isd_as, as_conf in self.args.topo_config_dict["ASes"].items():
             f(TopoID(isd_as), as_conf)
 
     def generate(self):
-        self._read_links()
-        self._iterate(self._generate_as_topo)
-        self._iterate(self._generate_as_list)
-        if self.args.sig:
-            self._iterate(self._register_sig)
-        self._iterate(self._register_sciond)
+        """
+        Generate the topo dicts and allocate the networks.
+
+        In streaming mode, the topo dicts are only built to register the addresses, and
+        are dropped right away. The returned StreamedTopoDicts rebuilds them on access. The
+        registrations of all ASes are kept, as the subnets are allocated for all of them at
+        once, and so are the returned networks.
+
+        :returns: The topo dicts (model.AS objects, keyed by topo id) and the networks.
+        :rtype: (dict, dict)
+        """
+        profiler = self.args.profiler
+        with profiler.phase('links'):
+            self._read_links()
+            self._iterate(self._index_as)
+        with profiler.phase('AS topos'):
+            if self.args.stream:
+                self._iterate(self._register_as_topo)
+            else:
+                self._iterate(self._generate_as_topo)
+            self._iterate(self._generate_as_list)
+            if self.args.sig:
+                self._iterate(self._register_sig)
+            self._iterate(self._register_sciond)
         networks = {}
-        for k, v in self.args.subnet_gen[ADDR_TYPE_4].alloc_subnets().items():
-            networks[k] = v
-        for k, v in self.args.subnet_gen[ADDR_TYPE_6].alloc_subnets().items():
-            networks[k] = v
-        self._write_as_topos()
+        with profiler.phase('subnets'):
+            for k, v in self.args.subnet_gen[ADDR_TYPE_4].alloc_subnets().items():
+                networks[k] = v
+            for k, v in self.args.subnet_gen[ADDR_TYPE_6].alloc_subnets().items():
+                networks[k] = v
+            self.graph.index_networks(networks)
         self._write_as_list()
         self._write_ifids()
-        return self.topo_dicts, networks
+        self.as_topos = self.topo_dicts
+        if self.args.stream:
+            self.as_topos = StreamedTopoDicts(self, self.as_confs)
+        return self.as_topos, networks
+
+    def _register_as_topo(self, topo_id, as_conf):
+        # Building the topo dict registers the addresses and ports of the AS.
+        self.as_confs[topo_id] = as_conf
+        self._generate_as_topo(topo_id, as_conf)
+        del self.topo_dicts[topo_id]
+
+    def build_as_topo(self, topo_id, as_conf):
+        """
+        Build the topo dict of an AS without keeping it. The addresses and ports are
+        looked up in the registrations of generate(), which must have been called before.
+        """
+        self._generate_as_topo(topo_id, as_conf)
+        return self.topo_dicts.pop(topo_id)
+
+    def _index_as(self, topo_id, as_conf):
+        self.as_indexes[topo_id] = len(self.as_indexes)
+        self.graph.add_as(topo_id, as_conf.get('core', False))
 
     def _register_sig(self, topo_id, as_conf):
         addr_type = addr_type_from_underlay(as_conf.get('underlay', DEFAULT_UNDERLAY))
@@ -136,7 +196,7 @@ class TopoGenerator(object):
         # client applications can use to communicate.
         self._reg_addr(topo_id, "tester_" + topo_id.file_fmt(), addr_type)
 
-    def _br_name(self, ep, assigned_br_id, br_ids, if_ids):
+    def _br_name(self, ep, assigned_br_id, br_ids, if_ids, kept_ifid=None):
         br_name = ep.br_name()
         if br_name:
             # BR with multiple interfaces, reuse assigned id
@@ -151,29 +211,44 @@ class TopoGenerator(object):
             br_id = br_ids[ep]
         br = "br%s-%d" % (ep.file_fmt(), br_id)
         ifid = ep.ifid
+        # The IFIDs of the topology config are reserved by _reserve_ifids.
         if self.args.random_ifids or not ifid:
-            ifid = if_ids[ep].new()
-        else:
-            if_ids[ep].add(ifid)
+            # An IFID kept from a previous run is reused, unless it is taken by now.
+            if kept_ifid and not if_ids[ep].used(kept_ifid):
+                if_ids[ep].add(kept_ifid)
+                ifid = kept_ifid
+            else:
+                ifid = if_ids[ep].new()
         return br, ifid
 
     def _read_links(self):
         assigned_br_id = {}
         br_ids = defaultdict(int)
-        if_ids = defaultdict(lambda: IFIDGenerator())
+        rng = random.Random(self.args.seed)
+        if_ids = defaultdict(lambda: IFIDGenerator(rng))
         if not self.args.topo_config_dict.get("links", None):
             return
+        kept_ifids = self.args.allocations.ifids
+        self._reserve_ifids(if_ids)
         for attrs in self.args.topo_config_dict["links"]:
+            key = self._link_key(attrs)
+            kept_a, kept_b = kept_ifids.get(key, (None, None))
             a = LinkEP(attrs.pop("a"))
             b = LinkEP(attrs.pop("b"))
             linkto = linkto_a = linkto_b = attrs.pop("linkAtoB")
             if linkto.lower() == LinkType.CHILD:
                 linkto_a = LinkType.PARENT
                 linkto_b = LinkType.CHILD
-            a_br, a_ifid = self._br_name(a, assigned_br_id, br_ids, if_ids)
-            b_br, b_ifid = self._br_name(b, assigned_br_id, br_ids, if_ids)
+            a_br, a_ifid = self._br_name(a, assigned_br_id, br_ids, if_ids, kept_a)
+            b_br, b_ifid = self._br_name(b, assigned_br_id, br_ids, if_ids, kept_b)
+            self.link_ifids[key] = [a_ifid, b_ifid]
+            link_name = self._link_name(a_br, b_br, a_ifid, b_ifid)
+            self.link_indexes[link_name] = len(self.link_indexes)
+            self.link_keys[link_name] = key
             self.links[a].append((linkto_b, b, attrs, a_br, b_br, a_ifid, b_ifid))
             self.links[b].append((linkto_a, a, attrs, b_br, a_br, b_ifid, a_ifid))
+            self.graph.add_link(a, b, linkto_b, a_br, a_ifid)
+            self.graph.add_link(b, a, linkto_a, b_br, b_ifid)
             a_desc = "%s %s" % (a_br, a_ifid)
             b_desc = "%s %s" % (b_br, b_ifid)
             self.ifid_map.setdefault(str(a), {})
@@ -181,6 +256,47 @@ class TopoGenerator(object):
             self.ifid_map.setdefault(str(b), {})
             self.ifid_map[str(b)][b_desc] = a_desc
 
+    def _link_key(self, attrs):
+        """
+        Return the key of a link in the allocation store: its end points, and a counter for
+        parallel links between the same end points.
+        """
+        key = "%s %s" % (attrs["a"], attrs["b"])
+        n = 1
+        while key in self.link_ifids:
+            n += 1
+            key = "%s %s %d" % (attrs["a"], attrs["b"], n)
+        return key
+
+    def _reserve_ifids(self, if_ids):
+        """
+        Validate and reserve the IFIDs that are set in the topology config, before any IFID is
+        generated. They take precedence over the IFIDs kept from a previous run. All invalid
+        IFIDs are reported at once.
+        """
+        if self.args.random_ifids:
+            return
+        fixed = defaultdict(set)
+        errors = []
+        for attrs in self.args.topo_config_dict["links"]:
+            for raw in (attrs["a"], attrs["b"]):
+                ep = LinkEP(raw)
+                if not ep.ifid:
+                    continue
+                if not 1 <= ep.ifid <= IFIDGenerator.MAX_IFID:
+                    errors.append("IFID %d of %s is invalid!" % (ep.ifid, raw))
+                elif ep.ifid in fixed[ep]:
+                    errors.append("IFID %d of %s already exists!" % (ep.ifid, raw))
+                else:
+                    fixed[ep].add(ep.ifid)
+        for error in errors:
+            logging.critical(error)
+        if errors:
+            sys.exit(1)
+        for ep, ifids in fixed.items():
+            for ifid in sorted(ifids):
+                if_ids[ep].add(ifid)
+
     def _generate_as_topo(self, topo_id, as_conf):
         mtu = as_conf.get('mtu', self.args.default_mtu)
         assert mtu >= SCION_MIN_MTU, mtu
@@ -188,18 +304,11 @@ class TopoGenerator(object):
         for attr in ['authoritative', 'core', 'issuing', 'voting']:
             if as_conf.get(attr, False):
                 attributes.append(attr)
-        self.topo_dicts[topo_id] = {
-            'Attributes': attributes,
-            'ISD_AS': str(topo_id),
-            'MTU': mtu,
-            'Overlay': as_conf.get('underlay', DEFAULT_UNDERLAY),
-        }
-        for i in SCION_SERVICE_NAMES:
-            self.topo_dicts[topo_id][i] = {}
+        self.topo_dicts[topo_id] = AS(topo_id, attributes, mtu,
+                                      as_conf.get('underlay', DEFAULT_UNDERLAY), self.args.sig)
         self._gen_srv_entries(topo_id, as_conf)
         self._gen_br_entries(topo_id, as_conf)
         if self.args.sig:
-            self.topo_dicts[topo_id]['SIG'] = {}
             self._gen_sig_entries(topo_id, as_conf)
 
     def _gen_srv_entries(self, topo_id, as_conf):
@@ -218,21 +327,13 @@ class TopoGenerator(object):
 
             reg_id = elem_id
 
+            ip = self._reg_addr(topo_id, reg_id, addr_type)
             port = self._default_ctrl_port(nick)
             if not self.args.docker:
-                port = self.args.port_gen.register(elem_id)
-
-            d = {
-                'Addrs': {
-                    addr_type: {
-                        'Public': {
-                            'Addr': self._reg_addr(topo_id, reg_id, addr_type),
-                            'L4Port': port,
-                        }
-                    }
-                }
-            }
-            self.topo_dicts[topo_id][topo_key][elem_id] = d
+                port = self.args.port_gen.register(elem_id, ip)
+
+            addr = Address(addr_type, ip, port)
+            self.topo_dicts[topo_id].services[topo_key][elem_id] = ServiceInstance(elem_id, addr)
 
     def _default_ctrl_port(self, nick):
         if nick == "cs":
@@ -264,74 +365,35 @@ class TopoGenerator(object):
         if self.args.docker:
             int_addr = self._reg_addr(local, local_br + "_internal", addr_type)
 
-        if self.topo_dicts[local]["BorderRouters"].get(local_br) is None:
+        brs = self.topo_dicts[local].border_routers
+        br = brs.get(local_br)
+        if br is None:
             ctrl_port = 30242
             intl_port = 30042
             if not self.args.docker:
-                ctrl_port = self.args.port_gen.register(local_br + "_ctrl")
-                intl_port = self.args.port_gen.register(local_br + "_internal")
-
-            self.topo_dicts[local]["BorderRouters"][local_br] = {
-                'CtrlAddr': {
-                    addr_type: {
-                        'Public': {
-                            'Addr': ctrl_addr,
-                            'L4Port': ctrl_port,
-                        }
-                    }
-                },
-                'InternalAddrs': {
-                    addr_type: {
-                        'PublicOverlay': {
-                            'Addr': int_addr,
-                            'OverlayPort': intl_port,
-                        }
-                    }
-                },
-                'Interfaces': {
-                    l_ifid: self._gen_br_intf(remote, public_addr, remote_addr, attrs, remote_type)
-                }
-            }
-        else:
-            # There is already a BR entry, add interface
-            intf = self._gen_br_intf(remote, public_addr, remote_addr, attrs, remote_type)
-            self.topo_dicts[local]["BorderRouters"][local_br]['Interfaces'][l_ifid] = intf
+                ctrl_port = self.args.port_gen.register(local_br + "_ctrl", ctrl_addr)
+                intl_port = self.args.port_gen.register(local_br + "_internal", int_addr)
+            br = brs[local_br] = BorderRouter(local_br, Address(addr_type, ctrl_addr, ctrl_port),
+                                              Address(addr_type, int_addr, intl_port))
+        # A BR entry may already exist, the interface is added to it.
+        br.interfaces[l_ifid] = self._gen_br_intf(remote, public_addr, remote_addr, attrs,
+                                                  remote_type)
 
     def _gen_br_intf(self, remote, public_addr, remote_addr, attrs, remote_type):
-        return {
-            'Overlay': attrs.get('underlay', DEFAULT_UNDERLAY),
-            'PublicOverlay': {
-                'Addr': public_addr,
-                'OverlayPort': SCION_ROUTER_PORT
-            },
-            'RemoteOverlay': {
-                'Addr': remote_addr,
-                'OverlayPort': SCION_ROUTER_PORT
-            },
-            'Bandwidth': attrs.get('bw', DEFAULT_LINK_BW),
-            'ISD_AS': str(remote),
-            'LinkTo': LinkType.to_str(remote_type.lower()),
-            'MTU': attrs.get('mtu', DEFAULT_MTU)
-        }
+        return Interface(attrs.get('underlay', DEFAULT_UNDERLAY), public_addr, remote_addr,
+                         attrs.get('bw', DEFAULT_LINK_BW), str(remote),
+                         LinkType.to_str(remote_type.lower()), attrs.get('mtu', DEFAULT_MTU))
 
     def _gen_sig_entries(self, topo_id, as_conf):
         addr_type = addr_type_from_underlay(DEFAULT_UNDERLAY)
         elem_id = "sig" + topo_id.file_fmt()
         reg_id = "sig" + topo_id.file_fmt()
+        ip = self._reg_addr(topo_id, reg_id, addr_type)
         port = 30256
         if not self.args.docker:
-            port = self.args.port_gen.register(elem_id)
-        d = {
-            'Addrs': {
-                addr_type: {
-                    'Public': {
-                        'Addr': self._reg_addr(topo_id, reg_id, addr_type),
-                        'L4Port': port,
-                    }
-                }
-            }
-        }
-        self.topo_dicts[topo_id]['SIG'][elem_id] = d
+            port = self.args.port_gen.register(elem_id, ip)
+        addr = Address(addr_type, ip, port)
+        self.topo_dicts[topo_id].sigs[elem_id] = ServiceInstance(elem_id, addr)
 
     def _generate_as_list(self, topo_id, as_conf):
         if as_conf.get('core', False):
@@ -340,25 +402,68 @@ class TopoGenerator(object):
             key = "Non-core"
         self.as_list[key].append(str(topo_id))
 
-    def _write_as_topos(self):
-        for topo_id, as_topo, base in srv_iter(
-                self.topo_dicts, self.args.output_dir, common=True):
-            path = os.path.join(base, TOPO_FILE)
-            contents_json = json.dumps(self.topo_dicts[topo_id],
-                                       default=json_default, indent=2)
-            write_file(path, contents_json + '\n')
+    def write_as_topos(self, topo_ids=None):
+        """
+        Write the topology files of all elements.
+
+        :param list topo_ids: If set, only write the topology files of these ASes.
+        """
+        for topo_id, as_topo in topo_iter(self.as_topos, topo_ids):
+            # The file is the same for all elements of the AS.
+            contents_json = json_dumps(as_topo.to_topo(), default=json_default) + '\n'
+            paths = [os.path.join(base, TOPO_FILE) for _, _, base in
+                     srv_iter({topo_id: as_topo}, self.args.output_dir, common=True)]
+            if self.args.link_duplicates:
+                self.args.sink.write_linked(paths, contents_json)
+                continue
+            for path in paths:
+                self.args.sink.write(path, contents_json)
 
     def _write_as_list(self):
         list_path = os.path.join(self.args.output_dir, AS_LIST_FILE)
-        write_file(list_path, yaml.dump(dict(self.as_list)))
+        self.args.sink.write(list_path, yaml_dump(dict(self.as_list)))
 
     def _write_ifids(self):
         list_path = os.path.join(self.args.output_dir, IFIDS_FILE)
-        write_file(list_path, yaml.dump(self.ifid_map,
-                                        default_flow_style=False))
+        self.args.sink.write(list_path, yaml_dump(self.ifid_map,
+                                                  default_flow_style=False))
+
+
+class StreamedTopoDicts(Mapping):
+    """
+    Read-only mapping of the topo dicts, which builds the topo dict of an AS when it is
+    accessed. Only the most recently built topo dict is kept, so that the generation of
+    large topologies does not hold all of them in memory at once. Consumers should visit
+    the ASes one at a time, e.g. with items(), and not keep references to the topo dicts.
+    """
+
+    def __init__(self, topo_gen, as_confs):
+        """
+        :param TopoGenerator topo_gen: The generator which registered the ASes.
+        :param dict as_confs: The AS configs of the topology config, keyed by topo id.
+        """
+        self._topo_gen = topo_gen
+        self._as_confs = as_confs
+        self._cur_id = None
+        self._cur_topo = None
+
+    def __getitem__(self, topo_id):
+        if self._cur_id is None or topo_id != self._cur_id:
+            as_topo = self._topo_gen.build_as_topo(topo_id, self._as_confs[topo_id])
+            self._cur_id, self._cur_topo = topo_id, as_topo
+        return self._cur_topo
+
+    def __iter__(self):
+        return iter(self._as_confs)
+
+    def __len__(self):
+        return len(self._as_confs)
 
 
 class LinkEP(TopoID):
+    # The interface ID and BR name are not derived from the ISD-AS.
+    INTERN = False
+
     def __init__(self, raw):
         self._brid = None
         self.ifid = None
@@ -380,27 +485,67 @@ class LinkEP(TopoID):
 
 
 class IFIDGenerator(object):
-    """Generates unique interface IDs"""
+    """
+    Generates unique interface IDs. The used IDs are kept in a bitmap. While less than half of
+    the IDs are used, a random ID is drawn until it is free. Above that, the free IDs are drawn
+    from a list, so that allocation stays O(1) for ASes with thousands of interfaces.
+    """
+    MAX_IFID = 4095
+
+    def __init__(self, rng=random):
+        """
+        :param random.Random rng: The source of the random IDs.
+        """
+        self._rng = rng
+        self._used = bytearray(self.MAX_IFID + 1)
+        self._count = 0
+        self._free = None
+        # The position of every free ID in _free, valid for the IDs in _free only.
+        self._pos = None
 
-    def __init__(self):
-        self._ifids = set()
+    def used(self, ifid):
+        return 1 <= ifid <= self.MAX_IFID and bool(self._used[ifid])
 
     def new(self):
-        while True:
-            ifid = random.randrange(1, 4096)
-            if ifid in self._ifids:
-                continue
+        if self._count >= self.MAX_IFID:
+            logging.critical("No free IFID left!")
+            sys.exit(1)
+        if self._free is None and self._count < self.MAX_IFID // 2:
+            while True:
+                ifid = self._rng.randrange(1, self.MAX_IFID + 1)
+                if not self._used[ifid]:
+                    break
             self.add(ifid)
             return ifid
+        if self._free is None:
+            self._free = [i for i in range(1, self.MAX_IFID + 1) if not self._used[i]]
+            self._pos = [0] * (self.MAX_IFID + 1)
+            for i, ifid in enumerate(self._free):
+                self._pos[ifid] = i
+        ifid = self._free[self._rng.randrange(len(self._free))]
+        self._take(ifid)
+        return ifid
 
     def add(self, ifid):
-        if ifid in self._ifids:
-            logging.critical("IFID %d already exists!" % ifid)
-            exit(1)
-        if ifid < 1 or ifid > 4095:
+        if ifid < 1 or ifid > self.MAX_IFID:
             logging.critical("IFID %d is invalid!" % ifid)
-            exit(1)
-        self._ifids.add(ifid)
+            sys.exit(1)
+        if self._used[ifid]:
+            logging.critical("IFID %d already exists!" % ifid)
+            sys.exit(1)
+        self._take(ifid)
+
+    def _take(self, ifid):
+        self._used[ifid] = 1
+        self._count += 1
+        if self._free is None:
+            return
+        # Remove from the free list by swapping with the last entry.
+        last = self._free.pop()
+        if last != ifid:
+            index = self._pos[ifid]
+            self._free[index] = last
+            self._pos[last] = index
 
 
 def addr_type_from_underlay(underlay: str) -> str:
@@ -17,12 +17,25 @@ cmd_topo_clean() {
     supervisor/supervisor.sh shutdown
     stop_jaeger
     mkdir -p logs traces gen gen-cache
+    # Incremental generation updates the existing gen directory in place.
+    [ "$1" = "keep_gen" ] && return
+    # The allocations of the last run are kept for the next one.
+    if [ "$1" = "keep_allocations" ]; then
+        find gen -mindepth 1 -maxdepth 1 ! -name allocations.json -exec rm -r {} +
+        find gen-cache -mindepth 1 -maxdepth 1 -exec rm -r {} +
+        return
+    fi
     find gen gen-cache -mindepth 1 -maxdepth 1 -exec rm -r {} +
 }
 
 cmd_topology() {
     set -e
-    cmd_topo_clean
+    local keep_gen=
+    for arg in "$@"; do
+        [ "$arg" = "--incremental" ] && keep_gen=keep_gen
+        [ "$arg" = "--keep-allocations" ] && keep_gen=${keep_gen:-keep_allocations}
+    done
+    cmd_topo_clean $keep_gen
 
     # Build the necessary binaries.
     bazel build //:scion-topo
@@ -47,6 +60,14 @@ cmd_topology() {
     fi
 }
 
+cmd_extract() {
+    if [ -z "$1" ]; then
+        echo "ERROR: the path of the archive is required"
+        exit 1
+    fi
+    python/topology/archive.py -C gen "$@"
+}
+
 cmd_run() {
     if [ "$1" != "nobuild" ]; then
         echo "Compiling..."
@@ -60,20 +81,10 @@ cmd_run() {
     fi
     run_setup
     echo "Running the network..."
-    # Start dispatcher first, as it is requrired by the border routers.
-    if is_docker_be; then
-        ./tools/quiet ./scion.sh mstart '*disp*' # for dockerized
-    else
-        ./tools/quiet ./scion.sh mstart '*dispatcher*' # for supervisor
-    fi
-    # Start border routers before all other services to provide connectivity.
-    ./tools/quiet ./scion.sh mstart '*br*'
-    # Run with docker-compose or supervisor
-    if is_docker_be; then
-        ./tools/quiet ./tools/dc start 'scion*'
-    else
-        ./tools/quiet ./supervisor/supervisor.sh start all
-    fi
+    # Start the services in dependency order (dispatchers, border routers, control services,
+    # daemons), every wave as soon as the previous one is ready: the supervisor programs answer
+    # on their metrics endpoints, the containers pass their compose healthchecks.
+    ./tools/quiet python/topology/launcher.py up
 }
 
 load_cust_keys() {
@@ -124,7 +135,9 @@ run_setup() {
 
 cmd_stop() {
     echo "Terminating this run of the SCION infrastructure"
-    if is_docker_be; then
+    if is_docker_sharded; then
+        ./tools/quiet python/topology/launcher.py stop
+    elif is_docker_be; then
         ./tools/quiet ./tools/dc stop 'scion*'
     else
         ./tools/quiet ./supervisor/supervisor.sh stop all
@@ -216,6 +229,10 @@ is_docker_be() {
     [ -f gen/scion-dc.yml ]
 }
 
+is_docker_sharded() {
+    [ -f gen/scion-dc-shards.json ]
+}
+
 is_supervisor() {
    [ -f gen/dispatcher/supervisord.conf ]
 }
@@ -413,6 +430,12 @@ cmd_help() {
 	    $PROGRAM topology
 	        Create topology, configuration, and execution files.
 	        All arguments or options are passed to topology/generator.py
+	        With --incremental, the existing gen directory is kept and only the
+	        ASes whose inputs changed are regenerated.
+	    $PROGRAM extract ARCHIVE [ISD-AS...]
+	        Extract a topology archive written with topology --output-archive
+	        into the gen directory. If ASes are given, only their directories
+	        are extracted.
 	    $PROGRAM run [nobuild]
 	        Run network.
 	    $PROGRAM sciond ISD-AS [ADDR]
@@ -450,7 +473,7 @@ COMMAND="$1"
 shift
 
 case "$COMMAND" in
-    coverage|help|lint|run|mstart|mstatus|mstop|stop|status|test|topology|version|build|clean|sciond|traces|stop_traces|topo_clean)
+    coverage|extract|help|lint|run|mstart|mstatus|mstop|stop|status|test|topology|version|build|clean|sciond|traces|stop_traces|topo_clean)
         "cmd_$COMMAND" "$@" ;;
     start) cmd_run "$@" ;;
     *)  cmd_help; exit 1 ;;